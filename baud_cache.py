@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# 缓存文件的默认路径，可以用环境变量 SERIAL_BAUD_CACHE 指定
+DEFAULT_CACHE_PATH = os.environ.get(
+    'SERIAL_BAUD_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'serial_receive', 'baudrates.json')
+)
+
+def device_identity(port, ports=None):
+    """
+    获取串口设备的身份信息
+    
+    Args:
+        port: 串口路径
+        ports: serial.tools.list_ports.comports() 的结果，为None时自动获取
+    
+    Returns:
+        dict: {'port', 'vid', 'pid', 'serial_number'}，非USB设备或找不到设备时只有 port 有值
+    """
+    identity = {'port': port, 'vid': None, 'pid': None, 'serial_number': None}
+    if ports is None:
+        try:
+            from serial.tools import list_ports
+            ports = list_ports.comports()
+        except Exception as e:
+            logger.debug("无法列出串口: %s", e)
+            ports = []
+    for info in ports:
+        if getattr(info, 'device', None) == port:
+            identity['vid'] = getattr(info, 'vid', None)
+            identity['pid'] = getattr(info, 'pid', None)
+            identity['serial_number'] = getattr(info, 'serial_number', None)
+            break
+    return identity
+
+def identity_key(identity):
+    """身份信息对应的缓存键：串口路径，USB设备再加上 VID:PID 和序列号"""
+    if identity.get('vid') is None:
+        return identity['port']
+    return f"{identity['port']}|{identity['vid']:04X}:{identity['pid'] or 0:04X}|{identity.get('serial_number') or ''}"
+
+class BaudRateCache:
+    """
+    持久化的波特率缓存（JSON文件）
+    
+    按设备身份（串口路径 + USB VID/PID/序列号）保存最近一次成功连接的波特率和置信度。
+    同一个USB设备换了串口路径时，按 VID/PID/序列号 仍然可以找到。
+    文件在第一次访问时读取，每次修改后整体写回（先写临时文件再替换）。
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.lock = Lock()
+        self._entries = None  # 缓存键 -> 记录，第一次访问时从文件读取
+    
+    def _load(self):
+        """读取缓存文件（调用方需持有lock）"""
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f).get('entries', {})
+            if isinstance(entries, dict):
+                self._entries = entries
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("波特率缓存文件 %s 无法读取，将重新创建: %s", self.path, e)
+        return self._entries
+    
+    def _save(self):
+        """写回缓存文件（调用方需持有lock）"""
+        directory = os.path.dirname(self.path)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'entries': self._entries}, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("无法保存波特率缓存 %s: %s", self.path, e)
+    
+    def lookup(self, identity):
+        """
+        查找设备上次成功连接的波特率
+        
+        Args:
+            identity: device_identity() 返回的身份信息
+        
+        Returns:
+            dict: {'baudrate', 'confidence', 'updated', ...}，没有记录时返回None
+        """
+        with self.lock:
+            entries = self._load()
+            entry = entries.get(identity_key(identity))
+            if entry is None and identity.get('serial_number'):
+                # 同一个USB设备插到了其他接口上
+                matches = [e for e in entries.values()
+                           if (e.get('vid'), e.get('pid'), e.get('serial_number')) ==
+                           (identity['vid'], identity['pid'], identity['serial_number'])]
+                if matches:
+                    entry = max(matches, key=lambda e: e.get('updated', 0))
+            return dict(entry) if entry else None
+    
+    def store(self, identity, baudrate, confidence=None):
+        """
+        记录设备成功连接的波特率
+        
+        Args:
+            identity: device_identity() 返回的身份信息
+            baudrate: 波特率
+            confidence: 检测的置信度（0~1）
+        """
+        entry = dict(identity, baudrate=baudrate, confidence=confidence, updated=time.time())
+        with self.lock:
+            self._load()[identity_key(identity)] = entry
+            self._save()
+    
+    def forget(self, identity):
+        """删除设备的记录"""
+        with self.lock:
+            if self._load().pop(identity_key(identity), None) is not None:
+                self._save()
+    
+    def clear(self):
+        """删除所有记录"""
+        with self.lock:
+            self._entries = {}
+            self._save()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+性能基准测试
+
+使用固定随机种子生成的模拟数据流测试：
+1. SerialReceiver._process_data 的解析吞吐量（不同的每帧目标数、数据块大小和噪声比例）
+   以及其中 TextRecordDecoder 单独解码 bytes 和 memoryview 数据块的吞吐量
+2. 相邻框合并和垂直相连框筛选
+3. MultiPortManager.get_combined_objects
+4. ImageProcessor.draw_boxes
+
+每项结果包括耗时、吞吐量（MB/s、records/s 或 objects/s）和 tracemalloc 统计的内存分配，
+保存为JSON，便于比较不同版本的结果。
+
+用法:
+    python benchmark.py                       # 运行全部测试，结果保存到 benchmark_results.json
+    python benchmark.py --quick               # 缩小数据规模，用于快速检查
+    python benchmark.py --output new.json --compare old.json   # 与之前保存的结果比较
+"""
+
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+from mock_serial import MockSerial
+from metrics import LatencyTracer
+from pic import ImageProcessor
+from detection import detections_from_array
+from serial_receive import SerialReceiver, MultiPortManager, TextRecordDecoder, parse_detections
+
+DEFAULT_SEED = 12345
+OBJECT_COUNTS = (1, 5, 20)      # 每帧目标数
+CHUNK_SIZES = (16, 256, 4096)   # 每次交给 _process_data 的字节数
+NOISE_RATIOS = (0.0, 0.3)       # 噪声字节占数据流的比例
+
+def build_stream(seed, frames, objects_per_frame, noise_ratio=0.0):
+    """
+    生成可重复的模拟数据流
+    
+    每帧由 MockSerial._generate_detection_data 生成，帧之间插入不含记录关键字的噪声行，
+    直到噪声字节达到 noise_ratio 的比例。
+    
+    Args:
+        seed: 随机种子
+        frames: 帧数
+        objects_per_frame: 每帧目标数
+        noise_ratio: 噪声字节占数据流的比例（0~1）
+    
+    Returns:
+        tuple: (数据流字节, 记录数)
+    """
+    rng = random.Random(seed)
+    mock_serial = MockSerial("BENCHMARK")
+    parts = []
+    total = 0
+    noise = 0
+    for _ in range(frames):
+        frame = mock_serial._generate_detection_data(objects_per_frame, rng).encode('ascii')
+        parts.append(frame)
+        total += len(frame)
+        while noise_ratio > 0 and noise < noise_ratio * total:
+            line = rng.choice([
+                f"temp:{rng.uniform(20, 35):.1f}\n",
+                f"status:{rng.randint(0, 999)}\n",
+                "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ") for _ in range(rng.randint(4, 40))) + "\n",
+            ]).encode('ascii')
+            parts.append(line)
+            total += len(line)
+            noise += len(line)
+    return b"".join(parts), frames * objects_per_frame
+
+def measure(func, repeat):
+    """
+    测量函数的执行时间和内存分配
+    
+    先运行 repeat 次取最短耗时，再在 tracemalloc 下运行一次统计内存分配
+    （tracemalloc 会明显拖慢运行速度，因此不与计时同时进行）。
+    
+    Args:
+        func: 无参数函数，每次调用都从相同的初始状态开始
+        repeat: 计时的重复次数
+    
+    Returns:
+        dict: {seconds, peak_alloc_bytes, retained_blocks}
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        base, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return {'seconds': best, 'peak_alloc_bytes': max(peak - base, 0), 'retained_blocks': retained}
+
+def bench_parse(stream, chunk_size, repeat):
+    """测试 _process_data 按数据块解析整个数据流的吞吐量"""
+    chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+    parsed = []
+    
+    def run():
+        receiver = SerialReceiver()
+        receiver.latency_tracer = LatencyTracer()  # 同时统计追踪延迟的开销
+        for chunk in chunks:
+            receiver._process_data(chunk)
+        with receiver.process_lock:
+            receiver._reprocess_buffer()
+        parsed.append(receiver.get_metrics()['records_parsed'])
+    
+    result = measure(run, repeat)
+    result['bytes'] = len(stream)
+    result['records'] = parsed[-1]
+    result['mb_per_s'] = len(stream) / result['seconds'] / 1e6
+    result['records_per_s'] = parsed[-1] / result['seconds']
+    return result
+
+def bench_decode(stream, chunk_size, repeat, view=False):
+    """测试 TextRecordDecoder 按数据块解码整个数据流的吞吐量，view 为True时输入 memoryview"""
+    chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+    if view:
+        chunks = [memoryview(chunk) for chunk in chunks]
+    decoded = []
+    
+    def run():
+        decoder = TextRecordDecoder()
+        count = 0
+        for chunk in chunks:
+            count += len(decoder.feed(chunk))
+        decoded.append(count + len(decoder.flush()))
+    
+    result = measure(run, repeat)
+    result['bytes'] = len(stream)
+    result['records'] = decoded[-1]
+    result['mb_per_s'] = len(stream) / result['seconds'] / 1e6
+    return result
+
+def bench_objects(func, objects, repeat, calls=1):
+    """测试处理目标列表的函数，结果按目标数计算吞吐量"""
+    def run():
+        for _ in range(calls):
+            func(objects)
+    
+    result = measure(run, repeat)
+    result['objects'] = len(objects) * calls
+    result['objects_per_s'] = len(objects) * calls / result['seconds']
+    return result
+
+def bench_combined(objects, repeat, calls):
+    """测试 MultiPortManager.get_combined_objects"""
+    manager = MultiPortManager()
+    half = len(objects) // 2
+    for port_name, port_objects in (('port1', objects[:half]), ('port2', objects[half:])):
+        manager.add_port(port_name, f"BENCH_{port_name}")
+        manager.port_configs[port_name]['connected'] = True
+        receiver = manager.receivers[port_name]
+        receiver.object_data = list(port_objects)
+    
+    def run():
+        for _ in range(calls):
+            manager.get_combined_objects()
+    
+    result = measure(run, repeat)
+    result['objects'] = len(objects) * calls
+    result['calls_per_s'] = calls / result['seconds']
+    result['objects_per_s'] = len(objects) * calls / result['seconds']
+    return result
+
+def run_benchmarks(seed=DEFAULT_SEED, quick=False, repeat=3):
+    """
+    运行全部基准测试
+    
+    Args:
+        seed: 随机种子
+        quick: 为True时缩小数据规模
+        repeat: 每项测试计时的重复次数
+    
+    Returns:
+        dict: {'meta': 运行环境, 'results': 测试名称 -> 结果}
+    """
+    frames = 50 if quick else 1000
+    calls = 5 if quick else 50
+    results = {}
+    
+    for objects_per_frame in OBJECT_COUNTS:
+        for noise_ratio in NOISE_RATIOS:
+            stream, _ = build_stream(seed, max(frames // objects_per_frame, 1) * 5, objects_per_frame, noise_ratio)
+            for chunk_size in CHUNK_SIZES:
+                name = f"parse/objects={objects_per_frame},chunk={chunk_size},noise={noise_ratio}"
+                results[name] = bench_parse(stream, chunk_size, repeat)
+                print(f"  {name}: {results[name]['mb_per_s']:.2f} MB/s, "
+                      f"{results[name]['records_per_s']:.0f} records/s")
+                for view in (False, True):
+                    name = (f"decode/objects={objects_per_frame},chunk={chunk_size},noise={noise_ratio},"
+                            f"input={'memoryview' if view else 'bytes'}")
+                    results[name] = bench_decode(stream, chunk_size, repeat, view)
+                    print(f"  {name}: {results[name]['mb_per_s']:.2f} MB/s")
+    
+    receiver = SerialReceiver()
+    for count in (50, 500):
+        stream, _ = build_stream(seed, count, 1)
+        objects = detections_from_array(parse_detections(stream))
+        cases = {
+            f"merge_adjacent/objects={count}": lambda objs: receiver._merge_connected_objects(objs, 'adjacent'),
+            f"filter_vertical/objects={count}": lambda objs: receiver._filter_vertically_connected_boxes(list(objs)),
+            f"draw_boxes/objects={count}": ImageProcessor().draw_boxes,
+        }
+        for name, func in cases.items():
+            results[name] = bench_objects(func, objects, repeat, calls if count < 500 else max(calls // 10, 1))
+            print(f"  {name}: {results[name]['objects_per_s']:.0f} objects/s")
+        
+        name = f"combined_objects/objects={count}"
+        results[name] = bench_combined(objects, repeat, calls)
+        print(f"  {name}: {results[name]['calls_per_s']:.0f} calls/s")
+    
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'seed': seed,
+        'quick': quick,
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results}
+
+def compare_results(old, new):
+    """
+    比较两次运行的吞吐量
+    
+    Args:
+        old: 之前保存的结果
+        new: 本次结果
+    
+    Returns:
+        list: [(测试名称, 指标, 旧值, 新值, 新值/旧值), ...]
+    """
+    rows = []
+    for name, result in new['results'].items():
+        previous = old.get('results', {}).get(name)
+        if not previous:
+            continue
+        for key, value in result.items():
+            if key.endswith('_per_s') and previous.get(key):
+                rows.append((name, key, previous[key], value, value / previous[key]))
+    return rows
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="解析、合并和绘图的性能基准测试")
+    parser.add_argument('--output', default='benchmark_results.json', help="结果保存路径")
+    parser.add_argument('--compare', help="与之前保存的结果比较")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="随机种子")
+    parser.add_argument('--repeat', type=int, default=3, help="每项测试计时的重复次数")
+    parser.add_argument('--quick', action='store_true', help="缩小数据规模")
+    args = parser.parse_args()
+    
+    print("=== 性能基准测试 ===\n")
+    report = run_benchmarks(args.seed, args.quick, args.repeat)
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到 {args.output}")
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        print(f"\n与 {args.compare} 比较:")
+        for name, key, old_value, new_value, ratio in compare_results(old, report):
+            print(f"  {name} {key}: {old_value:.1f} -> {new_value:.1f} ({ratio:.2f}x)")
+    
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,3 +1,5 @@
+from detection import Detection
+
 class BoxProcessor:
     def __init__(self):
         self.boxes = []
@@ -23,14 +25,10 @@ class BoxProcessor:
         self.scores = []
     
     def get_boxes(self):
-        """获取所有检测框信息"""
+        """获取所有检测框信息（Detection 列表）"""
         results = []
         for i in range(len(self.boxes)):
-            results.append({
-                'class': self.classes[i],
-                'score': self.scores[i],
-                'bbox': self.boxes[i]
-            })
+            results.append(Detection(self.classes[i], self.scores[i], self.boxes[i]))
         return results
     
     def filter_by_score(self, min_score=50):
@@ -42,11 +40,7 @@ class BoxProcessor:
         filtered_results = []
         for i in range(len(self.boxes)):
             if self.scores[i] >= min_score:
-                filtered_results.append({
-                    'class': self.classes[i],
-                    'score': self.scores[i],
-                    'bbox': self.boxes[i]
-                })
+                filtered_results.append(Detection(self.classes[i], self.scores[i], self.boxes[i]))
         return filtered_results
     
     def filter_by_class(self, target_classes):
@@ -61,25 +55,22 @@ class BoxProcessor:
         filtered_results = []
         for i in range(len(self.boxes)):
             if self.classes[i] in target_classes:
-                filtered_results.append({
-                    'class': self.classes[i],
-                    'score': self.scores[i],
-                    'bbox': self.boxes[i]
-                })
+                filtered_results.append(Detection(self.classes[i], self.scores[i], self.boxes[i]))
         return filtered_results
     
     def update_from_objects(self, objects):
         """从对象列表更新检测框
         
         Args:
-            objects: 对象列表，每个对象包含class, score, bbox信息
+            objects: Detection 列表（也兼容包含class, score, bbox的字典）
         """
         self.clear_boxes()
         for obj in objects:
+            obj = Detection.from_object(obj)
             self.add_box(
-                obj['class'],
-                obj['score'],
-                obj['bbox']
+                obj.class_id,
+                obj.score,
+                obj.bbox
             )
     
     def get_statistics(self):
@@ -0,0 +1,424 @@
+from itertools import chain
+import numpy as np
+
+# 检测记录的结构化数组类型，字段顺序与解码器输出的记录一致
+DETECTION_DTYPE = np.dtype([
+    ('class', np.int64),
+    ('score', np.int64),
+    ('x1', np.int64),
+    ('y1', np.int64),
+    ('x2', np.int64),
+    ('y2', np.int64),
+])
+
+class Detection:
+    """
+    单个检测目标
+    
+    使用 __slots__ 存储，比 {'class', 'score', 'bbox'} 字典占用更少的内存，
+    在接收器、多端口管理器、框处理器和绘图之间直接传递同一个对象，不再反复复制字典。
+    为了兼容原有代码，仍支持 obj['class']、obj['bbox'] 和 obj.get(...) 形式的访问；
+    需要字典时（例如对外输出）调用 to_dict()。
+    trace 是延迟追踪记录（阶段名称 -> 时间），由 metrics.LatencyTracer 填写，不参与比较。
+    """
+    
+    __slots__ = ('class_id', 'score', 'bbox', 'source', 'trace')
+    
+    # 字典形式的键与属性的对应关系（source_port/port_name 是多端口模式下的来源端口）
+    KEY_MAP = {
+        'class': 'class_id',
+        'score': 'score',
+        'bbox': 'bbox',
+        'source': 'source',
+        'source_port': 'source',
+        'port_name': 'source',
+    }
+    
+    def __init__(self, class_id, score, bbox, source=None):
+        self.class_id = class_id
+        self.score = score
+        self.bbox = tuple(bbox)  # (xmin, ymin, xmax, ymax)
+        self.source = source     # 来源端口名称，单端口时为None
+        self.trace = None        # 延迟追踪记录
+    
+    @classmethod
+    def from_record(cls, record, source=None):
+        """
+        从解码器记录创建检测目标
+        
+        Args:
+            record: (class, score, x1, y1, x2, y2)
+            source: 来源端口名称
+        
+        Returns:
+            Detection: 检测目标
+        """
+        class_id, score, x1, y1, x2, y2 = record
+        return cls(class_id, score, (x1, y1, x2, y2), source)
+    
+    @classmethod
+    def from_object(cls, obj):
+        """
+        将字典或 Detection 转换为 Detection，已经是 Detection 时直接返回
+        
+        Args:
+            obj: Detection 或包含 class、score、bbox 的字典
+        
+        Returns:
+            Detection: 检测目标
+        """
+        if isinstance(obj, cls):
+            return obj
+        return cls(obj['class'], obj['score'], obj['bbox'],
+                   obj.get('source', obj.get('source_port')))
+    
+    def with_source(self, source):
+        """返回标记了来源端口的新检测目标，不修改原对象（共用延迟追踪记录）"""
+        detection = Detection(self.class_id, self.score, self.bbox, source)
+        detection.trace = self.trace
+        return detection
+    
+    def to_dict(self):
+        """转换为字典，有来源端口时同时包含 source_port 和 port_name"""
+        result = {'class': self.class_id, 'score': self.score, 'bbox': self.bbox}
+        if self.source is not None:
+            result['source_port'] = self.source
+            result['port_name'] = self.source
+        return result
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self.KEY_MAP[key])
+        except KeyError:
+            raise KeyError(key) from None
+    
+    def get(self, key, default=None):
+        """与 dict.get 相同，键不存在或来源为空时返回 default"""
+        attr = self.KEY_MAP.get(key)
+        if attr is None:
+            return default
+        value = getattr(self, attr)
+        return default if value is None else value
+    
+    def __eq__(self, other):
+        if not isinstance(other, Detection):
+            return NotImplemented
+        return (self.class_id == other.class_id and self.score == other.score and
+                self.bbox == other.bbox and self.source == other.source)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        source = f", source={self.source!r}" if self.source is not None else ""
+        return f"Detection(class={self.class_id}, score={self.score}, bbox={self.bbox}{source})"
+
+def detections_to_array(detections):
+    """
+    将检测目标转换为结构化数组，便于长时间保存或批量计算
+    
+    解码器输出的记录数组直接转换，不经过 Detection 对象；Detection 或字典列表
+    用 np.fromiter 依次填充全部字段，不逐个给结构化数组的元素赋值。
+    
+    Args:
+        detections: Detection 或字典列表，或记录数组（DETECTION_DTYPE 结构化数组或 N×6 整数数组）
+    
+    Returns:
+        np.ndarray: DETECTION_DTYPE 类型的一维结构化数组
+    """
+    if isinstance(detections, np.ndarray):
+        if detections.dtype == DETECTION_DTYPE:
+            return detections
+        values = np.ascontiguousarray(detections, dtype=np.int64)
+    else:
+        objects = [Detection.from_object(obj) for obj in detections]
+        fields = chain.from_iterable((obj.class_id, obj.score) + obj.bbox for obj in objects)
+        values = np.fromiter(fields, dtype=np.int64, count=len(objects) * len(DETECTION_DTYPE.names))
+    # 每行6个int64与结构化类型的内存布局相同，可以直接转换视图而不复制数据
+    return values.reshape(-1, len(DETECTION_DTYPE.names)).view(DETECTION_DTYPE).reshape(-1)
+
+def detections_from_array(array, source=None):
+    """
+    将结构化数组转换为检测目标列表
+    
+    Args:
+        array: DETECTION_DTYPE 类型的结构化数组
+        source: 来源端口名称
+    
+    Returns:
+        list: Detection 列表
+    """
+    return [Detection.from_record(record, source) for record in array.tolist()]
+
+class BoxGridIndex:
+    """
+    边界框的均匀网格索引
+    
+    坐标空间（0..255）被划分为 cell_size×cell_size 的网格，每个框登记在它覆盖的所有网格中。
+    查询"与某个框接触或重叠的框"时只需检查该框（加上间距）覆盖的网格，
+    不必与所有框逐个比较。查询结果是候选集合，调用方仍需用精确条件判断。
+    """
+    
+    def __init__(self, cell_size=16):
+        self.cell_size = cell_size
+        self.cells = {}  # (列, 行) -> 该网格中的键集合
+        self.boxes = {}  # 键 -> 边界框
+    
+    @classmethod
+    def from_boxes(cls, boxes, cell_size=16):
+        """以列表下标为键，为一组边界框建立索引"""
+        index = cls(cell_size)
+        for key, bbox in enumerate(boxes):
+            index.insert(key, bbox)
+        return index
+    
+    def __len__(self):
+        return len(self.boxes)
+    
+    def __contains__(self, key):
+        return key in self.boxes
+    
+    def _cells(self, bbox, margin=0):
+        """边界框（向外扩展margin像素后）覆盖的网格"""
+        xmin, ymin, xmax, ymax = bbox
+        size = self.cell_size
+        columns = range(int(xmin - margin) // size, int(xmax + margin) // size + 1)
+        rows = range(int(ymin - margin) // size, int(ymax + margin) // size + 1)
+        return [(column, row) for column in columns for row in rows]
+    
+    def insert(self, key, bbox):
+        """
+        登记一个边界框，键已存在时更新其位置
+        
+        Args:
+            key: 可哈希的键（例如列表下标）
+            bbox: 边界框 (xmin, ymin, xmax, ymax)
+        """
+        if key in self.boxes:
+            self.remove(key)
+        self.boxes[key] = bbox
+        for cell in self._cells(bbox):
+            self.cells.setdefault(cell, set()).add(key)
+    
+    def remove(self, key):
+        """移除一个边界框，键不存在时忽略"""
+        bbox = self.boxes.pop(key, None)
+        if bbox is None:
+            return
+        for cell in self._cells(bbox):
+            keys = self.cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.cells[cell]
+    
+    def clear(self):
+        """清空索引"""
+        self.cells.clear()
+        self.boxes.clear()
+    
+    def query(self, bbox, margin=0):
+        """
+        查询可能与边界框接触或重叠的框
+        
+        Args:
+            bbox: 边界框 (xmin, ymin, xmax, ymax)
+            margin: 允许的最大间距（像素），间距不超过该值的框一定包含在结果中
+        
+        Returns:
+            set: 候选框的键集合
+        """
+        result = set()
+        cells = self.cells
+        for cell in self._cells(bbox, margin):
+            keys = cells.get(cell)
+            if keys:
+                result |= keys
+        return result
+
+class DisjointSet:
+    """
+    并查集（不相交集合）
+    
+    使用路径压缩和按大小合并，合并和查找的均摊开销接近常数，
+    用于把相互连接（包括间接连接）的框分到同一组。
+    """
+    
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+    
+    def find(self, item):
+        """查找元素所在集合的代表元素"""
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]  # 路径减半
+            item = parent[item]
+        return item
+    
+    def union(self, item1, item2):
+        """
+        合并两个元素所在的集合
+        
+        Returns:
+            bool: 两个元素原来是否属于不同集合
+        """
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+        if root1 == root2:
+            return False
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+        return True
+    
+    def groups(self):
+        """
+        返回所有集合
+        
+        Returns:
+            list: 每个集合的元素列表（升序），集合按最小元素排序
+        """
+        groups = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+def group_connected_boxes(boxes, classes, is_adjacent, max_gap):
+    """
+    把同一类别且相邻的框分组，相邻关系可以传递（A与B相邻、B与C相邻时A、B、C为一组）
+    
+    Args:
+        boxes: 边界框列表
+        classes: 与 boxes 对应的类别列表
+        is_adjacent: 相邻判断函数 is_adjacent(box1, box2) -> bool
+        max_gap: is_adjacent 为真时两个框之间的最大间距（像素），用于网格索引查询
+    
+    Returns:
+        list: 分组列表，每组是框下标的升序列表，按组内最小下标排序
+    """
+    index = BoxGridIndex.from_boxes(boxes)
+    groups = DisjointSet(len(boxes))
+    
+    for i, box in enumerate(boxes):
+        for j in index.query(box, margin=max_gap):
+            if j <= i or classes[i] != classes[j]:
+                continue
+            # 已经在同一组中的框不必再判断
+            if groups.find(i) != groups.find(j) and is_adjacent(box, boxes[j]):
+                groups.union(i, j)
+    
+    return groups.groups()
+
+def detection_columns(detections):
+    """
+    取出检测目标列表的边界框、置信度和类别列
+    
+    Args:
+        detections: Detection 列表
+    
+    Returns:
+        tuple: (N×4 边界框数组, 置信度数组, 类别数组)
+    """
+    boxes = np.array([obj.bbox for obj in detections], dtype=np.float64).reshape(-1, 4)
+    scores = np.array([obj.score for obj in detections], dtype=np.float64)
+    classes = np.array([obj.class_id for obj in detections], dtype=np.int64)
+    return boxes, scores, classes
+
+def iou_matrix(boxes1, boxes2):
+    """
+    批量计算两组边界框两两之间的IoU（交并比）
+    
+    Args:
+        boxes1: N×4 边界框数组 (xmin, ymin, xmax, ymax)
+        boxes2: M×4 边界框数组
+    
+    Returns:
+        np.ndarray: N×M 的IoU矩阵，没有交集时为0
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    
+    # 利用广播一次计算所有框对的交集区域
+    inter_w = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2]) - np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    inter_h = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3]) - np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    inter_area = np.where((inter_w > 0) & (inter_h > 0), inter_w * inter_h, 0.0)
+    
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union_area = area1[:, None] + area2[None, :] - inter_area
+    
+    return np.divide(inter_area, union_area, out=np.zeros_like(inter_area), where=inter_area > 0)
+
+def suppress_replace(existing, new, threshold):
+    """
+    重叠替换策略：与任一新目标重叠的已有目标被移除，新目标全部保留
+    
+    Args:
+        existing: 已有的 Detection 列表
+        new: 新的 Detection 列表
+        threshold: IoU 超过该值视为重叠
+    
+    Returns:
+        tuple: (已有目标的保留掩码, 新目标的保留掩码)
+    """
+    existing_boxes = detection_columns(existing)[0]
+    new_boxes = detection_columns(new)[0]
+    overlap = iou_matrix(new_boxes, existing_boxes) > threshold
+    return ~overlap.any(axis=0), np.ones(len(new), dtype=bool)
+
+def _suppress_nms(existing, new, threshold, class_aware):
+    """
+    贪心非极大值抑制：按置信度从高到低保留目标，移除与已保留目标重叠的目标
+    
+    已有目标之间在之前的更新中已经过抑制，因此只需计算新目标相关的IoU；
+    与新目标都不重叠的已有目标直接保留，只有少量候选需要逐个比较。
+    置信度相同时优先保留新目标。
+    """
+    existing_boxes, existing_scores, existing_classes = detection_columns(existing)
+    new_boxes, new_scores, new_classes = detection_columns(new)
+    
+    cross = iou_matrix(new_boxes, existing_boxes) > threshold
+    within = iou_matrix(new_boxes, new_boxes) > threshold
+    if class_aware:
+        cross &= new_classes[:, None] == existing_classes[None, :]
+        within &= new_classes[:, None] == new_classes[None, :]
+    
+    keep_existing = np.ones(len(existing), dtype=bool)
+    keep_new = np.zeros(len(new), dtype=bool)
+    
+    # 候选: (是否为新目标, 索引)，按置信度降序排列，同分时新目标在前
+    candidates = [(True, i) for i in range(len(new))]
+    candidates += [(False, j) for j in np.flatnonzero(cross.any(axis=0)).tolist()]
+    candidates.sort(key=lambda c: (-(new_scores if c[0] else existing_scores)[c[1]], not c[0]))
+    
+    kept_new = []
+    kept_existing = []
+    for is_new, index in candidates:
+        if is_new:
+            suppressed = within[index, kept_new].any() or cross[index, kept_existing].any()
+            keep_new[index] = not suppressed
+            if not suppressed:
+                kept_new.append(index)
+        else:
+            suppressed = cross[kept_new, index].any()
+            keep_existing[index] = not suppressed
+            if not suppressed:
+                kept_existing.append(index)
+    
+    return keep_existing, keep_new
+
+def suppress_nms(existing, new, threshold):
+    """贪心NMS策略：不区分类别，重叠的目标只保留置信度最高的一个"""
+    return _suppress_nms(existing, new, threshold, class_aware=False)
+
+def suppress_class_nms(existing, new, threshold):
+    """按类别的贪心NMS策略：只在同一类别的目标之间进行抑制"""
+    return _suppress_nms(existing, new, threshold, class_aware=True)
+
+# 新目标与已有目标去重的抑制策略，可以添加签名相同的自定义策略
+SUPPRESSION_POLICIES = {
+    'replace': suppress_replace,
+    'nms': suppress_nms,
+    'class_nms': suppress_class_nms,
+}
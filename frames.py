@@ -0,0 +1,270 @@
+import time
+
+class Frame:
+    """
+    设备发出的一帧检测结果
+    
+    Attributes:
+        frame_id: 帧序号，由接收器在发布时分配，从1开始递增
+        timestamp: 发布时间（time.time()）
+        detections: 帧内的 Detection 列表
+        complete: 是否完整；不完整的帧（例如连接后收到的第一帧的后半部分、
+                  数据被丢弃时正在组装的帧）不会被发布
+    """
+    
+    __slots__ = ('frame_id', 'timestamp', 'detections', 'complete')
+    
+    def __init__(self, detections, complete=True):
+        self.frame_id = None
+        self.timestamp = None
+        self.detections = detections
+        self.complete = complete
+    
+    def __len__(self):
+        return len(self.detections)
+    
+    def __repr__(self):
+        return f"Frame(id={self.frame_id}, detections={len(self.detections)}, complete={self.complete})"
+
+class MarkerScanner:
+    """
+    在字节流中查找标记（可以跨越数据块）
+    
+    标记为固定的字节串，可选地后跟一个十进制数值（例如 b'frame:' 后跟记录数）。
+    """
+    
+    def __init__(self, tag, number=False):
+        if not tag:
+            raise ValueError("标记不能为空")
+        self.tag = bytes(tag)
+        self.number = number
+        self.reset()
+    
+    def reset(self):
+        """丢弃跨越数据块的部分匹配"""
+        self.tail = b''      # 上一个数据块末尾可能是标记前缀的字节
+        self.digits = None   # 正在读取数值时为已读取的数字
+    
+    def scan(self, data):
+        """
+        查找数据块中的标记
+        
+        Args:
+            data: 字节数据
+        
+        Returns:
+            list: [(标记结束位置, 数值), ...]，位置是标记（含数值）之后第一个字节在 data 中的下标，
+                  不带数值的标记数值为None
+        """
+        data = bytes(data)
+        markers = []
+        pos = 0
+        while True:
+            if self.digits is not None:
+                # 读取标记后的数值，遇到非数字字节时结束
+                end = pos
+                while end < len(data) and 48 <= data[end] <= 57:
+                    end += 1
+                self.digits += data[pos:end]
+                if end == len(data):
+                    return markers
+                markers.append((end, int(self.digits) if self.digits else 0))
+                self.digits = None
+                pos = end
+            
+            # 在上一个数据块的末尾和当前数据中查找标记
+            buffer = self.tail + data[pos:]
+            offset = pos - len(self.tail)
+            found = buffer.find(self.tag)
+            if found < 0:
+                keep = min(len(self.tag) - 1, len(buffer))
+                self.tail = buffer[len(buffer) - keep:] if keep else b''
+                return markers
+            self.tail = b''
+            pos = offset + found + len(self.tag)
+            if self.number:
+                self.digits = b''
+            else:
+                markers.append((pos, None))
+
+class FrameAssembler:
+    """
+    将解码出的记录组装成帧
+    
+    模式:
+        chunk:     每次解码得到的一批记录作为一帧（原来的行为，取决于数据块的划分）
+        delimiter: 数据流中的分隔符（默认空行）表示一帧结束
+        count:     帧头（默认 b'frame:' 后跟记录数）表示一帧开始，收齐指定数量的记录后帧结束
+        gap:       相邻记录的到达时间间隔超过 gap_chars 个字符的传输时间（至少 min_gap 秒）时开始新的一帧，
+                   第一个间隔之前的记录可能是一帧的后半部分，作为不完整的帧
+    
+    delimiter 和 count 模式下，接收器用 split() 在标记处切分数据，依次解码各部分并调用 mark()；
+    所有模式下解码出的记录通过 add() 加入当前帧。各方法返回已结束的帧列表，其中可能包含不完整的帧。
+    """
+    
+    MODES = ('chunk', 'delimiter', 'count', 'gap')
+    
+    def __init__(self, mode='chunk', delimiter=b'\n\n', header=b'frame:', gap_chars=3.5, min_gap=0.02):
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的分帧方式: {mode}")
+        self.mode = mode
+        self.gap_chars = gap_chars
+        self.min_gap = min_gap
+        self.scanner = None
+        if mode == 'delimiter':
+            self.scanner = MarkerScanner(delimiter)
+        elif mode == 'count':
+            self.scanner = MarkerScanner(header, number=True)
+        self.reset()
+    
+    def reset(self):
+        """
+        丢弃正在组装的帧和标记的部分匹配（数据流中断时调用）
+        
+        Returns:
+            list: 被丢弃的不完整帧（没有记录时为空列表）
+        """
+        frames = []
+        if getattr(self, 'current', None):
+            frames.append(Frame(self.current, complete=False))
+        self.current = []
+        self.expected = None      # count 模式下当前帧的记录数
+        self.synced = self.mode == 'chunk'  # 是否已看到帧边界，之前的记录属于不完整的帧
+        self.last_arrival = None  # gap 模式下最后一条记录的到达时间
+        if self.scanner:
+            self.scanner.reset()
+        return frames
+    
+    @property
+    def pending(self):
+        """是否有正在组装的帧"""
+        return bool(self.current)
+    
+    def gap_seconds(self, baudrate):
+        """gap 模式下的帧间隔（秒）：gap_chars 个字符（每字符10位）的传输时间，至少 min_gap"""
+        char_time = 10.0 / baudrate if baudrate else 0.0
+        return max(self.gap_chars * char_time, self.min_gap)
+    
+    def latest_frame_start(self, data):
+        """
+        积压的数据中最新的完整帧的起始位置（delimiter 和 count 模式，latest_only 跳过积压的数据时使用）
+        
+        最后一个帧标记之后的帧可能还没有收完，倒数第二个帧标记之后的帧一定已经收完。
+        返回该标记的起始位置：从标记开始解码时，组装器能与帧边界重新同步。
+        
+        Args:
+            data: 积压的数据
+        
+        Returns:
+            int: 起始位置，帧标记少于两个时为None
+        """
+        if self.scanner is None:
+            return None
+        tag = self.scanner.tag
+        last = data.rfind(tag)
+        start = data.rfind(tag, 0, last + len(tag) - 1) if last > 0 else -1
+        return start if start >= 0 else None
+    
+    def split(self, data):
+        """
+        在帧标记之后切分数据
+        
+        Args:
+            data: 字节数据
+        
+        Returns:
+            list: [(数据片段, 片段之后是否有标记, 标记中的数值), ...]，最后一个片段之后没有标记
+        """
+        if self.scanner is None:
+            return [(data, False, None)]
+        pieces = []
+        start = 0
+        for end, value in self.scanner.scan(data):
+            pieces.append((data[start:end], True, value))
+            start = end
+        pieces.append((data[start:], False, None))
+        return pieces
+    
+    def mark(self, value=None):
+        """
+        处理数据流中的帧标记
+        
+        Args:
+            value: count 模式下帧头中的记录数
+        
+        Returns:
+            list: 已结束的帧
+        """
+        frames = []
+        if self.mode == 'delimiter':
+            # 第一个分隔符之前的记录属于连接前已开始发送的帧
+            frames.append(Frame(self.current, complete=self.synced))
+            self.current = []
+            self.synced = True
+        elif self.mode == 'count':
+            if self.current:
+                frames.append(Frame(self.current, complete=False))
+                self.current = []
+            self.expected = value
+            self.synced = True
+            if value == 0:
+                frames.append(Frame([]))
+                self.expected = None
+        return frames
+    
+    def add(self, detections, arrival_times=None, baudrate=None):
+        """
+        将一批记录加入当前帧
+        
+        Args:
+            detections: Detection 列表
+            arrival_times: 每条记录的到达时间（gap 模式使用）
+            baudrate: 波特率（gap 模式使用）
+        
+        Returns:
+            list: 已结束的帧
+        """
+        if self.mode == 'chunk':
+            return [Frame(list(detections))] if detections else []
+        
+        frames = []
+        if self.mode == 'gap':
+            gap = self.gap_seconds(baudrate)
+            if arrival_times is None:
+                arrival_times = [time.perf_counter()] * len(detections)
+            for obj, arrived in zip(detections, arrival_times):
+                if self.current and arrived - self.last_arrival > gap:
+                    # 第一个间隔之前的记录属于连接（或数据中断）前已开始发送的帧
+                    frames.append(Frame(self.current, complete=self.synced))
+                    self.current = []
+                    self.synced = True
+                self.current.append(obj)
+                self.last_arrival = arrived
+            return frames
+        
+        for obj in detections:
+            # count 模式下还没有收到帧头，或者上一帧已收齐时，记录不属于任何完整的帧，遇到下一个帧头时丢弃
+            self.current.append(obj)
+            if self.mode == 'count' and self.expected is not None and len(self.current) >= self.expected:
+                frames.append(Frame(self.current))
+                self.current = []
+                self.expected = None
+        return frames
+    
+    def poll(self, now, baudrate):
+        """
+        gap 模式下检查当前帧是否已经空闲足够长的时间
+        
+        Args:
+            now: 当前时间（time.perf_counter()）
+            baudrate: 波特率
+        
+        Returns:
+            list: 已结束的帧
+        """
+        if self.mode == 'gap' and self.current and now - self.last_arrival > self.gap_seconds(baudrate):
+            frame = Frame(self.current, complete=self.synced)
+            self.current = []
+            self.synced = True
+            return [frame]
+        return []
@@ -1,6 +1,7 @@
 import sys
 import os
 import time
+import logging
 from threading import Thread
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
@@ -8,22 +9,34 @@ from PIL import Image, ImageTk
 import serial
 
 # 导入自定义模块
-from serial_receive import SerialReceiver, MultiPortManager
+from serial_receive import SerialReceiver, MultiPortManager, RECENT_DATA_LIMIT
 from pic import ImageProcessor
 from box import BoxProcessor
+from log_setup import setup_logging
+from metrics import LatencyTracer
+from baud_cache import BaudRateCache
+
+logger = logging.getLogger(__name__)
 
 class DetectionGUI:
-    def __init__(self, root):
+    def __init__(self, root, latency_tracer=None):
         self.root = root
         self.root.title("串口目标检测显示器")
         self.root.geometry("800x600")
         self.root.resizable(True, True)
         
         # 初始化模块
-        self.serial_receiver = SerialReceiver()
+        self.baud_cache = BaudRateCache()  # 记住设备的波特率，下次启动时快速连接
+        self.serial_receiver = SerialReceiver(baud_cache=self.baud_cache)
+        self.serial_receiver.recent_data_limit = RECENT_DATA_LIMIT  # 界面显示原始数据
         self.image_processor = ImageProcessor()
         self.box_processor = BoxProcessor()
         
+        # 端到端延迟追踪（--trace-latency），接收器和绘图使用同一个追踪器
+        self.latency_tracer = latency_tracer
+        self.serial_receiver.latency_tracer = latency_tracer
+        self.image_processor.latency_tracer = latency_tracer
+        
         # 创建空白图像
         self.image_processor.create_blank_image()
         
@@ -628,7 +641,7 @@ class DetectionGUI:
     def _update_status(self, message):
         """更新状态栏信息"""
         self.status_bar.config(text=message)
-        print(message)
+        logger.info("%s", message)
     
     def _update_loop(self):
         """图像更新循环线程"""
@@ -651,7 +664,7 @@ class DetectionGUI:
                         if "句柄无效" not in error_msg and "Handle is invalid" not in error_msg:
                             current_time = time.time()
                             if error_msg != last_error_msg or current_time - last_error_time > 5:
-                                print(f"更新图像时出错: {e}")
+                                logger.error("更新图像时出错: %s", e)
                                 last_error_msg = error_msg
                                 last_error_time = current_time
                 
@@ -663,7 +676,7 @@ class DetectionGUI:
                 if "句柄无效" not in error_msg and "Handle is invalid" not in error_msg:
                     current_time = time.time()
                     if error_msg != last_error_msg or current_time - last_error_time > 5:
-                        print(f"更新循环错误: {e}")
+                        logger.error("更新循环错误: %s", e)
                         last_error_msg = error_msg
                         last_error_time = current_time
                 
@@ -721,6 +734,9 @@ class DetectionGUI:
         self.is_running = False
         if self.serial_receiver:
             self.serial_receiver.disconnect()
+            # 输出本次运行的端到端延迟统计，便于判断画框滞后发生在哪个环节
+            if self.serial_receiver.latency_tracer is not None:
+                self.serial_receiver.latency_tracer.dump()
         self.root.destroy()
         
     def _start_serial_data_display(self):
@@ -737,7 +753,6 @@ class DetectionGUI:
         error_count = 0
         last_error_time = 0
         last_error_msg = ""
-        buffer_warning_time = 0
         current_time = time.time()
         
         while self.is_running:
@@ -747,21 +762,14 @@ class DetectionGUI:
                     time.sleep(0.5)
                     continue
                 
-                # 检查数据缓冲区大小，如果过大则提醒用户
-                current_time = time.time()
-                buffer_size = len(self.serial_receiver.data_buffer)
-                if buffer_size > 4096000000 and current_time - buffer_warning_time > 5:
-                    buffer_warning_time = current_time
-                    self._update_status(f"警告: 数据缓冲区过大 ({buffer_size} 字节)，可能需要清理")
-                
                 # 获取原始数据
                 try:
-                    raw_data = self.serial_receiver.data_buffer
+                    received_total, raw_data = self.serial_receiver.get_recent_data()
                     
-                    if len(raw_data) > self.last_data_length:  # 修改为使用类属性
+                    if received_total > self.last_data_length:  # 修改为使用类属性
                     # 新数据部分
-                        new_data = raw_data[self.last_data_length:]  # 修改为使用类属性
-                        self.last_data_length = len(raw_data)  # 修改为使用类属性
+                        new_data = raw_data[-(received_total - self.last_data_length):]  # 修改为使用类属性
+                        self.last_data_length = received_total  # 修改为使用类属性
                         
                         # 添加到数据列表
                         self.serial_data.append(new_data)
@@ -787,7 +795,7 @@ class DetectionGUI:
                     # 只有当错误消息变化或者距离上次错误超过5秒时才显示
                     if (error_msg != last_error_msg or current_time - last_error_time > 5) and \
                        "句柄无效" not in error_msg and "Handle is invalid" not in error_msg:
-                        print(f"读取串口缓冲区错误: {e}")
+                        logger.error("读取串口缓冲区错误: %s", e)
                         last_error_msg = error_msg
                         last_error_time = current_time
                     
@@ -800,7 +808,7 @@ class DetectionGUI:
                 
                 if (error_msg != last_error_msg or current_time - last_error_time > 5) and \
                    "句柄无效" not in error_msg and "Handle is invalid" not in error_msg:
-                    print(f"串口数据显示更新错误: {e}")
+                    logger.error("串口数据显示更新错误: %s", e)
                     last_error_msg = error_msg
                     last_error_time = current_time
                 
@@ -886,7 +894,7 @@ class DetectionGUI:
             # 记录原缓冲区大小用于显示
             buffer_size = 0
             with self.serial_receiver.data_lock:
-                buffer_size = len(self.serial_receiver.data_buffer)
+                buffer_size = len(self.serial_receiver.recent_data)
             
             # 使用SerialReceiver提供的方法清空所有数据
             self.serial_receiver.clear_objects()
@@ -922,7 +930,9 @@ class DetectionGUI:
         self.last_data_length = 0  # 添加这一行
         
         # 重新创建串口接收器实例
-        self.serial_receiver = SerialReceiver()
+        self.serial_receiver = SerialReceiver(baud_cache=self.baud_cache)
+        self.serial_receiver.recent_data_limit = RECENT_DATA_LIMIT  # 界面显示原始数据
+        self.serial_receiver.latency_tracer = self.latency_tracer
         
         # 重新初始化图像处理器
         self.image_processor.create_blank_image()
@@ -969,6 +979,8 @@ class MultiPortGUI:
         
         # 初始化多端口管理器
         self.port_manager = MultiPortManager(max_ports=2)
+        self.port_manager.recent_data_limit = RECENT_DATA_LIMIT
+        self.port_manager.baud_cache = BaudRateCache()  # 记住设备的波特率，下次启动时快速连接
         self.image_processor = ImageProcessor()
         self.box_processor = BoxProcessor()
         
@@ -1419,27 +1431,21 @@ class MultiPortGUI:
             filtered_objects = []
             
             if self.port1_show_var.get() and 'port1' in all_objects:
+                # 标记来源端口，绘制时按来源从 port_configs 中查找颜色
                 for obj in all_objects['port1']:
-                    obj_copy = obj.copy()
-                    obj_copy['color'] = self.port_configs['port1']['color']
-                    obj_copy['source'] = 'port1'
-                    filtered_objects.append(obj_copy)
+                    filtered_objects.append(obj.with_source('port1'))
             
             if self.port2_show_var.get() and 'port2' in all_objects:
                 for obj in all_objects['port2']:
-                    obj_copy = obj.copy()
-                    obj_copy['color'] = self.port_configs['port2']['color']
-                    obj_copy['source'] = 'port2'
-                    filtered_objects.append(obj_copy)
+                    filtered_objects.append(obj.with_source('port2'))
             
-            # 更新图像处理器的目标
-            self.box_processor.set_objects(filtered_objects)
+            # 更新框处理器的目标
+            self.box_processor.update_from_objects(filtered_objects)
             
-            # 绘制图像
-            result_image = self.image_processor.get_image()
-            if result_image:
-                # 在图像上绘制检测框
-                result_image = self.box_processor.draw_boxes_on_image(result_image, filtered_objects)
+            # 在图像上绘制检测框，每个端口的目标使用该端口的颜色
+            if self.image_processor.get_image():
+                source_colors = {port: config['color'] for port, config in self.port_configs.items()}
+                result_image = self.image_processor.draw_boxes(filtered_objects, source_colors=source_colors)
                 self._update_image_display(result_image)
                 
         except Exception as e:
@@ -1545,7 +1551,7 @@ class MultiPortGUI:
                         self._update_image()
                 
             except Exception as e:
-                print(f"更新循环异常: {e}")
+                logger.error("更新循环异常: %s", e)
             
             time.sleep(self.update_interval / 1000.0)
     
@@ -1593,14 +1599,22 @@ class MultiPortGUI:
         self.port_manager.stop_all_receiving()
         self.root.destroy()
 
-def main():
+def main(trace_latency=False):
+    """
+    启动单端口GUI
+    
+    Args:
+        trace_latency: 是否追踪端到端延迟，关闭窗口时输出统计
+    """
+    setup_logging()
     root = tk.Tk()
-    app = DetectionGUI(root)
+    app = DetectionGUI(root, LatencyTracer() if trace_latency else None)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
 
 def start_multi_port_gui():
     """启动多端口GUI"""
+    setup_logging()
     root = tk.Tk()
     gui = MultiPortGUI(root)
     
@@ -1615,4 +1629,4 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--multi":
         start_multi_port_gui()
     else:
-        main()
+        main(trace_latency="--trace-latency" in sys.argv[1:])
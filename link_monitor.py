@@ -0,0 +1,181 @@
+import time
+from collections import deque
+
+# 可打印字节（32~126 以及制表符、换行和回车），与波特率检测的质量评分一致
+PRINTABLE_BYTES = bytes(range(32, 127)) + b'\t\n\r'
+# 大于0x7F的字节，ASCII解码时替换为U+FFFD，波特率不匹配或线路噪声时大量出现
+INVALID_BYTES = bytes(range(128, 256))
+
+LINK_EVENTS = ('degraded', 'recovered', 'redetected', 'redetect_failed')
+
+class LinkQualityMonitor:
+    """
+    在线链路质量监测
+    
+    按数据块记录字节数、可打印字节数、无效字节数和解析出的记录数，在 window 秒的滑动窗口内
+    增量维护总和，计算可打印字符比例、无效字节比例、每KB数据解析出的记录数和字节速率。
+    窗口内的数据少于 min_bytes 时（例如设备空闲）不做判断。
+    
+    状态带滞后：
+        good -> degraded: 任一指标越过进入阈值（printable_ratio < min_printable、
+                          replacement_rate > max_replacement 或 records_per_kb < min_records_per_kb）
+                          并持续 degrade_time 秒，且距上次进入 degraded 超过 cooldown 秒
+        degraded -> good: 所有指标都达到更严格的恢复阈值
+    文本类指标只在文本协议下检查，二进制协议只检查解析出的记录数。
+    records_per_kb 只在曾经解析出记录之后检查：设备发送的不是检测数据时记录数一直为0，这不是链路问题。
+    """
+    
+    def __init__(self, window=3.0, min_bytes=256, degrade_time=2.0, cooldown=10.0):
+        self.window = window
+        self.min_bytes = min_bytes
+        self.degrade_time = degrade_time
+        self.cooldown = cooldown
+        self.min_printable = 0.8           # 可打印字符比例低于该值视为异常
+        self.recover_printable = 0.9
+        self.max_replacement = 0.05        # 无效字节比例高于该值视为异常
+        self.recover_replacement = 0.02
+        self.min_records_per_kb = 0.5      # 每KB解析出的记录数低于该值视为异常（解析器什么都匹配不到）
+        self.recover_records_per_kb = 1.0
+        self.events = deque(maxlen=100)    # 最近的事件 {'time', 'event', 'reasons', 'stats'}
+        self.records_seen = False          # 是否解析出过记录，之前没有时不检查 records_per_kb
+        self._last_degraded = None         # 上次进入 degraded 的时间，重新连接后冷却时间仍然有效
+        self.reset()
+    
+    def reset(self):
+        """清空窗口并回到 good 状态（重新连接后调用），保留事件记录、冷却时间和 records_seen"""
+        self._entries = deque()  # (时间, 字节数, 可打印字节数, 无效字节数, 记录数)
+        self._bytes = 0
+        self._printable = 0
+        self._invalid = 0
+        self._records = 0
+        self.state = 'good'
+        self._bad_since = None
+    
+    def record(self, data, records, now=None):
+        """
+        记录一个已解码的数据块（处理线程调用）
+        
+        Args:
+            data: 原始字节数据
+            records: 从中解析出的记录数
+            now: 当前时间（time.perf_counter()），默认取当前时间
+        """
+        now = time.perf_counter() if now is None else now
+        data = bytes(data)
+        size = len(data)
+        printable = size - len(data.translate(None, PRINTABLE_BYTES))
+        invalid = size - len(data.translate(None, INVALID_BYTES))
+        self._entries.append((now, size, printable, invalid, records))
+        self._bytes += size
+        self._printable += printable
+        self._invalid += invalid
+        self._records += records
+        if records:
+            self.records_seen = True
+        self._expire(now)
+    
+    def _expire(self, now):
+        """移除滑动窗口之外的数据块"""
+        while self._entries and now - self._entries[0][0] > self.window:
+            _, size, printable, invalid, records = self._entries.popleft()
+            self._bytes -= size
+            self._printable -= printable
+            self._invalid -= invalid
+            self._records -= records
+    
+    def snapshot(self, now=None):
+        """
+        获取滑动窗口内的链路质量指标
+        
+        Args:
+            now: 当前时间（time.perf_counter()）
+        
+        Returns:
+            dict: {state, bytes, bytes_per_s, records, printable_ratio, replacement_rate, records_per_kb}，
+                  窗口内没有数据时各比例为None
+        """
+        now = time.perf_counter() if now is None else now
+        self._expire(now)
+        size = self._bytes
+        span = now - self._entries[0][0] if self._entries else 0.0
+        return {
+            'state': self.state,
+            'bytes': size,
+            'bytes_per_s': size / max(span, self.window) if size else 0.0,
+            'records': self._records,
+            'printable_ratio': self._printable / size if size else None,
+            'replacement_rate': self._invalid / size if size else None,
+            'records_per_kb': self._records * 1024 / size if size else None,
+        }
+    
+    def _problems(self, stats, text, recovering):
+        """返回越过阈值的指标名称列表，recovering 为True时使用恢复阈值"""
+        problems = []
+        if text:
+            if stats['printable_ratio'] < (self.recover_printable if recovering else self.min_printable):
+                problems.append('printable_ratio')
+            if stats['replacement_rate'] > (self.recover_replacement if recovering else self.max_replacement):
+                problems.append('replacement_rate')
+        if self.records_seen and \
+                stats['records_per_kb'] < (self.recover_records_per_kb if recovering else self.min_records_per_kb):
+            problems.append('records_per_kb')
+        return problems
+    
+    def update(self, now=None, text=True):
+        """
+        根据当前窗口更新状态（处理线程定期调用）
+        
+        Args:
+            now: 当前时间（time.perf_counter()）
+            text: 是否检查文本类指标（二进制协议下为False）
+        
+        Returns:
+            str: 状态变化时返回事件 'degraded' 或 'recovered'，否则返回None
+        """
+        now = time.perf_counter() if now is None else now
+        stats = self.snapshot(now)
+        if stats['bytes'] < self.min_bytes:
+            self._bad_since = None
+            return None
+        
+        if self.state == 'good':
+            problems = self._problems(stats, text, recovering=False)
+            if not problems:
+                self._bad_since = None
+                return None
+            if self._bad_since is None:
+                self._bad_since = now
+            if now - self._bad_since < self.degrade_time:
+                return None
+            if self._last_degraded is not None and now - self._last_degraded < self.cooldown:
+                return None
+            self.state = 'degraded'
+            self._last_degraded = now
+            self._bad_since = None
+            return self.add_event('degraded', problems, stats, now)
+        
+        if not self._problems(stats, text, recovering=True):
+            self.state = 'good'
+            return self.add_event('recovered', [], stats, now)
+        return None
+    
+    def add_event(self, event, reasons=(), stats=None, now=None):
+        """
+        记录一个事件
+        
+        Args:
+            event: LINK_EVENTS 中的事件名称
+            reasons: 原因（越过阈值的指标名称等）
+            stats: 事件发生时的指标
+            now: 事件时间（time.perf_counter()）
+        
+        Returns:
+            str: 事件名称
+        """
+        self.events.append({
+            'time': time.perf_counter() if now is None else now,
+            'event': event,
+            'reasons': list(reasons),
+            'stats': stats if stats is not None else self.snapshot(now),
+        })
+        return event
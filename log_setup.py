@@ -0,0 +1,123 @@
+import sys
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from threading import Lock
+
+DEFAULT_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+class RateLimitFilter(logging.Filter):
+    """
+    重复日志限流
+    
+    同一条日志语句（按记录器名称和未格式化的消息模板区分）在 interval 秒内最多输出 burst 条，
+    超出的部分被丢弃；下一个时间窗口的第一条日志会注明上个窗口中被抑制的条数。
+    过滤在调用线程中进行，被抑制的日志不会进入队列，也不会被格式化。
+    """
+    
+    def __init__(self, burst=20, interval=1.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}  # (记录器名称, 消息模板) -> [窗口开始时间, 已输出条数, 已抑制条数]
+        self._lock = Lock()
+    
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+        
+        if suppressed:
+            record.msg = f"{record.msg} （已抑制 {suppressed} 条相同日志）"
+        return True
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    把日志记录原样放入队列
+    
+    标准 QueueHandler 会在调用线程中格式化消息；这里把格式化也留给后台线程，
+    调用线程只需创建记录并放入队列，不会被字符串格式化和终端输出阻塞。
+    """
+    
+    def prepare(self, record):
+        return record
+
+_handler = None
+_listener = None
+_setup_lock = Lock()
+
+def setup_logging(level=logging.INFO, module_levels=None, stream=None, fmt=DEFAULT_FORMAT,
+                  burst=20, interval=1.0):
+    """
+    配置日志：调用线程只把记录放入队列，由后台线程格式化并输出
+    
+    重复调用时替换之前的配置。
+    
+    Args:
+        level: 全局日志级别
+        module_levels: 各模块的日志级别，例如 {'serial_receive': logging.DEBUG, 'pic': 'WARNING'}
+        stream: 输出流，默认为标准输出
+        fmt: 日志格式
+        burst: 限流时间窗口内同一条日志最多输出的条数
+        interval: 限流时间窗口（秒）
+    """
+    global _handler, _listener
+    
+    with _setup_lock:
+        _stop_listener()
+        
+        log_queue = queue.SimpleQueue()
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(logging.Formatter(fmt))
+        
+        _handler = DeferredQueueHandler(log_queue)
+        _handler.addFilter(RateLimitFilter(burst, interval))
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        
+        root = logging.getLogger()
+        root.addHandler(_handler)
+        root.setLevel(level)
+        
+        for name, module_level in (module_levels or {}).items():
+            logging.getLogger(name).setLevel(module_level)
+
+def set_module_level(name, level):
+    """
+    设置单个模块的日志级别
+    
+    Args:
+        name: 模块名称，例如 'serial_receive'
+        level: 日志级别（logging.DEBUG 或 'DEBUG' 等）
+    """
+    logging.getLogger(name).setLevel(level)
+
+def shutdown_logging():
+    """输出队列中剩余的日志并停止后台线程"""
+    with _setup_lock:
+        _stop_listener()
+
+def _stop_listener():
+    """移除队列处理器并停止后台线程（调用方需持有_setup_lock）"""
+    global _handler, _listener
+    
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
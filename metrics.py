@@ -0,0 +1,382 @@
+import time
+import json
+import logging
+from bisect import bisect_left
+from collections import deque
+from threading import Lock, local
+
+logger = logging.getLogger(__name__)
+
+# 直方图的桶上界（秒）：1μs 到约 1s，按2倍递增
+DEFAULT_BOUNDS = tuple(1e-6 * 2 ** i for i in range(21))
+
+class Histogram:
+    """
+    固定分桶的直方图
+    
+    只保存每个桶的计数以及总数、总和和最大值，记录一次只需一次二分查找，
+    百分位数按桶的上界估算。
+    """
+    
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)  # 最后一个桶记录超过最大上界的值
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, value):
+        """记录一个值"""
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+    
+    def merge(self, other):
+        """合并另一个分桶相同的直方图"""
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+    
+    def percentile(self, fraction):
+        """
+        估算百分位数
+        
+        Args:
+            fraction: 0~1 之间的比例，例如 0.95
+        
+        Returns:
+            float: 该百分位所在桶的上界（不超过记录到的最大值），没有记录时为0
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target and count:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+    
+    def snapshot(self):
+        """返回统计结果字典"""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+class _MetricsShard:
+    """一个线程的计数器和直方图，只由该线程修改"""
+    
+    __slots__ = ('counters', 'histograms')
+    
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+class Metrics:
+    """
+    线程安全的计数器和直方图集合
+    
+    每个线程更新自己的一组计数器和直方图（threading.local），更新时不加锁；
+    snapshot() 在锁内汇总所有线程的数据，返回某一时刻所有指标的副本。
+    汇总时读取的是其他线程正在更新的数据，同一次快照中的各个指标之间可能相差一两次更新。
+    """
+    
+    def __init__(self, counters=(), histograms=()):
+        self._lock = Lock()  # 保护 _shards 列表
+        self._names = tuple(counters)
+        self._histogram_names = tuple(histograms)
+        self._maxima = set()  # 用 set_max 更新的计数器，汇总时取最大值而不是求和
+        self._local = local()
+        self._shards = []
+    
+    def _shard(self):
+        """当前线程的计数器和直方图，第一次使用时创建（更新方法先直接读取 _local.shard，没有时才调用）"""
+        local_data = self._local
+        shard = getattr(local_data, 'shard', None)
+        if shard is None:
+            shard = local_data.shard = _MetricsShard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+    
+    def increment(self, name, value=1):
+        """计数器加上value"""
+        try:
+            counters = self._local.shard.counters
+        except AttributeError:
+            counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + value
+    
+    def set_max(self, name, value):
+        """记录最大值（例如缓冲区的最高水位）"""
+        self._maxima.add(name)
+        try:
+            counters = self._local.shard.counters
+        except AttributeError:
+            counters = self._shard().counters
+        if value > counters.get(name, 0):
+            counters[name] = value
+    
+    def observe(self, name, value):
+        """向直方图记录一个值"""
+        try:
+            histograms = self._local.shard.histograms
+        except AttributeError:
+            histograms = self._shard().histograms
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram()
+        histogram.record(value)
+    
+    def reset(self):
+        """清零所有指标（各线程下次更新时使用新的计数器和直方图）"""
+        with self._lock:
+            self._local = local()
+            self._shards = []
+    
+    def _aggregate(self):
+        """
+        汇总所有线程的计数器和直方图
+        
+        Returns:
+            tuple: (计数器名称 -> 数值, 直方图名称 -> Histogram 副本)
+        """
+        counters = dict.fromkeys(self._names, 0)
+        histograms = {name: Histogram() for name in self._histogram_names}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for name, value in dict(shard.counters).items():
+                if name in self._maxima:
+                    counters[name] = max(counters.get(name, 0), value)
+                else:
+                    counters[name] = counters.get(name, 0) + value
+            for name, histogram in dict(shard.histograms).items():
+                histograms.setdefault(name, Histogram(histogram.bounds)).merge(histogram)
+        return counters, histograms
+    
+    def merge(self, other):
+        """把另一个 Metrics 的计数和直方图累加到当前对象（用于多端口汇总）"""
+        counters, histograms = other._aggregate()
+        shard = self._shard()
+        for name, value in counters.items():
+            if name.endswith('_high_water'):
+                self.set_max(name, value)
+            else:
+                shard.counters[name] = shard.counters.get(name, 0) + value
+        for name, histogram in histograms.items():
+            shard.histograms.setdefault(name, Histogram(histogram.bounds)).merge(histogram)
+    
+    def snapshot(self):
+        """
+        返回所有指标的副本
+        
+        Returns:
+            dict: 计数器名称 -> 数值，直方图名称 -> {count, mean, max, p50, p95, p99}（单位：秒）
+        """
+        counters, histograms = self._aggregate()
+        result = dict(counters)
+        for name, histogram in histograms.items():
+            result[name] = histogram.snapshot()
+        return result
+
+class TimedLock:
+    """
+    记录持有时间的锁
+    
+    与 threading.Lock 用法相同（支持 with 语句）。每 sample_interval 次持有记录一次持有时间
+    （第一次持有总是记录）到 metrics 的直方图中，用于判断界面读取和数据处理之间是否存在锁竞争；
+    其余的持有不读取时钟，也不更新直方图。
+    """
+    
+    def __init__(self, metrics, name='lock_hold_time', sample_interval=64):
+        self._lock = Lock()
+        self._metrics = metrics
+        self._name = name
+        self._sample_interval = sample_interval
+        self._acquisitions = 0  # 持有次数，只在持有锁时修改
+        self._acquired_at = None  # 本次持有需要记录时为获得锁的时间
+    
+    def acquire(self, blocking=True, timeout=-1):
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            sampled = self._acquisitions % self._sample_interval == 0
+            self._acquisitions += 1
+            self._acquired_at = time.perf_counter() if sampled else None
+        return acquired
+    
+    def release(self):
+        acquired_at = self._acquired_at
+        if acquired_at is None:
+            self._lock.release()
+            return
+        held = time.perf_counter() - acquired_at
+        self._lock.release()
+        self._metrics.observe(self._name, held)
+    
+    def locked(self):
+        return self._lock.locked()
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+# 延迟追踪的阶段，按数据流经的顺序排列：
+# arrived  记录最后一个字节到达串口的时间（根据读取时间和波特率估算）
+# read     接收线程读到该数据块的时间
+# parsed   处理线程解析出该目标的时间
+# fetched  目标第一次被 get_all_objects/get_detected_objects 取走的时间
+# drawn    目标第一次被绘制到图像上的时间
+TRACE_STAGES = ('arrived', 'read', 'parsed', 'fetched', 'drawn')
+
+class RollingPercentiles:
+    """最近 window 个值的滑动百分位数"""
+    
+    def __init__(self, window=1000):
+        self.values = deque(maxlen=window)
+        self.count = 0  # 累计记录的值的个数（包括已滑出窗口的）
+    
+    def add(self, value):
+        """记录一个值"""
+        self.values.append(value)
+        self.count += 1
+    
+    def snapshot(self):
+        """
+        返回窗口内的统计结果
+        
+        Returns:
+            dict: {count, window, p50, p95, p99, max}，count 为累计个数，window 为窗口内的个数
+        """
+        values = sorted(self.values)
+        result = {'count': self.count, 'window': len(values)}
+        for key, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            result[key] = values[min(int(fraction * len(values)), len(values) - 1)] if values else 0.0
+        result['max'] = values[-1] if values else 0.0
+        return result
+
+class LatencyTracer:
+    """
+    端到端延迟追踪
+    
+    每个 Detection 的 trace 字典记录它经过各阶段的时间（time.perf_counter()），
+    每个阶段只记录第一次到达的时间；到达某一阶段时统计与上一个已记录阶段之间的延迟，
+    到达最后一个阶段时再统计总延迟。统计结果是最近 window 个值的滑动百分位数，
+    可用于判断延迟主要产生在哪一个环节。
+    """
+    
+    def __init__(self, window=1000, stages=TRACE_STAGES):
+        self.window = window
+        self.stages = stages
+        self.enabled = True
+        self._lock = Lock()
+        self._stats = {}
+    
+    def start(self, detections, arrived, read, parsed=None):
+        """
+        为新解析出的目标建立追踪记录
+        
+        Args:
+            detections: Detection 列表
+            arrived: 每个目标的估算到达时间（与 detections 一一对应）
+            read: 每个目标所在数据块的读取时间
+            parsed: 解析完成时间，默认为当前时间
+        """
+        if not self.enabled or not detections:
+            return
+        if parsed is None:
+            parsed = time.perf_counter()
+        samples = []
+        for obj, arrived_at, read_at in zip(detections, arrived, read):
+            obj.trace = {'arrived': arrived_at, 'read': read_at, 'parsed': parsed}
+            samples.append((read_at - arrived_at, parsed - read_at))
+        with self._lock:
+            read_stats = self._get_stats('arrived->read')
+            parsed_stats = self._get_stats('read->parsed')
+            for read_latency, parse_latency in samples:
+                read_stats.add(read_latency)
+                parsed_stats.add(parse_latency)
+    
+    def mark(self, detections, stage, timestamp=None):
+        """
+        记录目标到达某一阶段
+        
+        已经记录过该阶段的目标和没有追踪记录的目标（例如测试用的字典）会被跳过。
+        
+        Args:
+            detections: Detection 列表
+            stage: 阶段名称，TRACE_STAGES 中的一个
+            timestamp: 到达时间，默认为当前时间
+        """
+        if not self.enabled:
+            return
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        index = self.stages.index(stage)
+        samples = []
+        for obj in detections:
+            trace = getattr(obj, 'trace', None)
+            if trace is None or stage in trace:
+                continue
+            trace[stage] = timestamp
+            for previous in reversed(self.stages[:index]):
+                if previous in trace:
+                    samples.append((f"{previous}->{stage}", timestamp - trace[previous]))
+                    break
+            if index == len(self.stages) - 1 and self.stages[0] in trace:
+                samples.append(('total', timestamp - trace[self.stages[0]]))
+        if samples:
+            with self._lock:
+                for name, latency in samples:
+                    self._get_stats(name).add(latency)
+    
+    def _get_stats(self, name):
+        """取得某一段延迟的统计（调用方需持有_lock）"""
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = RollingPercentiles(self.window)
+        return stats
+    
+    def summary(self):
+        """
+        返回各段延迟的统计
+        
+        Returns:
+            dict: 'arrived->read'、'read->parsed' 等 -> {count, window, p50, p95, p99, max}（单位：秒），
+                  'total' 为 arrived 到 drawn 的总延迟
+        """
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in self._stats.items()}
+    
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self._stats = {}
+    
+    def dump(self, stream=None):
+        """
+        输出延迟统计
+        
+        Args:
+            stream: 可写的文本流，给出时写入JSON；否则按毫秒写入日志
+        """
+        summary = self.summary()
+        if stream is not None:
+            json.dump(summary, stream, indent=2, ensure_ascii=False)
+            return
+        for name, stats in summary.items():
+            logger.info("延迟 %s: p50 %.2f ms, p95 %.2f ms, p99 %.2f ms, 最大 %.2f ms (%s 个)",
+                        name, stats['p50'] * 1000, stats['p95'] * 1000, stats['p99'] * 1000,
+                        stats['max'] * 1000, stats['count'])
@@ -13,6 +13,8 @@ class MockSerial:
         self.in_waiting = 0
         self.data_buffer = bytearray()
         self.lock = threading.Lock()
+        self.data_available = threading.Condition(self.lock)  # 用于模拟带超时的阻塞读取
+        self.read_cancelled = False
         self.auto_generate = False
         self.generate_thread = None
         self.stop_generate = False
@@ -27,10 +29,21 @@ class MockSerial:
         """关闭模拟串口"""
         self.is_open = False
         self.stop_auto_generate()
+        self.cancel_read()
+    
+    def cancel_read(self):
+        """中断正在阻塞的读取"""
+        with self.lock:
+            self.read_cancelled = True
+            self.data_available.notify_all()
     
     def read(self, size=1):
-        """读取指定大小的数据"""
+        """读取指定大小的数据，缓冲区为空时与真实串口一样最多等待timeout秒"""
         with self.lock:
+            if not self.data_buffer and self.timeout and not self.read_cancelled:
+                self.data_available.wait_for(lambda: self.data_buffer or self.read_cancelled, timeout=self.timeout)
+            self.read_cancelled = False
+            
             if not self.data_buffer:
                 return b''
             
@@ -63,6 +76,7 @@ class MockSerial:
         with self.lock:
             self.data_buffer.extend(data)
             self.in_waiting = len(self.data_buffer)
+            self.data_available.notify_all()
     
     def start_auto_generate(self, interval=0.5, data_mode="generic"):
         """开始自动生成测试数据"""
@@ -88,27 +102,35 @@ class MockSerial:
             # 根据模式选择数据生成方法
             if hasattr(self, 'data_mode') and self.data_mode == "detection":
                 test_data = self._generate_detection_data()
+            elif hasattr(self, 'data_mode') and self.data_mode == "binary_detection":
+                test_data = self._generate_binary_detection_data()
             else:
                 test_data = self._generate_generic_data()
             
             self.add_data(test_data)
             time.sleep(interval)
     
-    def _generate_detection_data(self):
-        """生成模拟的目标检测数据"""
-        # 随机生成1-3个目标
-        num_objects = random.randint(1, 3)
+    def _generate_detection_data(self, num_objects=None, rng=random):
+        """
+        生成模拟的目标检测数据
+        
+        Args:
+            num_objects: 目标数量，默认随机生成1-3个
+            rng: 随机数生成器，传入 random.Random(seed) 可生成可重复的数据
+        """
+        if num_objects is None:
+            num_objects = rng.randint(1, 3)
         data_parts = []
         
         for _ in range(num_objects):
-            obj_class = random.randint(0, 5)
-            score = random.randint(60, 99)
+            obj_class = rng.randint(0, 5)
+            score = rng.randint(60, 99)
             
             # 生成合理的边界框坐标
-            x1 = random.randint(0, 200)
-            y1 = random.randint(0, 200)
-            x2 = x1 + random.randint(20, 55)
-            y2 = y1 + random.randint(20, 55)
+            x1 = rng.randint(0, 200)
+            y1 = rng.randint(0, 200)
+            x2 = x1 + rng.randint(20, 55)
+            y2 = y1 + rng.randint(20, 55)
             
             # 确保坐标在255范围内
             x2 = min(x2, 255)
@@ -119,6 +141,25 @@ class MockSerial:
         
         return "".join(data_parts)
     
+    def _generate_binary_detection_data(self):
+        """生成模拟的二进制目标检测帧"""
+        from serial_receive import BinaryFrameDecoder
+        
+        records = []
+        for _ in range(random.randint(1, 3)):
+            x1 = random.randint(0, 200)
+            y1 = random.randint(0, 200)
+            records.append((
+                random.randint(0, 5),
+                random.randint(60, 99),
+                x1,
+                y1,
+                min(x1 + random.randint(20, 55), 255),
+                min(y1 + random.randint(20, 55), 255)
+            ))
+        
+        return BinaryFrameDecoder.encode(records)
+    
     def _generate_generic_data(self):
         """生成通用的串口测试数据"""
         data_types = [
@@ -158,6 +199,81 @@ class MockSerial:
                     parts.append(random.choice(["OK", "ERROR", "READY", "BUSY"]))
             return "\n".join(parts) + "\n"
 
+SIMULATED_RECORD = b"class:1\nscore:85\nbbox:50\nbbox:60\nbbox:100\nbbox:120\n"
+
+class SimulatedLink:
+    """
+    模拟以固定波特率发送检测数据的设备
+    
+    以设备的波特率打开时收到正常的文本记录，以其他波特率打开时收到随机字节（模拟采样错位产生的乱码）。
+    port_baudrates 可以为各串口路径指定不同的设备波特率，波特率为None的设备不发送任何数据。
+    """
+    
+    def __init__(self, device_baudrate, byte_rate=2000, port_baudrates=None):
+        self.device_baudrate = device_baudrate
+        self.byte_rate = byte_rate
+        self.port_baudrates = port_baudrates or {}
+        self.opened = []  # 依次打开时使用的波特率
+        self.ports = []   # 依次打开的串口路径
+    
+    def __call__(self, port=None, baudrate=9600, timeout=1):
+        self.opened.append(baudrate)
+        self.ports.append(port)
+        return SimulatedSerial(self, baudrate, self.port_baudrates.get(port, self.device_baudrate), timeout)
+    
+    def install(self):
+        """替换 serial_receive 使用的 serial.Serial，返回恢复函数"""
+        import serial_receive
+        module = serial_receive.serial  # patch_serial() 之后 sys.modules 中的 serial 可能已被替换
+        original = module.Serial
+        module.Serial = self
+        
+        def restore():
+            module.Serial = original
+        
+        return restore
+
+class SimulatedSerial:
+    """SimulatedLink 打开的串口，数据按字节速率随时间到达"""
+    
+    def __init__(self, link, baudrate, device_baudrate, timeout=None):
+        self.link = link
+        self.baudrate = baudrate
+        self.timeout = timeout
+        rng = random.Random(baudrate)
+        if device_baudrate is None:
+            self.stream = b''
+        elif baudrate == device_baudrate:
+            self.stream = SIMULATED_RECORD * 200
+        else:
+            self.stream = bytes(rng.randrange(256) for _ in range(len(SIMULATED_RECORD) * 200))
+        self.start_time = time.time()
+        self.consumed = 0
+        self.is_open = True
+    
+    @property
+    def in_waiting(self):
+        arrived = min(int((time.time() - self.start_time) * self.link.byte_rate), len(self.stream))
+        return arrived - self.consumed
+    
+    def read(self, size=1):
+        """与真实串口一样等待 size 个字节到达，最多等待 timeout 秒"""
+        if self.in_waiting < size and self.timeout:
+            ready_at = self.start_time + (self.consumed + size) / self.link.byte_rate
+            if self.consumed + size > len(self.stream):
+                ready_at = float('inf')
+            time.sleep(max(min(ready_at - time.time(), self.timeout), 0))
+        size = min(size, self.in_waiting)
+        data = self.stream[self.consumed:self.consumed + size]
+        self.consumed += size
+        return data
+    
+    def reset_input_buffer(self):
+        self.consumed += self.in_waiting
+    
+    def close(self):
+        self.is_open = False
+
 class MockSerialReceiver:
     """集成了模拟串口的接收器，用于测试"""
     def __init__(self):
@@ -273,8 +389,11 @@ class:1\nscore:88\nbbox:100\nbbox:150\nbbox:140\nbbox:200\n"""
 class MockSerialTools:
     """模拟serial.tools.list_ports模块"""
     class ComPort:
-        def __init__(self, device):
+        def __init__(self, device, vid=None, pid=None, serial_number=None):
             self.device = device
+            self.vid = vid
+            self.pid = pid
+            self.serial_number = serial_number
     
     @staticmethod
     def comports():
@@ -6,13 +6,18 @@
 
 import sys
 import time
+import logging
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 from threading import Thread
 import serial
 
 # 导入自定义模块
-from serial_receive import MultiPortManager, SerialReceiver
+from serial_receive import MultiPortManager, SerialReceiver, RECENT_DATA_LIMIT
+from baud_cache import BaudRateCache
+from log_setup import setup_logging
+
+logger = logging.getLogger(__name__)
 
 class MultiPortCommGUI:
     """
@@ -28,6 +33,8 @@ class MultiPortCommGUI:
         
         # 初始化多端口管理器
         self.port_manager = MultiPortManager(max_ports=2)
+        self.port_manager.recent_data_limit = RECENT_DATA_LIMIT  # 界面显示原始数据
+        self.port_manager.baud_cache = BaudRateCache()  # 记住设备的波特率，下次启动时快速连接
         
         # 界面刷新间隔(毫秒)
         self.update_interval = 100
@@ -641,7 +648,7 @@ class MultiPortCommGUI:
                     self._last_stats_update = time.time()
                 
             except Exception as e:
-                print(f"更新循环异常: {e}")
+                logger.error("更新循环异常: %s", e)
             
             time.sleep(self.update_interval / 1000.0)
     
@@ -688,6 +695,7 @@ class MultiPortCommGUI:
 
 def start_multiport_comm_gui():
     """启动多端口通信GUI"""
+    setup_logging()
     root = tk.Tk()
     gui = MultiPortCommGUI(root)
     
@@ -1,6 +1,10 @@
 import os
+import logging
 import numpy as np
 from PIL import Image, ImageDraw
+from detection import Detection
+
+logger = logging.getLogger(__name__)
 
 class ImageProcessor:
     def __init__(self):
@@ -8,6 +12,7 @@ class ImageProcessor:
         self.original_image = None
         self.width = 256
         self.height = 256
+        self.latency_tracer = None  # 记录目标第一次被绘制的时间（metrics.LatencyTracer），为None时不追踪
     
     def load_image(self, image_path=None):
         """加载图像，如果没有指定路径则创建一个空白图像"""
@@ -20,7 +25,7 @@ class ImageProcessor:
                 self.image = img
                 return True
             except Exception as e:
-                print(f"加载图像失败: {e}")
+                logger.error("加载图像失败: %s", e)
                 return False
         else:
             # 创建空白图像
@@ -41,12 +46,13 @@ class ImageProcessor:
             return True
         return False
     
-    def draw_boxes(self, objects, class_colors=None):
+    def draw_boxes(self, objects, class_colors=None, source_colors=None):
         """在图像上绘制检测框
         
         Args:
-            objects: 对象列表，每个对象包含class, score, bbox信息
+            objects: Detection 列表（也兼容包含class, score, bbox的字典）
             class_colors: 类别对应的颜色字典
+            source_colors: 来源端口对应的颜色字典，有来源端口的目标优先使用（多端口显示）
         """
         if self.image is None:
             self.create_blank_image()
@@ -69,9 +75,10 @@ class ImageProcessor:
         # 遍历绘制每个检测框
         for obj in objects:
             try:
-                obj_class = obj['class']
-                score = obj['score']
-                xmin, ymin, xmax, ymax = obj['bbox']
+                obj = Detection.from_object(obj)
+                obj_class = obj.class_id
+                score = obj.score
+                xmin, ymin, xmax, ymax = obj.bbox
                 
                 # 确保坐标在图像范围内，并转换为整数
                 xmin = max(0, min(int(xmin), self.width - 1))
@@ -86,7 +93,7 @@ class ImageProcessor:
                         if i == 1: ymin = 0
                         if i == 2: xmax = self.width - 1
                         if i == 3: ymax = self.height - 1
-                        print(f"修复无效坐标: 索引 {i}, 值 {coord} -> {[xmin, ymin, xmax, ymax][i]}")
+                        logger.warning("修复无效坐标: 索引 %s, 值 %s -> %s", i, coord, [xmin, ymin, xmax, ymax][i])
                 
                 # 确保xmax > xmin和ymax > ymin
                 if xmax <= xmin:
@@ -98,10 +105,14 @@ class ImageProcessor:
                 xmin, ymin, xmax, ymax = int(xmin), int(ymin), int(xmax), int(ymax)
                     
                 # 打印调试信息
-                print(f"绘制边界框: ({xmin},{ymin},{xmax},{ymax})")
+                logger.debug("绘制边界框: (%s,%s,%s,%s)", xmin, ymin, xmax, ymax)
                 
-                # 获取该类别的颜色
-                color = class_colors.get(obj_class, (255, 0, 0))
+                # 获取来源端口或该类别的颜色
+                color = None
+                if source_colors and obj.source is not None:
+                    color = source_colors.get(obj.source)
+                if color is None:
+                    color = class_colors.get(obj_class, (255, 0, 0))
                 
                 # 绘制矩形框
                 draw.rectangle([xmin, ymin, xmax, ymax], outline=color, width=2)
@@ -119,8 +130,10 @@ class ImageProcessor:
                 # 标签文本
                 draw.text((xmin + 5, ymin), label, fill=(255, 255, 255))
             except Exception as e:
-                print(f"绘制检测框错误 - {e}，边界框: {obj.get('bbox', '未知')}")
+                logger.error("绘制检测框错误 - %s，边界框: %s", e, obj.get('bbox', '未知'))
         
+        if self.latency_tracer is not None:
+            self.latency_tracer.mark(objects, 'drawn')
         return image_with_boxes
     
     def save_image(self, output_path):
@@ -130,7 +143,7 @@ class ImageProcessor:
                 self.image.save(output_path)
                 return True
             except Exception as e:
-                print(f"保存图像失败: {e}")
+                logger.error("保存图像失败: %s", e)
         return False
     
     def get_image(self):
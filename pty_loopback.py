@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+伪终端回环测试工具（仅Linux/POSIX）
+
+MockSerial 会整体替换 serial.Serial，真实的 connect -> start_receiving -> _receive_thread
+路径不会被执行。这里为每个端口创建一对伪终端（os.openpty），从端通过 MultiPortManager.connect_port
+（即 SerialReceiver.connect 和真实的 serial.Serial）打开，写线程按设定的字节速率向主端写入检测数据，
+统计每个端口的持续吞吐量、写入到解析完成的延迟以及接收和处理线程的CPU时间。
+
+每条记录的左上角坐标编码了记录序号，解析出的目标可以据此找到对应的写入时间。
+
+用法:
+    python pty_loopback.py --ports 16 --rate 20000 --duration 5 --output loopback.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from threading import Thread, Event
+from metrics import LatencyTracer, RollingPercentiles
+from serial_receive import MultiPortManager
+
+# 序号编码在 (x1, y1) 中，每 SEQUENCE_PERIOD 条记录循环一次
+SEQUENCE_BASE = 200
+SEQUENCE_PERIOD = SEQUENCE_BASE * SEQUENCE_BASE
+
+def encode_record(seq):
+    """生成第 seq 条记录的文本数据，左上角坐标编码序号"""
+    x1 = seq % SEQUENCE_BASE
+    y1 = (seq // SEQUENCE_BASE) % SEQUENCE_BASE
+    return (f"class:{seq % 6}\nscore:90\nbbox:{x1}\nbbox:{y1}\n"
+            f"bbox:{x1 + 20}\nbbox:{y1 + 20}\n").encode('ascii')
+
+def decode_sequence(bbox):
+    """根据边界框还原记录序号（模 SEQUENCE_PERIOD）"""
+    return bbox[0] + bbox[1] * SEQUENCE_BASE
+
+def thread_cpu_time(thread):
+    """
+    读取线程累计的CPU时间（用户态+内核态）
+    
+    Args:
+        thread: 已启动的 threading.Thread
+    
+    Returns:
+        float: CPU时间（秒），无法读取时为0
+    """
+    native_id = getattr(thread, 'native_id', None)
+    if native_id is None:
+        return 0.0
+    try:
+        with open(f"/proc/self/task/{native_id}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return 0.0
+    # 线程名称可能包含空格，从最后一个右括号之后开始按空格分割
+    fields = stat[stat.rindex(')') + 2:].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+class LoopbackTracer(LatencyTracer):
+    """在延迟追踪的解析阶段统计写入到解析完成的延迟"""
+    
+    def __init__(self, write_times):
+        super().__init__()
+        self.write_times = write_times  # 序号（模 SEQUENCE_PERIOD） -> 写入时间
+        self.loopback = RollingPercentiles(window=100000)
+        self.parsed = 0
+    
+    def start(self, detections, arrived, read, parsed=None):
+        if parsed is None:
+            parsed = time.perf_counter()
+        super().start(detections, arrived, read, parsed)
+        for obj in detections:
+            write_time = self.write_times.get(decode_sequence(obj.bbox))
+            if write_time is not None:
+                self.loopback.add(parsed - write_time)
+        self.parsed += len(detections)
+
+class PtyPort:
+    """一个端口的伪终端和写线程"""
+    
+    def __init__(self, name, byte_rate, write_size=None):
+        self.name = name
+        self.byte_rate = byte_rate
+        self.write_size = write_size  # 每次写入的最大字节数，默认按约1ms的数据量
+        self.master, self.slave = os.openpty()
+        self.path = os.ttyname(self.slave)
+        self.write_times = {}
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self.stop_event = Event()
+        self.thread = None
+    
+    def start(self, duration):
+        """启动写线程，持续 duration 秒"""
+        self.thread = Thread(target=self._write_loop, args=(duration,), daemon=True)
+        self.thread.start()
+    
+    def _write_loop(self, duration):
+        """按字节速率写入记录；写入阻塞（接收端来不及读取）时速率自然下降"""
+        write_size = self.write_size or max(int(self.byte_rate / 1000), 64)
+        start_time = time.perf_counter()
+        seq = 0
+        pending = []
+        pending_size = 0
+        while not self.stop_event.is_set():
+            now = time.perf_counter()
+            if now - start_time >= duration:
+                break
+            # 按计划应已发送的字节数，落后时一次写入多条记录
+            due = (now - start_time) * self.byte_rate - self.bytes_sent
+            if due <= 0:
+                time.sleep(min(-due / self.byte_rate, 0.005))
+                continue
+            while pending_size < min(due, write_size) or not pending:
+                record = encode_record(seq)
+                pending.append((seq, record))
+                pending_size += len(record)
+                seq += 1
+            # 写入前记录时间：接收端可能在 os.write 返回之前就已经解析出这些记录
+            written_at = time.perf_counter()
+            for record_seq, _ in pending:
+                self.write_times[record_seq % SEQUENCE_PERIOD] = written_at
+            try:
+                os.write(self.master, b"".join(record for _, record in pending))
+            except OSError:
+                break
+            self.records_sent += len(pending)
+            self.bytes_sent += pending_size
+            pending = []
+            pending_size = 0
+    
+    def join(self):
+        if self.thread:
+            self.thread.join()
+    
+    def close(self):
+        """停止写线程并关闭伪终端"""
+        self.stop_event.set()
+        self.join()
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+class LoopbackHarness:
+    """
+    多端口伪终端回环测试
+    
+    用法:
+        with LoopbackHarness(ports=8, byte_rate=20000) as harness:
+            report = harness.run(duration=2.0)
+    """
+    
+    def __init__(self, ports=1, byte_rate=10000, baudrate=115200, write_size=None):
+        if not hasattr(os, 'openpty'):
+            raise RuntimeError("当前平台不支持伪终端")
+        self.manager = MultiPortManager(max_ports=ports)
+        self.ports = {}
+        self.baudrate = baudrate
+        for i in range(ports):
+            port = PtyPort(f"pty{i}", byte_rate, write_size)
+            self.ports[port.name] = port
+            self.manager.add_port(port.name, port.path, baudrate)
+            self.manager.receivers[port.name].latency_tracer = LoopbackTracer(port.write_times)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def run(self, duration=2.0, drain_timeout=1.0):
+        """
+        连接所有端口并写入数据
+        
+        Args:
+            duration: 写入持续时间（秒）
+            drain_timeout: 写入结束后等待接收端处理完剩余数据的最长时间（秒）
+        
+        Returns:
+            dict: {'ports': 端口名称 -> 统计结果, 'total': 汇总结果}
+        """
+        for name in self.ports:
+            if not self.manager.connect_port(name):
+                raise RuntimeError(f"无法打开伪终端 {self.ports[name].path}")
+        self.manager.start_all_receiving()
+        receivers = self.manager.receivers
+        cpu_start = {name: sum(thread_cpu_time(t) for t in receivers[name].threads) for name in self.ports}
+        
+        start_time = time.perf_counter()
+        for port in self.ports.values():
+            port.start(duration)
+        for port in self.ports.values():
+            port.join()
+        
+        # 等待接收端读完并解析所有已写入的记录（最后一条记录在链路空闲后才输出）
+        deadline = time.perf_counter() + drain_timeout
+        while time.perf_counter() < deadline:
+            if all(receivers[name].latency_tracer.parsed >= port.records_sent for name, port in self.ports.items()):
+                break
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start_time
+        
+        report = {'ports': {}}
+        for name, port in self.ports.items():
+            receiver = receivers[name]
+            cpu = sum(thread_cpu_time(t) for t in receiver.threads) - cpu_start[name]
+            metrics = receiver.get_metrics()
+            latency = receiver.latency_tracer.loopback.snapshot()
+            report['ports'][name] = {
+                'bytes_sent': port.bytes_sent,
+                'bytes_read': metrics['bytes_read'],
+                'records_sent': port.records_sent,
+                'records_parsed': receiver.latency_tracer.parsed,
+                'read_calls': metrics['read_calls'],
+                'mb_per_s': metrics['bytes_read'] / elapsed / 1e6,
+                'records_per_s': receiver.latency_tracer.parsed / elapsed,
+                'latency': latency,
+                'cpu_seconds': cpu,
+                'cpu_percent': cpu / elapsed * 100,
+            }
+        
+        self.manager.stop_all_receiving()
+        results = report['ports'].values()
+        report['total'] = {
+            'ports': len(self.ports),
+            'elapsed': elapsed,
+            'bytes_read': sum(r['bytes_read'] for r in results),
+            'records_sent': sum(r['records_sent'] for r in results),
+            'records_parsed': sum(r['records_parsed'] for r in results),
+            'mb_per_s': sum(r['mb_per_s'] for r in results),
+            'cpu_percent': sum(r['cpu_percent'] for r in results),
+            'max_latency_p99': max((r['latency']['p99'] for r in results), default=0.0),
+        }
+        return report
+    
+    def close(self):
+        """断开所有端口并关闭伪终端"""
+        self.manager.disconnect_all_ports()
+        for port in self.ports.values():
+            port.close()
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="伪终端回环接收测试")
+    parser.add_argument('--ports', type=int, default=1, help="端口数")
+    parser.add_argument('--rate', type=int, default=10000, help="每个端口的写入速率（字节/秒）")
+    parser.add_argument('--duration', type=float, default=2.0, help="写入持续时间（秒）")
+    parser.add_argument('--output', help="结果保存路径（JSON）")
+    args = parser.parse_args()
+    
+    print(f"=== 伪终端回环测试: {args.ports} 个端口, 每端口 {args.rate} 字节/秒 ===\n")
+    with LoopbackHarness(args.ports, args.rate) as harness:
+        report = harness.run(args.duration)
+    
+    for name, result in report['ports'].items():
+        latency = result['latency']
+        print(f"  {name}: {result['mb_per_s'] * 1000:.1f} KB/s, {result['records_parsed']}/{result['records_sent']} 条记录, "
+              f"延迟 p50 {latency['p50'] * 1000:.2f} ms / p99 {latency['p99'] * 1000:.2f} ms, "
+              f"CPU {result['cpu_percent']:.1f}%")
+    total = report['total']
+    print(f"\n合计: {total['mb_per_s'] * 1000:.1f} KB/s, CPU {total['cpu_percent']:.1f}%, "
+          f"最大 p99 延迟 {total['max_latency_p99'] * 1000:.2f} ms")
+    
+    if args.output:
+        report['meta'] = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rate': args.rate,
+            'duration': args.duration,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"结果已保存到 {args.output}")
+    
+    return total['records_parsed'] >= total['records_sent']
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
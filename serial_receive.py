@@ -1,28 +1,1080 @@
 import serial
 import time
-import queue
-from threading import Thread, Lock, Event
+import logging
+from threading import Thread, Lock, Event, current_thread
 import re
+import struct
+import binascii
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+import numpy as np
+from log_setup import setup_logging
+from metrics import Metrics, TimedLock
+from frames import FrameAssembler
+from baud_cache import device_identity
+from link_monitor import LinkQualityMonitor
+from detection import Detection, DETECTION_DTYPE, SUPPRESSION_POLICIES, BoxGridIndex, group_connected_boxes, detections_to_array
+
+logger = logging.getLogger(__name__)
+
+def _record_prefix_pattern(tokens):
+    """
+    生成匹配记录前缀的正则表达式：字段依次出现，可以在任意位置截断
+    
+    Args:
+        tokens: 记录的组成部分，字节串为字段标签，其他为数值或空白的正则表达式
+    
+    Returns:
+        bytes: 正则表达式
+    """
+    if not tokens:
+        return b''
+    token, rest = tokens[0], _record_prefix_pattern(tokens[1:])
+    if isinstance(token, bytes):
+        # 标签本身也可能只接收到一部分
+        partial = b'|'.join(re.escape(token[:k]) for k in range(1, len(token)))
+        return b'(?:' + re.escape(token) + rest + b'|' + partial + b')?'
+    return b'(?:' + token.encode('ascii') + rest + b')?'
+
+class TextRecordDecoder:
+    """
+    文本目标检测数据的字节级解码器
+    
+    数据格式: class:N score:N bbox:N bbox:N bbox:N bbox:N（字段之间可以有任意空白）。
+    解码器直接处理 bytes/bytearray/memoryview，不需要先解码为字符串：每个数据块用编译好的
+    字节正则表达式一次提取全部完整记录，只把跨越数据块边界的未完成记录保留（复制）到下一次 feed，
+    因此一条记录可以被任意切分到多个数据块中，而数据块本身不会被复制。
+    """
+    
+    protocol = 'text'
+    START_TAG = b'class:'
+    START_CONTEXT = len(START_TAG) - 1  # 跨越数据块边界的起始标记在前一个数据块中最多有5个字节
+    FIELD_TAGS = (b'class:', b'score:', b'bbox:', b'bbox:', b'bbox:', b'bbox:')
+    FIELD_COUNT = 6
+    MAX_PENDING = 4096  # 未完成记录的最大长度，超过时按无效数据丢弃
+    
+    RECORD = rb'class:(\d+)\s*score:(\d+)\s*bbox:(\d+)\s*bbox:(\d+)\s*bbox:(\d+)\s*bbox:(\d+)'
+    # 最后一个bbox数值之后必须出现非数字字节，记录才算完整
+    RECORD_PATTERN = re.compile(RECORD + rb'(?=\D)')
+    COMPLETE_PATTERN = re.compile(RECORD)
+    PREFIX_PATTERN = re.compile(re.escape(START_TAG) + _record_prefix_pattern(
+        [r'\d+', r'\s*', b'score:', r'\d+'] + [r'\s*', b'bbox:', r'\d+'] * 4) + rb'\Z')
+    START_PATTERN = re.compile(re.escape(START_TAG))
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """重置解码状态，丢弃未完成的记录"""
+        self.tail = b''  # 跨越数据块边界的未完成记录（或部分匹配的起始标记）
+    
+    @property
+    def pending(self):
+        """是否有未完成的记录（或部分匹配的起始标记）"""
+        return bool(self.tail)
+    
+    def feed(self, data):
+        """
+        解码一个数据块
+        
+        最后一个bbox数值之后必须出现非数字字节，记录才算完整；
+        恰好结束于数据块末尾的记录会保留到下一次 feed 或 flush。
+        
+        Args:
+            data: bytes、bytearray 或 memoryview
+        
+        Returns:
+            list: 完整记录列表 [(class, score, x1, y1, x2, y2), ...]
+        """
+        records = []
+        pos = 0
+        tail = None
+        if self.tail:
+            # 未完成的记录只与新数据的开头拼接（最多一条记录的长度），其余数据直接在原缓冲区上解码
+            head = self.tail + bytes(data[:self.MAX_PENDING])
+            match = self.RECORD_PATTERN.search(head)
+            if match and match.start() < len(self.tail):
+                records.append(record_values(match.groups()))
+                pos = match.end() - len(self.tail)
+            elif len(head) - len(self.tail) == len(data):
+                # 新数据全部在拼接的部分中，未完成的记录可能仍未结束
+                tail = self._incomplete_tail(head)
+        matches = self.RECORD_PATTERN.findall(data, pos)
+        if LONG_NUMBER_PATTERN.search(data, pos):
+            records.extend(record_values(fields) for fields in matches)
+        else:
+            records.extend(tuple(map(int, fields)) for fields in matches)
+        self.tail = self._incomplete_tail(data, pos) if tail is None else tail
+        return records
+    
+    def _incomplete_tail(self, buffer, pos=0):
+        """
+        数据末尾可能在下一个数据块中继续的部分（复制为 bytes）
+        
+        未完成的记录只可能起始于最后一个起始标记：完整的记录后面跟着非数字字节，不再是记录前缀，
+        而记录前缀中不会出现其他起始标记。没有未完成的记录时保留可能是起始标记前半部分的字节。
+        
+        Args:
+            buffer: bytes、bytearray 或 memoryview
+            pos: 只在这个位置之后查找
+        """
+        match = self.PREFIX_PATTERN.search(buffer, max(len(buffer) - self.MAX_PENDING, pos))
+        if match:
+            return bytes(buffer[match.start():])
+        end = bytes(buffer[max(len(buffer) - len(self.START_TAG) + 1, pos):])
+        start = end.rfind(self.START_TAG[:1])
+        if start >= 0 and self.START_TAG.startswith(end[start:]):
+            return end[start:]
+        return b''
+    
+    def flush(self):
+        """
+        数据流结束（或链路空闲）时调用，输出最后一个数值已读完的记录
+        
+        Returns:
+            list: 完整记录列表，最多一条
+        """
+        match = self.COMPLETE_PATTERN.fullmatch(self.tail)
+        self.reset()
+        return [record_values(match.groups())] if match else []
+    
+    @property
+    def pending_records(self):
+        """未完成的记录数：起始标记已完整解码、但记录还没有收完"""
+        return 1 if self.tail.startswith(self.START_TAG) else 0
+    
+    def count_record_starts(self, data, context=b''):
+        """
+        统计结束于数据中的记录起始标记个数，用于计算被丢弃的记录数
+        
+        起始标记可能被切分到两个数据块中：context 是数据流中 data 之前的字节，
+        只使用其最后 START_CONTEXT 个字节，起始于其中、结束于 data 中的标记也会被统计。
+        
+        Args:
+            data: 原始字节数据
+            context: 数据流中 data 之前的字节
+        
+        Returns:
+            int: 结束于这段数据中的起始标记个数
+        """
+        context = bytes(context[-self.START_CONTEXT:])
+        # 跨越 context 和 data 的起始标记结束于 data 的前 START_CONTEXT 个字节中
+        count = (context + bytes(data[:self.START_CONTEXT])).count(self.START_TAG) if context else 0
+        return count + len(self.START_PATTERN.findall(data))
+    
+    def count_split_starts(self, data, context, kept=0):
+        """
+        统计起始于被丢弃的数据、结束于 data 中的起始标记个数
+        
+        Args:
+            data: 丢弃位置之后的数据
+            context: 数据流中 data 之前的字节
+            kept: context 末尾在最后一个被丢弃的字节之后的字节数
+        
+        Returns:
+            int: 这些起始标记的记录数（解码器被重置，看不到完整的起始标记）
+        """
+        return self.count_record_starts(data[:max(self.START_CONTEXT - kept, 0)], context)
+    
+    def latest_record_start(self, buffer, position):
+        """
+        起始不晚于 position 的最后一条完整记录的起始位置（latest_only 模式跳过积压的数据时使用）
+        
+        Args:
+            buffer: 积压的数据
+            position: 希望跳过的数据的结束位置
+        
+        Returns:
+            int: 记录的起始位置，没有完整的记录时为None
+        """
+        lower = max(position - self.MAX_PENDING, 0)
+        start = buffer.rfind(self.START_TAG, lower, position + len(self.START_TAG))
+        while start >= 0:
+            if self.RECORD_PATTERN.match(buffer, start):
+                return start
+            start = buffer.rfind(self.START_TAG, lower, start + len(self.START_TAG) - 1)
+        return None
+
+class BinaryFrameDecoder:
+    """
+    二进制目标检测帧解码器
+    
+    帧格式（所有字段均为无符号整数）:
+        [同步字 0xAA 0x55][数量 N: uint8][N条记录, 每条6字节][CRC16: uint16 大端]
+    每条记录依次为 class, score, x1, y1, x2, y2（各1字节）。
+    CRC为 CRC-16/CCITT（初值0xFFFF），覆盖数量字节和全部记录。
+    每个目标只需6字节，约为文本格式的五分之一。
+    """
+    
+    protocol = 'binary'
+    SYNC = b'\xaa\x55'
+    HEADER_SIZE = 3      # 同步字 + 数量
+    START_CONTEXT = HEADER_SIZE - 1
+    RECORD_SIZE = 6
+    CRC_SIZE = 2
+    MAX_RECORDS = 255
+    MAX_PENDING = HEADER_SIZE + MAX_RECORDS * RECORD_SIZE + CRC_SIZE  # 一帧的最大长度
+    RECORD_STRUCT = struct.Struct('6B')
+    SYNC_PATTERN = re.compile(re.escape(SYNC))
+    
+    def __init__(self):
+        self.buffer = bytearray()  # 尚未组成完整帧的数据
+        self.frame_count = 0       # 已解码的有效帧数
+        self.crc_errors = 0        # CRC校验失败的帧数
+    
+    def reset(self):
+        """丢弃未完成的帧"""
+        self.buffer.clear()
+    
+    @property
+    def pending(self):
+        """是否有未完成的帧"""
+        return len(self.buffer) > 0
+    
+    def feed(self, data):
+        """
+        解码一个数据块
+        
+        数据块直接在原缓冲区上解码，只有未完成的帧被复制保留到下一次 feed。
+        
+        Args:
+            data: bytes、bytearray 或 memoryview
+        
+        Returns:
+            list: 完整记录列表 [(class, score, x1, y1, x2, y2), ...]
+        """
+        records = []
+        pos = 0
+        buffer = self.buffer
+        if buffer:
+            # 未完成的帧只与新数据的开头拼接（最多一帧的长度），帧一定在拼接的部分中结束
+            pending = len(buffer)
+            buffer += data[:self.MAX_PENDING]
+            if len(buffer) - pending == len(data):
+                # 新数据全部在拼接的部分中
+                del buffer[:self._decode(buffer, 0, records)]
+                return records
+            pos = self._decode(buffer, 0, records, pending) - pending
+            buffer.clear()
+        pos = self._decode(data, pos, records)
+        buffer += data[pos:]
+        return records
+    
+    def _decode(self, buffer, pos, records, stop=None):
+        """
+        从 pos 开始解码完整的帧，记录追加到 records
+        
+        Args:
+            buffer: bytes、bytearray 或 memoryview
+            pos: 开始位置
+            records: 输出的记录列表
+            stop: 解码到这个位置之后即停止，为None时解码到数据末尾
+        
+        Returns:
+            int: 尚未解码的数据（未完成的帧，或可能是同步字前半部分的最后一个字节）的起始位置
+        """
+        while stop is None or pos < stop:
+            match = self.SYNC_PATTERN.search(buffer, pos)
+            if match is None:
+                # 没有同步字，只保留可能是同步字前半部分的最后一个字节
+                return len(buffer) - 1 if buffer[-1:] == self.SYNC[:1] else len(buffer)
+            start = match.start()
+            
+            end = self._check_frame(buffer, start)
+            if end is None:
+                # 帧尚未接收完整。如果后面已经有一个完整的有效帧，
+                # 说明当前同步字只是数据中偶然出现的，不必继续等待
+                next_start = self._find_valid_frame(buffer, start + 1)
+                if next_start is None:
+                    return start
+                self.crc_errors += 1
+                pos = next_start
+                continue
+            
+            if end < 0:
+                # 校验失败，可能是数据中偶然出现的同步字，从下一个字节重新查找
+                self.crc_errors += 1
+                pos = start + 1
+                continue
+            
+            # 整帧批量解包
+            records.extend(self.RECORD_STRUCT.iter_unpack(buffer[start + self.HEADER_SIZE:end - self.CRC_SIZE]))
+            self.frame_count += 1
+            pos = end
+        return pos
+    
+    def _check_frame(self, buffer, start):
+        """
+        检查从start开始的帧
+        
+        Returns:
+            int: 帧结束位置；数据不完整时返回None，CRC校验失败时返回-1
+        """
+        if len(buffer) - start < self.HEADER_SIZE:
+            return None
+        
+        count = buffer[start + 2]
+        end = start + self.HEADER_SIZE + count * self.RECORD_SIZE + self.CRC_SIZE
+        if end > len(buffer):
+            return None
+        
+        crc = int.from_bytes(buffer[end - self.CRC_SIZE:end], 'big')
+        if binascii.crc_hqx(buffer[start + 2:end - self.CRC_SIZE], 0xFFFF) != crc:
+            return -1
+        return end
+    
+    def _find_valid_frame(self, buffer, pos):
+        """查找pos之后第一个完整且校验通过的帧的起始位置"""
+        for match in self.SYNC_PATTERN.finditer(buffer, pos):
+            end = self._check_frame(buffer, match.start())
+            if end is not None and end > 0:
+                return match.start()
+        return None
+    
+    def flush(self):
+        """二进制帧以CRC结尾，没有等待结束符的记录"""
+        return []
+    
+    @property
+    def pending_records(self):
+        """未完成的帧中的记录数（帧头已完整接收）"""
+        buffer = self.buffer
+        if len(buffer) >= self.HEADER_SIZE and buffer.startswith(self.SYNC):
+            return buffer[2]
+        return 0
+    
+    def count_record_starts(self, data, context=b''):
+        """
+        统计帧头结束于数据中的帧所包含的记录数，用于计算被丢弃的记录数
+        
+        帧头（同步字 + 数量）可能被切分到两个数据块中：context 是数据流中 data 之前的字节，
+        只使用其最后 START_CONTEXT 个字节。
+        
+        Args:
+            data: 原始字节数据
+            context: 数据流中 data 之前的字节
+        
+        Returns:
+            int: 记录数
+        """
+        context = bytes(context[-self.START_CONTEXT:])
+        count = 0
+        if context:
+            # 起始于 context 中的帧头
+            head = context + bytes(data[:self.START_CONTEXT])
+            for match in self.SYNC_PATTERN.finditer(head, 0, len(context) + 1):
+                if match.start() < len(head) - 2:
+                    count += head[match.start() + 2]
+        for match in self.SYNC_PATTERN.finditer(data):
+            if match.start() < len(data) - 2:
+                count += data[match.start() + 2]
+        return count
+    
+    def count_split_starts(self, data, context, kept=0):
+        """
+        统计起始于被丢弃的数据、结束于 data 中的起始标记个数
+        
+        Args:
+            data: 丢弃位置之后的数据
+            context: 数据流中 data 之前的字节
+            kept: context 末尾在最后一个被丢弃的字节之后的字节数
+        
+        Returns:
+            int: 这些起始标记的记录数（解码器被重置，看不到完整的起始标记）
+        """
+        return self.count_record_starts(data[:max(self.START_CONTEXT - kept, 0)], context)
+    
+    def latest_record_start(self, buffer, position):
+        """
+        起始不晚于 position 的最后一个完整有效帧的起始位置（latest_only 模式跳过积压的数据时使用）
+        
+        Args:
+            buffer: 积压的数据
+            position: 希望跳过的数据的结束位置
+        
+        Returns:
+            int: 帧的起始位置，没有完整的帧时为None
+        """
+        start = buffer.rfind(self.SYNC, 0, position + len(self.SYNC))
+        while start >= 0:
+            end = self._check_frame(buffer, start)
+            if end is not None and end > 0:
+                return start
+            start = buffer.rfind(self.SYNC, 0, start + len(self.SYNC) - 1)
+        return None
+    
+    @classmethod
+    def encode(cls, records):
+        """
+        将记录编码为一个二进制帧
+        
+        Args:
+            records: 记录列表 [(class, score, x1, y1, x2, y2), ...]，各值范围0-255
+        
+        Returns:
+            bytes: 完整的二进制帧
+        """
+        if len(records) > cls.MAX_RECORDS:
+            raise ValueError(f"单帧最多包含 {cls.MAX_RECORDS} 条记录")
+        
+        payload = bytes([len(records)]) + b''.join(cls.RECORD_STRUCT.pack(*record) for record in records)
+        crc = binascii.crc_hqx(payload, 0xFFFF)
+        return cls.SYNC + payload + crc.to_bytes(cls.CRC_SIZE, 'big')
+
+class AutoDetectDecoder:
+    """
+    自动识别文本/二进制协议的解码器
+    
+    协议确定之前，每个数据块同时交给文本和二进制解码器，
+    哪个解码器先解出完整记录就采用哪种协议，之后只使用该解码器。
+    两个解码器在识别期间都看到了全部数据，因此切换时不会丢失记录。
+    """
+    
+    def __init__(self):
+        self.text_decoder = TextRecordDecoder()
+        self.binary_decoder = BinaryFrameDecoder()
+        self.selected = None  # 已确定的解码器
+    
+    @property
+    def protocol(self):
+        """已识别的协议: 'text'、'binary'，尚未识别时为None"""
+        return self.selected.protocol if self.selected else None
+    
+    @property
+    def pending(self):
+        if self.selected:
+            return self.selected.pending
+        return self.text_decoder.pending
+    
+    def reset(self):
+        """丢弃未完成的记录，保留已识别的协议"""
+        self.text_decoder.reset()
+        self.binary_decoder.reset()
+    
+    def redetect(self):
+        """重新识别协议"""
+        self.reset()
+        self.selected = None
+    
+    def feed(self, data):
+        if self.selected:
+            return self.selected.feed(data)
+        
+        binary_records = self.binary_decoder.feed(data)
+        text_records = self.text_decoder.feed(data)
+        
+        # 二进制帧有CRC校验，误判的可能性更小，优先采用
+        if self.binary_decoder.frame_count:
+            self.selected = self.binary_decoder
+            self.text_decoder.reset()
+            logger.info("识别到二进制数据协议")
+            return binary_records
+        if text_records:
+            self.selected = self.text_decoder
+            self.binary_decoder.reset()
+            logger.info("识别到文本数据协议")
+            return text_records
+        return []
+    
+    def flush(self):
+        if self.selected:
+            return self.selected.flush()
+        return self.text_decoder.flush()
+    
+    @property
+    def START_CONTEXT(self):
+        if self.selected:
+            return self.selected.START_CONTEXT
+        return max(TextRecordDecoder.START_CONTEXT, BinaryFrameDecoder.START_CONTEXT)
+    
+    @property
+    def MAX_PENDING(self):
+        if self.selected:
+            return self.selected.MAX_PENDING
+        return max(TextRecordDecoder.MAX_PENDING, BinaryFrameDecoder.MAX_PENDING)
+    
+    @property
+    def pending_records(self):
+        if self.selected:
+            return self.selected.pending_records
+        return max(self.text_decoder.pending_records, self.binary_decoder.pending_records)
+    
+    def count_record_starts(self, data, context=b''):
+        """按已识别的协议统计记录数，尚未识别时取两种协议中较大的值"""
+        if self.selected:
+            return self.selected.count_record_starts(data, context)
+        return max(self.text_decoder.count_record_starts(data, context),
+                   self.binary_decoder.count_record_starts(data, context))
+    
+    def count_split_starts(self, data, context, kept=0):
+        if self.selected:
+            return self.selected.count_split_starts(data, context, kept)
+        return max(self.text_decoder.count_split_starts(data, context, kept),
+                   self.binary_decoder.count_split_starts(data, context, kept))
+    
+    def latest_record_start(self, buffer, position):
+        """按已识别的协议查找，尚未识别时不跳过数据"""
+        if self.selected:
+            return self.selected.latest_record_start(buffer, position)
+        return None
+
+# 可选的数据协议
+DECODERS = {
+    'text': TextRecordDecoder,
+    'binary': BinaryFrameDecoder,
+    'auto': AutoDetectDecoder,
+}
+
+def create_decoder(protocol='auto'):
+    """
+    根据协议名称创建解码器
+    
+    Args:
+        protocol: 'text'、'binary' 或 'auto'
+    
+    Returns:
+        解码器实例
+    """
+    if protocol not in DECODERS:
+        raise ValueError(f"不支持的数据协议: {protocol}")
+    return DECODERS[protocol]()
+
+COORD_MAX = 255  # 坐标的最大有效值
+VALUE_DIGITS = 9  # 文本数值的最大位数，更长的数值饱和为 VALUE_SATURATED，所在的记录无效
+VALUE_SATURATED = 10 ** VALUE_DIGITS
+LONG_NUMBER_PATTERN = re.compile(rb'\d{%d}' % (VALUE_DIGITS + 1))
+
+def record_values(fields):
+    """
+    将文本记录的字段转换为整数
+    
+    超过 VALUE_DIGITS 位的数值饱和为 VALUE_SATURATED，避免转换为 int64 时溢出；
+    normalize_detections 会把这样的记录标记为无效。
+    
+    Args:
+        fields: 各字段的数字字节串
+    
+    Returns:
+        tuple: (class, score, x1, y1, x2, y2)
+    """
+    return tuple(int(field) if len(field) <= VALUE_DIGITS else VALUE_SATURATED for field in fields)
+
+def records_to_array(records):
+    """
+    将解码器输出的记录列表转换为结构化数组
+    
+    Args:
+        records: 记录列表 [(class, score, x1, y1, x2, y2), ...]，或 N×6 的整数数组
+    
+    Returns:
+        np.ndarray: DETECTION_DTYPE 类型的一维结构化数组
+    """
+    if not isinstance(records, np.ndarray):
+        records = np.array(records, dtype=np.int64)
+    return detections_to_array(records)
+
+def normalize_detections(detections):
+    """
+    批量整理检测记录的坐标
+    
+    对所有记录同时进行：坐标排序（左上角和右下角）、修正宽高为0的框、检查坐标范围，
+    数值位数过多（已饱和）的记录也标记为无效。
+    
+    Args:
+        detections: DETECTION_DTYPE 类型的结构化数组
+    
+    Returns:
+        tuple: (整理后的结构化数组, 记录有效的布尔掩码)
+    """
+    normalized = np.empty(len(detections), dtype=DETECTION_DTYPE)
+    normalized['class'] = detections['class']
+    normalized['score'] = detections['score']
+    
+    # 确保坐标顺序正确（左上角和右下角）
+    xmin = np.minimum(detections['x1'], detections['x2'])
+    ymin = np.minimum(detections['y1'], detections['y2'])
+    xmax = np.maximum(detections['x1'], detections['x2'])
+    ymax = np.maximum(detections['y1'], detections['y2'])
+    
+    # 确保坐标有效值（防止相等）
+    normalized['x1'] = xmin
+    normalized['y1'] = ymin
+    normalized['x2'] = np.where(xmax == xmin, xmin + 1, xmax)
+    normalized['y2'] = np.where(ymax == ymin, ymin + 1, ymax)
+    
+    valid = ((normalized['x1'] >= 0) & (normalized['x2'] <= COORD_MAX) &
+             (normalized['y1'] >= 0) & (normalized['y2'] <= COORD_MAX) &
+             (normalized['class'] < VALUE_SATURATED) & (normalized['score'] < VALUE_SATURATED))
+    return normalized, valid
+
+def parse_detections(buffer, protocol='auto'):
+    """
+    批量解析一段完整数据中的所有检测记录，适用于离线数据文件
+    
+    与实时接收不同，数据末尾的记录也按完整记录处理。
+    文本数据用正则表达式一次提取全部字段并批量转换为整数；
+    'auto' 时如果数据中存在有效的二进制帧则按二进制协议解析，否则按文本解析。
+    
+    Args:
+        buffer: bytes、bytearray、memoryview 或 ASCII 字符串
+        protocol: 'text'、'binary' 或 'auto'
+    
+    Returns:
+        np.ndarray: 坐标已整理且有效的检测记录（DETECTION_DTYPE 结构化数组）
+    """
+    if protocol not in DECODERS:
+        raise ValueError(f"不支持的数据协议: {protocol}")
+    if isinstance(buffer, str):
+        buffer = buffer.encode('ascii', errors='replace')
+    
+    records = None
+    if protocol != 'text':
+        decoder = BinaryFrameDecoder()
+        records = decoder.feed(buffer)
+        if protocol == 'auto' and not decoder.frame_count:
+            records = None
+    
+    if records is None:
+        # 数据末尾的记录也按完整记录处理，不要求最后一个数值之后还有字节
+        matches = TextRecordDecoder.COMPLETE_PATTERN.findall(buffer)
+        if matches and LONG_NUMBER_PATTERN.search(buffer):
+            records = [record_values(fields) for fields in matches]
+        else:
+            records = np.array(matches, dtype=bytes).astype(np.int64) if matches else []
+    
+    detections, valid = normalize_detections(records_to_array(records))
+    return detections[valid]
+
+class ByteRingBuffer:
+    """
+    预分配的字节环形缓冲区（单生产者/单消费者）
+    
+    接收线程调用 write 写入数据，处理线程通过 peek 取得指向缓冲区内部的 memoryview
+    片段直接交给解码器，处理完成后调用 consume 释放空间，整个过程不产生额外的拷贝和内存分配。
+    读写位置都是只增不减的累计字节数：写位置只由生产者修改，读位置只由消费者修改，
+    因此两个线程之间不需要加锁。
+    
+    处理线程也可以用 take 取出数据、在解码期间不持有任何锁，解码完成后调用 release。
+    已取出但尚未释放的数据（最多 capacity 字节）仍然占用缓冲区内存，因此实际分配 2 * capacity 字节，
+    生产者可以写入或丢弃的未读取数据始终最多为 capacity 字节，不会覆盖正在解码的数据。
+    此时读位置也会被生产者的 discard 修改，take、release 和 discard 需要由调用方加锁。
+    """
+    
+    def __init__(self, capacity=1 << 20):
+        if capacity <= 0:
+            raise ValueError(f"缓冲区容量必须大于0: {capacity}")
+        self.capacity = capacity
+        self._size = 2 * capacity  # 实际分配的字节数
+        self._buffer = bytearray(self._size)
+        self._view = memoryview(self._buffer)
+        self._write_pos = 0  # 累计写入的字节数（生产者）
+        self._read_pos = 0   # 累计读出的字节数（消费者）
+        self._release_pos = 0  # 累计释放的字节数，与读位置之间是已取出、正在解码的数据
+        self.dropped_bytes = 0  # 缓冲区满时丢弃的字节数
+    
+    def __len__(self):
+        """可读取的字节数"""
+        return self._write_pos - self._read_pos
+    
+    @property
+    def free(self):
+        """剩余可写入的字节数"""
+        return min(self.capacity - (self._write_pos - self._read_pos),
+                   self._size - (self._write_pos - self._release_pos))
+    
+    @property
+    def write_position(self):
+        """累计写入的字节数，可用于标记数据块在数据流中的位置"""
+        return self._write_pos
+    
+    @property
+    def read_position(self):
+        """累计读出的字节数，即下一次 peek 返回的第一个字节在数据流中的位置"""
+        return self._read_pos
+    
+    def write(self, data):
+        """
+        写入数据（生产者调用）
+        
+        缓冲区空间不足时只写入能放下的部分，其余数据被丢弃并计入 dropped_bytes。
+        
+        Args:
+            data: bytes、bytearray 或 memoryview
+        
+        Returns:
+            int: 实际写入的字节数
+        """
+        size = min(len(data), self.free)
+        if size < len(data):
+            self.dropped_bytes += len(data) - size
+        if size <= 0:
+            return 0
+        
+        start = self._write_pos % self._size
+        first = min(size, self._size - start)
+        self._view[start:start + first] = data[:first]
+        if first < size:
+            # 跨越缓冲区末尾，剩余部分写入缓冲区开头
+            self._view[:size - first] = data[first:size]
+        
+        # 数据写入完成后再移动写位置，消费者不会读到未写完的数据
+        self._write_pos += size
+        return size
+    
+    def peek(self, max_bytes=None):
+        """
+        取得可读取数据的 memoryview 片段，不移动读位置（消费者调用）
+        
+        数据跨越缓冲区末尾时返回两个片段。片段直接引用缓冲区内存，
+        必须在调用 consume 之前使用完毕。
+        
+        Args:
+            max_bytes: 最多返回的字节数，默认返回全部可读数据
+        
+        Returns:
+            list: memoryview 片段列表，没有数据时为空列表
+        """
+        size = len(self)
+        if max_bytes is not None:
+            size = min(size, max_bytes)
+        if size <= 0:
+            return []
+        
+        start = self._read_pos % self._size
+        first = min(size, self._size - start)
+        segments = [self._view[start:start + first]]
+        if first < size:
+            segments.append(self._view[:size - first])
+        return segments
+    
+    def consume(self, size):
+        """
+        释放已处理的数据（消费者调用）
+        
+        Args:
+            size: 已处理的字节数
+        """
+        size = min(size, len(self))
+        self._read_pos += size
+        self._release_pos += size
+    
+    def take(self):
+        """
+        取出全部可读取的数据并移动读位置，数据在调用 release 之前不会被覆盖（消费者调用）
+        
+        Returns:
+            list: memoryview 片段列表，没有数据时为空列表
+        """
+        segments = self.peek(self.capacity - (self._read_pos - self._release_pos))
+        self._read_pos += sum(len(segment) for segment in segments)
+        return segments
+    
+    def release(self):
+        """释放 take 取出的数据，以及之后被丢弃的数据（消费者调用）"""
+        self._release_pos = self._read_pos
+    
+    def discard(self, size):
+        """
+        丢弃最早的 size 字节未读取数据
+        
+        与 consume 相同，只是用于生产者腾出空间：调用方必须保证消费者此时没有在使用 peek 返回的片段
+        （take 取出的数据不受影响，SerialReceiver 中由 _ring_lock 保证）。
+        
+        Args:
+            size: 丢弃的字节数
+        
+        Returns:
+            int: 实际丢弃的字节数
+        """
+        size = min(size, len(self))
+        if self._release_pos == self._read_pos:
+            self._release_pos += size
+        self._read_pos += size
+        self.dropped_bytes += size
+        return size
+    
+    def clear(self):
+        """丢弃所有未读取的数据（消费者调用，或在消费者暂停时调用）"""
+        self._read_pos = self._write_pos
+        self._release_pos = self._read_pos
+
+RECENT_DATA_LIMIT = 65536  # 显示原始数据的界面中 recent_data_limit 的取值
+
+def _slice_segments(segments, start, end):
+    """
+    取出依次相连的数据片段中 [start, end) 范围内的部分，不复制数据
+    
+    Args:
+        segments: memoryview 片段列表
+        start: 起始位置（相对于第一个片段）
+        end: 结束位置，可以超过数据总长度
+    
+    Returns:
+        list: memoryview 片段列表
+    """
+    pieces = []
+    offset = 0
+    for segment in segments:
+        low, high = max(start - offset, 0), min(end - offset, len(segment))
+        if low < high:
+            pieces.append(segment[low:high])
+        offset += len(segment)
+    return pieces
+
+# SerialReceiver 的运行统计项
+RECEIVER_COUNTERS = (
+    'bytes_read',          # 从串口读取的字节数
+    'read_calls',          # 串口 read 调用次数
+    'chunks_queued',       # 写入环形缓冲区的数据块数
+    'chunks_dropped',      # 因缓冲区已满被丢弃（全部或部分）的数据块数
+    'bytes_dropped',       # 因缓冲区已满被丢弃的字节数
+    'records_dropped',     # 起始于被丢弃数据中的记录数
+    'drop_episodes',       # 开始丢弃数据的次数（从不丢弃到丢弃）
+    'blocked_time_us',     # 'block' 策略下接收线程等待缓冲区空间的总时间（微秒）
+    'frames_skipped',      # latest_only 模式下跳过的过期数据块数
+    'bytes_skipped',       # latest_only 模式下跳过的字节数
+    'records_skipped',     # latest_only 模式下跳过的记录数
+    'frames_published',    # 发布的完整帧数
+    'frames_incomplete',   # 不完整而被丢弃的帧数
+    'buffer_high_water',   # 环形缓冲区的最高占用字节数
+    'records_parsed',      # 解码出的记录数
+    'records_rejected',    # 坐标超出范围被忽略的记录数
+    'merges',              # 被合并到其他框中的框数
+    'objects_suppressed',  # 因重叠被移除或抑制的目标数
+    'link_degraded',       # 链路质量监测判定链路异常的次数
+    'link_recovered',      # 链路质量恢复的次数
+    'redetections',        # 链路异常后自动重新检测波特率的次数
+    'redetections_failed', # 自动重新检测或重新连接失败的次数
+)
+RECEIVER_HISTOGRAMS = (
+    'parse_time',          # 每个数据块的解析耗时（秒）
+    'lock_hold_time',      # data_lock 的持有时间（秒，抽样记录，见 TimedLock）
+)
+
+# 环形缓冲区已满时的处理策略
+# drop_oldest: 丢弃最早的未处理数据，为新数据腾出空间（默认，过载时宁可丢弃旧帧也不让显示停滞）
+# drop_newest: 丢弃放不下的新数据块
+# block:       接收线程等待处理线程腾出空间，不丢弃数据（串口驱动的缓冲区可能因此溢出）
+# coalesce:    丢弃所有未处理的数据，只保留最新的数据块，解码器从其中下一个记录起始处重新同步
+BACKPRESSURE_POLICIES = ('drop_oldest', 'drop_newest', 'block', 'coalesce')
+
+# 软件质量评估扫描波特率的先验顺序：最常用的波特率优先，其余按 common_baudrates 中的顺序
+BAUDRATE_SCAN_PRIORITY = (115200, 9600, 921600, 460800, 230400, 57600, 38400, 19200)
+
+# 硬件时序检测中，相邻两个字符'2'的间隔可能是字符时间（10位）的这些倍数
+TIMING_MULTIPLIERS = (1, 2, 3, 4, 5)
+
+def timing_likelihood_table(intervals_us, bit_times_us, multipliers=TIMING_MULTIPLIERS):
+    """
+    计算字符间隔与各候选位时间的匹配度
+    
+    对每个间隔 I、候选位时间 b 和倍数 m，匹配度为 max(0, 1 - |I - 10·b·m| / (10·b·m))，
+    所有候选、间隔和倍数通过广播一次算出。
+    
+    Args:
+        intervals_us: 字符间隔数组（微秒），长度为 N
+        bit_times_us: 候选波特率的位时间数组（微秒），长度为 C
+        multipliers: 间隔相当于几个字符时间，长度为 M
+    
+    Returns:
+        tuple: (table, best)
+            table: 形状为 (C, M) 的数组，各间隔在该位时间和倍数下匹配度的平均值
+            best: 形状为 (C,) 的数组，每个间隔取各倍数中最好的匹配度，再对间隔求平均
+    """
+    intervals = np.asarray(intervals_us, dtype=np.float64)
+    bit_times = np.asarray(bit_times_us, dtype=np.float64)
+    if not len(intervals):
+        return np.zeros((len(bit_times), len(multipliers))), np.zeros(len(bit_times))
+    expected = 10.0 * bit_times[:, None, None] * np.asarray(multipliers, dtype=np.float64)[None, None, :]
+    match = np.maximum(1.0 - np.abs(intervals[None, :, None] - expected) / expected, 0.0)  # (C, N, M)
+    return match.mean(axis=1), match.max(axis=2).mean(axis=1)
+
+# 可打印字符（32~126 以及制表符、换行和回车）的查找表
+_PRINTABLE_TABLE = np.zeros(256, dtype=bool)
+_PRINTABLE_TABLE[32:127] = True
+_PRINTABLE_TABLE[[9, 10, 13]] = True
+
+def _character_codes(data):
+    """
+    把数据转换为字符编码数组
+    
+    Args:
+        data: 字节数据，或字符串（例如 decode('ascii', errors='replace') 的结果）
+    
+    Returns:
+        ndarray: 字节数据为 uint8 数组，其中大于127的字节（ASCII解码时都替换为U+FFFD）统一记为128，
+                 评分与解码后的字符串相同；字符串为 Unicode 码位（uint32）数组，每个字符一个元素
+    """
+    if isinstance(data, str):
+        return np.frombuffer(data.encode('utf-32-le'), dtype=np.uint32)
+    return np.minimum(np.frombuffer(data, dtype=np.uint8), 128)
+
+def _has_repeated_bigram(codes):
+    """
+    是否有某个2字符模式在不重叠的位置上出现两次以上（即 data[i:i+2] in data[i+2:]）
+    
+    用计数表统计每个2字符模式的出现次数：出现3次以上的模式一定有两次不重叠；
+    恰好出现2次的模式，只有两次出现相邻（如 'aaa' 中的 'aa'）时才重叠。
+    """
+    if len(codes) < 4:
+        return False
+    codes = codes.astype(np.int64)
+    bigrams = (codes[:-1] << 21) | codes[1:]  # Unicode 码位最多21位
+    if codes.max() > 255:
+        bigrams = np.unique(bigrams, return_inverse=True)[1]  # 含非拉丁字符时映射为连续的编号
+    else:
+        bigrams = (codes[:-1] << 8) | codes[1:]
+    counts = np.bincount(bigrams)
+    if counts.max() >= 3:
+        return True
+    adjacent = np.zeros(len(counts), dtype=bool)
+    adjacent[bigrams[:-1][bigrams[:-1] == bigrams[1:]]] = True
+    return bool(np.any((counts == 2) & ~adjacent))
+
+def _character_histogram(codes):
+    """按字符编码统计出现次数，编码大于255的字符（都不是可打印字符）计入最后一个桶"""
+    if codes.dtype == np.uint8:
+        return np.bincount(codes, minlength=257)
+    return np.bincount(np.minimum(codes, 256), minlength=257)
+
+def _printable_count(histogram):
+    """可打印字符的个数"""
+    return int(histogram[:256][_PRINTABLE_TABLE].sum())
+
+def evaluate_data_quality(data):
+    """
+    评估串口数据的质量（不依赖具体的数据格式）
+    
+    所有统计都是对字符编码数组的向量化运算，耗时与数据长度成线性关系。
+    
+    Args:
+        data: 字节数据或字符串
+    
+    Returns:
+        dict: 各项分数
+            length: 数据量分数（最高40，50个字符以上每50个字符1分）
+            printable: 可打印字符比例分数（最高40）
+            printable_ratio: 可打印字符比例
+            digits / letters / repetition / newlines: 包含数字（8分）、ASCII字母（6分）、
+                重复的2字符模式（3分）、换行或回车（3分）
+            consistency: 后四项之和（最高20）
+            total: 总分（0~100）
+    """
+    codes = _character_codes(data)
+    size = len(codes)
+    if not size:
+        return {'length': 0, 'printable': 0, 'printable_ratio': 0, 'digits': 0, 'letters': 0,
+                'repetition': 0, 'newlines': 0, 'consistency': 0, 'total': 0}
+    
+    histogram = _character_histogram(codes)
+    printable_ratio = _printable_count(histogram) / size
+    
+    scores = {
+        'length': min(size / 50, 40),
+        'printable': printable_ratio * 40,
+        'printable_ratio': printable_ratio,
+        'digits': 8 if histogram[48:58].any() else 0,
+        'letters': 6 if histogram[65:91].any() or histogram[97:123].any() else 0,
+        'repetition': 3 if _has_repeated_bigram(codes) else 0,
+        'newlines': 3 if histogram[10] or histogram[13] else 0,
+    }
+    scores['consistency'] = min(scores['digits'] + scores['letters'] + scores['repetition'] + scores['newlines'], 20)
+    scores['total'] = min(scores['length'] + scores['printable'] + scores['consistency'], 100)
+    return scores
 
 class SerialReceiver:
-    def __init__(self, port=None, baudrate=9600, timeout=1):
+    ADJACENT_MAX_GAP = 5  # 相邻框之间允许的最大间距（像素）
+    VERTICAL_MAX_GAP = 1  # 垂直相邻框之间允许的最大间距（像素）
+    
+    # 合并相连框时可选的相邻规则: 名称 -> (判断方法, 相邻框的最大间距)
+    ADJACENCY_RULES = {
+        'vertical': ('_is_vertically_adjacent', VERTICAL_MAX_GAP),
+        'adjacent': ('_is_box_adjacent', ADJACENT_MAX_GAP),
+    }
+    
+    def __init__(self, port=None, baudrate=9600, timeout=1, decoder=None, protocol='auto', buffer_size=1 << 20,
+                 baud_cache=None):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.serial = None
         self.is_running = False
-        self.data_buffer = ""
+        self.decoder = decoder or create_decoder(protocol)  # 记录解码器，保存跨数据块的解析状态
+        self.recent_data = bytearray()  # 最近接收到的原始数据，仅供界面显示
+        self.recent_data_limit = 0  # recent_data 保留的最大字节数，为0时不保留（显示原始数据的界面中设置）
+        self.received_total = 0  # 累计接收的字节数（只增不减，界面据此判断是否有新数据）
         self.object_data = []
         self.all_objects = []  # 存储所有收到的目标，而不仅是最新的
-        self.data_lock = Lock()
+        self.metrics = Metrics(RECEIVER_COUNTERS, RECEIVER_HISTOGRAMS)  # 运行统计，见 get_metrics()
+        self.data_lock = TimedLock(self.metrics)  # 保护目标列表和原始数据的锁（记录持有时间），只在更新和读取时短暂持有
+        self.process_lock = Lock()  # 处理线程解码时持有，保护解码器和帧组装状态；界面线程不需要获取
+        self._ring_lock = Lock()  # 保护环形缓冲区的读位置和 _read_context，只在取出、释放或丢弃数据时短暂持有
         self.new_data_available = False  # 标记是否有新数据
-        self.data_queue = queue.Queue(maxsize=100000)  # 数据队列，用于分离接收和处理
+        self.ring_buffer = ByteRingBuffer(buffer_size)  # 预分配的环形缓冲区，用于分离接收和处理（容量以字节计）
+        self.backpressure_policy = 'drop_oldest'  # 缓冲区已满时的处理策略，见 BACKPRESSURE_POLICIES
+        self.on_drop_change = None  # 开始/停止丢弃数据时的回调 callback(dropping, drop_stats)，在接收线程中调用
+        self.dropping = False  # 最近一个数据块是否有数据被丢弃
+        self._gaps = deque()  # 数据流中被丢弃的新数据所在的位置，处理到这里时重置解码器
+        self._last_gap = None  # 最近处理到的缺失位置
+        self._read_context = b''  # 环形缓冲区读位置之前的最后几个字节（已处理或被丢弃），用于统计跨越丢弃位置的起始标记
+        self._read_context_kept = None  # 丢弃最早的数据之后已处理的字节数，达到 START_CONTEXT 后为None
+        self._next_position = 0  # 上一次取出的数据之后的位置，与读位置不同时说明其间的数据已被丢弃
+        self._drop_context = b''  # 接收顺序中最近的几个字节（不论是否被丢弃），用于统计跨越数据块的起始标记
+        self._drop_context_kept = None  # 最后一个被丢弃的字节之后收到的字节数，达到 START_CONTEXT 后为None
+        self.space_event = Event()  # 处理线程释放缓冲区空间时设置（'block' 策略）
+        self.latest_only = False  # 低延迟模式：积压了多个数据块时只解析最新的完整记录（帧），跳过过期的数据
+        self.frame_assembler = FrameAssembler()  # 将记录组装成设备帧，见 set_frame_mode()
+        self.frame_count = 0  # 已发布的帧数，也是最近一帧的帧序号
+        self.current_frame = None  # 最近发布的帧
+        self.link_monitor = LinkQualityMonitor()  # 链路质量监测，为None时不监测
+        self.auto_redetect = None  # 链路质量下降时在后台自动重新检测波特率并重新连接，为None时只对自动检测波特率的连接启用
+        self.redetect_duration = 1.0  # 自动重新检测时每个波特率的最长测试时间（秒）
+        self.on_link_event = None  # 链路事件回调 callback(event, info)，event 见 link_monitor.LINK_EVENTS
+        self._redetect_thread = None  # 正在运行的重新检测线程
+        self._redetect_stop = None  # 调用 disconnect() 时设置，取消正在进行的重新检测
         self.process_event = Event()  # 用于触发处理线程
+        self.stop_event = Event()  # 用于通知接收和处理线程退出
+        self.threads = []  # 接收和处理线程
+        self.receive_mode = 'blocking'  # 'blocking': 阻塞等待数据到达; 'polling': 轮询in_waiting
+        self.read_timeout = 0.1  # 阻塞读取的超时时间（秒），也是停止接收的最长等待时间
+        
+        # 延迟追踪：记录每个数据块结束位置和读取时间，用于估算每条记录的到达时间
+        # 延迟追踪器（metrics.LatencyTracer），为None时不追踪。追踪时每个目标在各阶段都要记录时间，
+        # 只在基准测试、回环测试或命令行指定 --trace-latency 时启用
+        self.latency_tracer = None
+        self._chunk_times = deque(maxlen=4096)  # (数据块结束位置, 读取时间)
+        self._last_read_time = None  # 最近一个已处理数据块的读取时间
+        
+        # 目标去重配置
+        self.suppression_policy = 'replace'  # 'replace': 重叠时新框替换旧框; 'nms': 贪心NMS; 'class_nms': 按类别NMS
+        self.iou_threshold = 0.3  # IoU 超过该值视为重叠
+        self.max_history = 30  # all_objects 保留的最大目标数
+        self.merge_rule = None  # 合并新对象中相连的框: None 不合并; 'vertical' 垂直相邻; 'adjacent' 上下或左右相邻
+        self.object_index = BoxGridIndex()  # all_objects 的网格索引，键为对象id
+        self._indexed_objects = {}  # 对象id -> (登记序号, 对象)
+        self._index_sequence = 0  # 下一个登记序号，与对象在 all_objects 中的先后顺序一致
+        self._indexed_list = None  # 索引对应的 all_objects 列表
+        self._indexed_count = 0
         
         # 自适应波特率相关配置
         self.common_baudrates = [1200, 2400, 4800, 9600, 14400, 19200, 28800, 38400, 56000, 57600, 115200, 128000, 230400, 256000, 460800, 921600, 1000000, 1500000, 2000000, 3000000]
         self.auto_detect_baudrate = False
         self.detected_baudrate = None
+        self.detection_confidence = None  # 最近一次检测结果的置信度（0~1）
+        self.baud_cache = baud_cache  # 持久化的波特率缓存（BaudRateCache），为None时不使用（界面入口中启用）
+        self._device_identity = None  # 当前串口的设备身份（见 _get_device_identity），关闭串口时清除
+        self.scan_confidence_score = 65  # 软件质量评估中质量分数达到该值时立即采用该波特率，不再测试其他波特率
+        self.scan_prune_window = 0.1  # 开始采样该时间（秒）后检查一次数据是否为乱码
+        self.scan_prune_min_chars = 16  # 检查乱码所需的最少字符数
+        self.scan_prune_ratio = 0.6  # 可打印字符比例低于该值的波特率被提前放弃
+        self.scan_byte_budget = 1024  # 每个波特率最多采集的字符数，采集够后立即评估
+        self.scan_read_timeout = 0.05  # 采样时每次阻塞读取的超时时间（秒），也是检查取消和超时的间隔
+        self.scan_silence_timeout = 0.5  # 没有收到任何数据时放弃该波特率的最短等待时间（秒）
+        self.scan_silence_chars = 64  # 放弃前至少等待传输这么多字符的时间（低波特率下等待更久）
+        self.timing_sample_budget = 256  # 硬件时序检测每个波特率最多采集的样本数
+        self.timing_confidence = 0.7  # 硬件时序检测的置信度达到该值时立即采用该波特率，不再测试其他波特率
+        self.timing_check_samples = 16  # 硬件时序检测每采集这么多样本检查一次置信度，达到 timing_confidence 时结束采样
+        self.cancel_event = None  # 设置后正在进行的波特率检测尽快结束（Event，为None时不能取消）
         
         # 混合检测方案配置
         self.detection_methods = ['hardware_timing', 'software_quality']  # 检测方法优先级
@@ -33,7 +1085,7 @@ class SerialReceiver:
     def detect_baudrate(self, port=None, test_duration=2.0):
         """
         混合波特率检测方法
-        优先使用硬件时序检测，失败时回退到软件质量评估
+        先验证上次检测到的（或波特率缓存中的）波特率，然后优先使用硬件时序检测，失败时回退到软件质量评估
         
         Args:
             port: 串口端口，如果为None则使用self.port
@@ -48,15 +1100,48 @@ class SerialReceiver:
         if not self.port:
             raise ValueError("未指定串口端口")
         
-        print("开始混合波特率检测...")
+        logger.info("开始混合波特率检测...")
         self.detection_results = {}
         
+        # 先验证上次检测到的（或波特率缓存中记录的）波特率，数据质量足够好时跳过完整检测
+        last_baudrate = self.detected_baudrate
+        if not last_baudrate and self.baud_cache is not None:
+            entry = self.baud_cache.lookup(self._get_device_identity())
+            if entry:
+                last_baudrate = entry['baudrate']
+                logger.info("波特率缓存中 %s 的波特率: %s", self.port, last_baudrate)
+        if last_baudrate and 'software_quality' in self.detection_methods:
+            logger.info("=== 验证上次检测到的波特率 %s ===", last_baudrate)
+            try:
+                score, status = self._measure_baudrate_quality(self.port, last_baudrate, test_duration)
+                self.detection_results['verification'] = {
+                    'baudrate': last_baudrate,
+                    'score': score,
+                    'status': status,
+                    'method': 'verification'
+                }
+                if status == 'confident':
+                    logger.info("✓ 波特率 %s 验证通过 (质量分数: %.1f)", last_baudrate, score)
+                    self.detected_baudrate = last_baudrate
+                    self.detection_confidence = score / 100
+                    return last_baudrate
+                logger.info("⚠ 波特率 %s 验证未通过 (质量分数: %.1f)", last_baudrate, score)
+            except Exception as e:
+                logger.warning("✗ 验证波特率 %s 时出错: %s", last_baudrate, e)
+        
+        if self._detection_cancelled():
+            logger.info("波特率检测已取消")
+            return None
+        
+        # 当前配置的波特率优先（上次检测到的波特率已经验证未通过）
+        preferred = [self.baudrate] if self.baudrate != last_baudrate else None
+        
         # 方法1: 硬件时序检测
         if self.hardware_detection_enabled and 'hardware_timing' in self.detection_methods:
-            print("\n=== 尝试硬件时序检测 ===")
+            logger.info("=== 尝试硬件时序检测 ===")
             try:
                 hw_baudrate, hw_confidence, hw_results = self._hardware_timing_detection(
-                    self.port, test_duration * 0.5  # 硬件检测用一半时间
+                    self.port, test_duration * 0.5, preferred  # 硬件检测用一半时间
                 )
                 
                 self.detection_results['hardware_timing'] = {
@@ -67,28 +1152,30 @@ class SerialReceiver:
                 }
                 
                 # 如果硬件检测置信度足够高，直接使用结果
-                if hw_confidence >= 0.7:  # 70%以上置信度
-                    print(f"✓ 硬件时序检测成功: {hw_baudrate} (置信度: {hw_confidence:.2f})")
+                if hw_confidence >= self.timing_confidence:
+                    logger.info("✓ 硬件时序检测成功: %s (置信度: %.2f)", hw_baudrate, hw_confidence)
                     self.detected_baudrate = hw_baudrate
+                    self.detection_confidence = hw_confidence
                     return hw_baudrate
                 else:
-                    print(f"⚠ 硬件时序检测置信度较低: {hw_confidence:.2f}")
+                    logger.info("⚠ 硬件时序检测置信度较低: %.2f", hw_confidence)
                     
             except Exception as e:
-                print(f"✗ 硬件时序检测失败: {e}")
+                logger.warning("✗ 硬件时序检测失败: %s", e)
                 self.detection_results['hardware_timing'] = {
                     'error': str(e),
                     'method': 'hardware_timing'
                 }
         
         # 方法2: 软件质量评估（原有方法）
-        if 'software_quality' in self.detection_methods:
-            print("\n=== 使用软件质量评估 ===")
+        if 'software_quality' in self.detection_methods and not self._detection_cancelled():
+            logger.info("=== 使用软件质量评估 ===")
             try:
-                sw_baudrate = self._software_quality_detection(self.port, test_duration)
+                sw_baudrate = self._software_quality_detection(self.port, test_duration, preferred)
                 
                 if sw_baudrate:
-                    print(f"✓ 软件质量评估检测: {sw_baudrate}")
+                    logger.info("✓ 软件质量评估检测: %s", sw_baudrate)
+                    sw_confidence = self.detection_results['software_quality']['score'] / 100
                     
                     # 如果有硬件检测结果，进行比较
                     if 'hardware_timing' in self.detection_results:
@@ -96,78 +1183,181 @@ class SerialReceiver:
                         if 'baudrate' in hw_result and hw_result['baudrate']:
                             # 混合决策：考虑两种方法的结果
                             final_baudrate = self._hybrid_decision(hw_result, sw_baudrate)
-                            print(f"✓ 混合决策结果: {final_baudrate}")
+                            logger.info("✓ 混合决策结果: %s", final_baudrate)
                             self.detected_baudrate = final_baudrate
+                            self.detection_confidence = sw_confidence if final_baudrate == sw_baudrate else hw_result['confidence']
                             return final_baudrate
                     
                     # 只有软件检测结果
                     self.detected_baudrate = sw_baudrate
+                    self.detection_confidence = sw_confidence
                     return sw_baudrate
                     
             except Exception as e:
-                print(f"✗ 软件质量评估失败: {e}")
+                logger.warning("✗ 软件质量评估失败: %s", e)
         
-        print("✗ 所有检测方法都失败")
+        if self._detection_cancelled():
+            logger.info("波特率检测已取消")
+        else:
+            logger.warning("✗ 所有检测方法都失败")
         return None
     
-    def _software_quality_detection(self, port, test_duration):
+    def _detection_cancelled(self):
+        """波特率检测是否已被取消（见 cancel_event）"""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+    
+    def _software_quality_detection(self, port, test_duration, preferred=None):
         """
-        软件质量评估检测方法（原有方法）
+        软件质量评估检测方法
+        
+        按先验顺序测试各波特率（见 _baudrate_scan_order），某个波特率的质量分数达到
+        scan_confidence_score 时立即采用，不再测试其余的波特率。
         
         Args:
             port: 串口端口
-            test_duration: 测试时间
+            test_duration: 每个波特率的最长测试时间
+            preferred: 优先测试的波特率列表（例如上次检测到的波特率）
             
         Returns:
             int: 检测到的波特率
         """
-        print("开始软件质量评估检测...")
+        logger.info("开始软件质量评估检测...")
         
         best_baudrate = None
         best_score = 0
+        scores = {}
         
-        for baudrate in self.common_baudrates:
-            print(f"测试波特率: {baudrate}")
+        for baudrate in self._baudrate_scan_order(preferred):
+            if self._detection_cancelled():
+                logger.info("软件质量评估已取消")
+                break
+            logger.info("测试波特率: %s", baudrate)
             
             try:
-                # 尝试使用当前波特率连接
-                test_serial = serial.Serial(
-                    port=port,
-                    baudrate=baudrate,
-                    timeout=0.1  # 短超时时间用于快速检测
-                )
-                
-                # 清空输入缓冲区
-                test_serial.reset_input_buffer()
-                
-                # 收集数据样本
-                data_samples = []
-                start_time = time.time()
-                
-                while time.time() - start_time < test_duration:
-                    if test_serial.in_waiting > 0:
-                        try:
-                            data = test_serial.read(test_serial.in_waiting).decode('ascii', errors='replace')
-                            data_samples.append(data)
-                        except Exception:
-                            pass
-                    time.sleep(0.05)  # 50ms间隔
-                
-                test_serial.close()
-                
-                # 评估数据质量
-                score = self._evaluate_data_quality(data_samples)
-                print(f"波特率 {baudrate} 的质量分数: {score}")
+                score, status = self._measure_baudrate_quality(port, baudrate, test_duration)
+            except Exception as e:
+                logger.warning("测试波特率 %s 时出错: %s", baudrate, e)
+                continue
+            
+            scores[baudrate] = score
+            logger.info("波特率 %s 的质量分数: %s (%s)", baudrate, score, status)
+            
+            if score > best_score:
+                best_score = score
+                best_baudrate = baudrate
+            if status == 'confident':
+                logger.info("波特率 %s 的质量分数达到 %s，停止扫描", baudrate, self.scan_confidence_score)
+                break
+        
+        self.detection_results['software_quality'] = {
+            'baudrate': best_baudrate if best_score > 0 else None,
+            'score': best_score,
+            'scores': scores,
+            'method': 'software_quality'
+        }
+        return best_baudrate if best_score > 0 else None
+    
+    def _baudrate_scan_order(self, preferred=None):
+        """
+        软件质量评估测试波特率的顺序
+        
+        Args:
+            preferred: 优先测试的波特率列表，不在 common_baudrates 中的也会被测试
+        
+        Returns:
+            list: preferred 中的波特率，然后是 BAUDRATE_SCAN_PRIORITY 中的常用波特率，
+                  最后是 common_baudrates 中的其余波特率（各波特率只出现一次）
+        """
+        order = []
+        for baudrate in preferred or ():
+            if baudrate and baudrate not in order:
+                order.append(baudrate)
+        for baudrate in BAUDRATE_SCAN_PRIORITY:
+            if baudrate in self.common_baudrates and baudrate not in order:
+                order.append(baudrate)
+        for baudrate in self.common_baudrates:
+            if baudrate not in order:
+                order.append(baudrate)
+        return order
+    
+    def _silence_timeout(self, baudrate):
+        """
+        采样时没有收到任何数据的最长等待时间
+        
+        Args:
+            baudrate: 波特率
+        
+        Returns:
+            float: scan_silence_timeout 与 scan_silence_chars 个字符（每字符10位）传输时间中的较大值（秒）
+        """
+        return max(self.scan_silence_timeout, self.scan_silence_chars * 10.0 / baudrate)
+    
+    def _measure_baudrate_quality(self, port, baudrate, test_duration):
+        """
+        以指定波特率采样并评估数据质量
+        
+        使用短超时的阻塞读取采样，以下情况提前结束：
+        - 质量分数达到 scan_confidence_score
+        - 已采集 scan_byte_budget 个字符
+        - 开始采样 scan_prune_window 秒后，可打印字符比例低于 scan_prune_ratio（视为乱码）
+        - 在 _silence_timeout() 内没有收到任何数据
+        
+        Args:
+            port: 串口端口
+            baudrate: 波特率
+            test_duration: 最长采样时间（秒）
+        
+        Returns:
+            tuple: (质量分数, 结束原因)，结束原因为 'confident'、'budget'、'pruned'、'silent'、
+                   'cancelled' 或 'timeout'
+        """
+        test_serial = serial.Serial(
+            port=port,
+            baudrate=baudrate,
+            timeout=self.scan_read_timeout  # 短超时时间用于快速检测
+        )
+        
+        try:
+            # 清空输入缓冲区
+            test_serial.reset_input_buffer()
+            
+            # 收集数据样本
+            data_samples = []
+            received = 0
+            prune_checked = False
+            start_time = time.time()
+            silence_timeout = self._silence_timeout(baudrate)
+            
+            while received < self.scan_byte_budget:
+                elapsed = time.time() - start_time
+                if elapsed >= test_duration:
+                    return self._evaluate_data_quality(data_samples), 'timeout'
+                if received == 0 and elapsed >= silence_timeout:
+                    return 0, 'silent'
+                if self._detection_cancelled():
+                    return self._evaluate_data_quality(data_samples), 'cancelled'
                 
-                if score > best_score:
-                    best_score = score
-                    best_baudrate = baudrate
+                # 阻塞到有数据到达或读取超时（读取出错时由调用方记录并跳过该波特率）
+                size = min(max(test_serial.in_waiting, 1), self.scan_byte_budget - received)
+                data = test_serial.read(size)
+                if data:
+                    data_samples.append(data)
+                    received += len(data)
                     
-            except Exception as e:
-                print(f"测试波特率 {baudrate} 时出错: {e}")
-                continue
-        
-        return best_baudrate if best_score > 0 else None
+                    score = self._evaluate_data_quality(data_samples)
+                    if score >= self.scan_confidence_score:
+                        return score, 'confident'
+                
+                if (not prune_checked and received >= self.scan_prune_min_chars
+                        and time.time() - start_time >= self.scan_prune_window):
+                    prune_checked = True
+                    if self._printable_ratio(b''.join(data_samples)) < self.scan_prune_ratio:
+                        return self._evaluate_data_quality(data_samples), 'pruned'
+        finally:
+            test_serial.close()
+        
+        # 评估数据质量
+        return self._evaluate_data_quality(data_samples), 'budget'
     
     def _hybrid_decision(self, hw_result, sw_baudrate):
         """
@@ -183,94 +1373,65 @@ class SerialReceiver:
         hw_baudrate = hw_result.get('baudrate')
         hw_confidence = hw_result.get('confidence', 0.0)
         
-        print(f"混合决策分析:")
-        print(f"  硬件检测: {hw_baudrate} (置信度: {hw_confidence:.2f})")
-        print(f"  软件检测: {sw_baudrate}")
+        logger.info("混合决策分析:")
+        logger.info("  硬件检测: %s (置信度: %.2f)", hw_baudrate, hw_confidence)
+        logger.info("  软件检测: %s", sw_baudrate)
         
         # 决策规则
         if hw_confidence >= 0.5:  # 硬件检测有一定置信度
             if hw_baudrate == sw_baudrate:
                 # 两种方法结果一致，置信度最高
-                print("  决策：两种方法结果一致，采用该结果")
+                logger.info("  决策：两种方法结果一致，采用该结果")
                 return hw_baudrate
             else:
                 # 结果不一致，倾向于硬件检测（更精确）
                 if hw_confidence >= 0.6:
-                    print("  决策：硬件检测置信度较高，采用硬件结果")
+                    logger.info("  决策：硬件检测置信度较高，采用硬件结果")
                     return hw_baudrate
                 else:
-                    print("  决策：硬件检测置信度不够，采用软件结果")
+                    logger.info("  决策：硬件检测置信度不够，采用软件结果")
                     return sw_baudrate
         else:
             # 硬件检测置信度很低，使用软件检测结果
-            print("  决策：硬件检测置信度过低，采用软件结果")
+            logger.info("  决策：硬件检测置信度过低，采用软件结果")
             return sw_baudrate
     
     def _evaluate_data_quality(self, data_samples):
         """
-        评估接收到的数据质量 - 通用版本
+        评估接收到的数据质量 - 通用版本（各项分数见 evaluate_data_quality）
         
         Args:
-            data_samples: 数据样本列表
+            data_samples: 数据样本列表（字节数据或字符串）
             
         Returns:
             float: 质量分数 (0-100)
         """
         if not data_samples:
             return 0
-        
-        combined_data = ''.join(data_samples)
-        
-        if not combined_data:
+        return evaluate_data_quality(self._join_samples(data_samples))['total']
+    
+    @staticmethod
+    def _join_samples(data_samples):
+        """合并数据样本；样本中有字符串时，字节样本按ASCII解码（无效字节替换为U+FFFD）"""
+        if all(isinstance(sample, (bytes, bytearray, memoryview)) for sample in data_samples):
+            return b''.join(data_samples)
+        return ''.join(sample if isinstance(sample, str) else bytes(sample).decode('ascii', errors='replace')
+                       for sample in data_samples)
+    
+    @staticmethod
+    def _printable_ratio(data):
+        """可打印字符（含回车、换行和制表符）占数据的比例，空数据为0"""
+        if not len(data):
             return 0
-        
-        score = 0
-        
-        # 1. 数据量评分 (最高40分) - 提高权重
-        # 数据越多表示通信越稳定
-        data_length_score = min(len(combined_data) / 50, 40)  # 50字符以上给满分
-        score += data_length_score
-        
-        # 2. 可打印字符比例评分 (最高40分) - 提高权重  
-        # 可打印字符比例越高表示数据传输质量越好
-        printable_chars = sum(1 for c in combined_data if 32 <= ord(c) <= 126 or c in '\r\n\t')
-        printable_ratio = printable_chars / len(combined_data) if combined_data else 0
-        printable_score = printable_ratio * 40
-        score += printable_score
-        
-        # 3. 数据连续性和规律性评分 (最高20分)
-        consistency_score = 0
-        
-        # 检查是否包含数字（很多串口应用都会传输数字）
-        if re.search(r'\d+', combined_data):
-            consistency_score += 8
-        
-        # 检查是否包含字母（表示有结构化数据）
-        if re.search(r'[a-zA-Z]+', combined_data):
-            consistency_score += 6
-        
-        # 检查是否有重复模式（如循环发送的数据）
-        # 检测重复的字符或数字模式
-        if len(combined_data) >= 4:
-            # 简单检测：是否有重复的2字符模式
-            for i in range(len(combined_data) - 3):
-                pattern = combined_data[i:i+2]
-                if pattern in combined_data[i+2:]:
-                    consistency_score += 3
-                    break
-            
-        # 检查换行符的存在（表示结构化数据）
-        if '\n' in combined_data or '\r' in combined_data:
-            consistency_score += 3
-        
-        score += min(consistency_score, 20)
-        
-        return min(score, 100)  # 确保不超过100分
+        return _printable_count(_character_histogram(_character_codes(data))) / len(data)
         
     def connect_with_auto_detect(self, port=None, test_duration=2.0):
         """
         使用自动波特率检测连接串口
         
+        波特率缓存中有该设备的记录时先快速验证缓存的波特率，验证失败才进行完整检测；
+        连接成功后把波特率和置信度写入缓存。
+        
         Args:
             port: 串口端口
             test_duration: 每个波特率的测试时间
@@ -280,6 +1441,7 @@ class SerialReceiver:
         """
         if port:
             self.port = port
+        self._device_identity = None  # 本次连接重新获取一次设备身份
             
         # 首先尝试检测波特率
         detected_baudrate = self.detect_baudrate(self.port, test_duration)
@@ -290,442 +1452,1062 @@ class SerialReceiver:
             self.baudrate = detected_baudrate
             
             if self.connect():
-                print(f"使用检测到的波特率 {detected_baudrate} 连接成功")
+                logger.info("使用检测到的波特率 %s 连接成功", detected_baudrate)
                 self.auto_detect_baudrate = True
+                if self.baud_cache is not None:
+                    self.baud_cache.store(self._get_device_identity(), detected_baudrate, self.detection_confidence)
                 return True
             else:
                 # 如果连接失败，恢复原波特率
                 self.baudrate = old_baudrate
-                print(f"使用检测到的波特率 {detected_baudrate} 连接失败")
+                logger.warning("使用检测到的波特率 %s 连接失败", detected_baudrate)
+        
+        if self._detection_cancelled():
+            logger.info("自动检测已取消，不连接 %s", self.port)
+            return False
         
         # 如果自动检测失败，尝试使用默认波特率连接
-        print(f"使用默认波特率 {self.baudrate} 连接")
+        logger.info("使用默认波特率 %s 连接", self.baudrate)
         return self.connect()
         
-    def connect(self, port=None):
-        """连接到指定的串口"""
-        if port:
-            self.port = port
+    def connect(self, port=None):
+        """连接到指定的串口"""
+        if port:
+            self.port = port
+        
+        if not self.port:
+            raise ValueError("未指定串口端口")
+            
+        try:
+            self.serial = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
+                timeout=self.timeout
+            )
+            return True
+        except Exception as e:
+            logger.error("串口连接失败: %s", e)
+            return False
+    
+    def _get_device_identity(self):
+        """
+        当前串口的设备身份（波特率缓存的键）
+        
+        device_identity() 需要列出系统中所有串口，每次连接只获取一次，之后使用保存的结果。
+        
+        Returns:
+            dict: device_identity() 返回的身份信息
+        """
+        identity = self._device_identity
+        if identity is None or identity['port'] != self.port:
+            identity = self._device_identity = device_identity(self.port)
+        return identity
+    
+    def get_connection_info(self):
+        """获取连接信息，包括混合检测的详细结果"""
+        if self.serial and self.serial.is_open:
+            info = {
+                'port': self.port,
+                'baudrate': self.baudrate,
+                'timeout': self.timeout,
+                'auto_detected': self.auto_detect_baudrate,
+                'detected_baudrate': self.detected_baudrate,
+                'detection_methods': self.detection_methods,
+                'detection_results': self.detection_results,
+                'protocol': self.decoder.protocol
+            }
+            return info
+        return None
+    
+    def get_metrics(self):
+        """
+        获取运行统计
+        
+        Returns:
+            dict: RECEIVER_COUNTERS 中的计数，RECEIVER_HISTOGRAMS 中的耗时分布
+                  ({count, mean, max, p50, p95, p99}，单位：秒)，以及环形缓冲区的容量和当前占用
+        """
+        metrics = self.metrics.snapshot()
+        metrics['buffer_capacity'] = self.ring_buffer.capacity
+        metrics['buffer_used'] = len(self.ring_buffer)
+        return metrics
+    
+    def reset_metrics(self):
+        """清零运行统计"""
+        self.metrics.reset()
+    
+    def get_latency_stats(self):
+        """
+        获取端到端延迟统计
+        
+        Returns:
+            dict: 各阶段之间的延迟 {'arrived->read': {count, window, p50, p95, p99, max}, ...}（单位：秒），
+                  未启用延迟追踪时为空字典
+        """
+        if self.latency_tracer is None:
+            return {}
+        return self.latency_tracer.summary()
+    
+    def get_detection_summary(self):
+        """获取检测方法的摘要信息"""
+        if not self.detection_results:
+            return "未进行检测"
+        
+        summary = []
+        
+        for method, result in self.detection_results.items():
+            if method == 'hardware_timing':
+                if 'error' in result:
+                    summary.append(f"硬件时序检测: 失败 ({result['error']})")
+                else:
+                    summary.append(f"硬件时序检测: {result['baudrate']} (置信度: {result['confidence']:.2f})")
+            elif method == 'software_quality':
+                summary.append(f"软件质量评估: {result.get('baudrate', '失败')}")
+        
+        return "; ".join(summary)
+    
+    def disconnect(self):
+        """断开串口连接，并取消正在进行的自动重新检测"""
+        if self._redetect_stop is not None:
+            self._redetect_stop.set()
+        redetect_thread = self._redetect_thread
+        if redetect_thread is not None and redetect_thread is not current_thread():
+            redetect_thread.join(timeout=2.0)
+        self._stop_receiving()
+    
+    def _stop_receiving(self):
+        """停止接收和处理线程并关闭串口"""
+        self.is_running = False
+        self.stop_event.set()
+        self.process_event.set()  # 唤醒等待中的处理线程
+        
+        # 中断正在阻塞的读取，使接收线程立即退出
+        if self.serial and self.serial.is_open and hasattr(self.serial, 'cancel_read'):
+            try:
+                self.serial.cancel_read()
+            except Exception:
+                pass
+        
+        for thread in self.threads:
+            if thread is not current_thread():
+                thread.join(timeout=1.0)
+        self.threads = []
+        
+        if self.serial and self.serial.is_open:
+            self.serial.close()
+        self._device_identity = None  # 重新连接时设备可能已经更换
+            
+    def list_ports(self):
+        """列出所有可用的串口"""
+        from serial.tools import list_ports
+        return [port.device for port in list_ports.comports()]
+    
+    def start_receiving(self):
+        """开始接收数据的线程"""
+        if self.backpressure_policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"不支持的缓冲区满处理策略: {self.backpressure_policy}")
+        if not self.serial or not self.serial.is_open:
+            return False
+            
+        self.is_running = True
+        self.stop_event.clear()
+        
+        # 启动数据接收线程 - 只负责接收数据并写入环形缓冲区
+        receive_thread = Thread(target=self._receive_thread, daemon=True)
+        receive_thread.start()
+        
+        # 启动数据处理线程 - 负责解码环形缓冲区中的数据
+        process_thread = Thread(target=self._process_thread, daemon=True)
+        process_thread.start()
+        
+        self.threads = [receive_thread, process_thread]
+        return True
+        
+    def _receive_thread(self):
+        """接收数据的线程 - 仅负责从串口读取数据并写入环形缓冲区"""
+        reconnect_delay = 1.0  # 初始重连延迟时间（秒）
+        max_reconnect_delay = 5.0  # 最大重连延迟
+        
+        while self.is_running and not self.stop_event.is_set():
+            try:
+                # 检查串口是否连接并打开
+                if not self.serial or not self.serial.is_open:
+                    self.stop_event.wait(reconnect_delay)
+                    try:
+                        # 尝试重新连接
+                        if self.serial and not self.serial.is_open:
+                            self.serial.open()
+                            logger.info("串口重新连接成功")
+                            reconnect_delay = 1.0  # 重置重连延迟
+                    except Exception as e:
+                        # 连接失败，增加重连延迟时间（指数退避）
+                        reconnect_delay = min(reconnect_delay * 1.5, max_reconnect_delay)
+                        logger.warning("串口重连失败: %s, 将在 %.1f 秒后重试", e, reconnect_delay)
+                    continue
+                
+                # 读取数据
+                try:
+                    # 一次读取所有可用数据，减少读取次数；保持原始字节，由解码器直接处理
+                    received_data = self._read_serial()
+                    
+                    if received_data:
+                        read_time = time.perf_counter()
+                        self.metrics.increment('bytes_read', len(received_data))
+                        self._enqueue(received_data, read_time)
+                            
+                except (serial.SerialException, OSError) as e:
+                    if "句柄无效" in str(e) or "Handle is invalid" in str(e):
+                        # 跳过句柄无效错误，尝试下次循环重新连接
+                        logger.warning("串口句柄无效，将尝试重新连接...")
+                        if self.serial:
+                            try:
+                                self.serial.close()
+                            except Exception:
+                                pass
+                        self.stop_event.wait(reconnect_delay)
+                        continue
+                    else:
+                        # 其他错误，打印信息
+                        logger.error("读取串口数据时出错: %s", e)
+                
+                # 轮询模式下短暂休眠，避免过度读取；阻塞模式下读取本身会等待数据
+                if self.receive_mode == 'polling':
+                    self.stop_event.wait(0.001)  # 1ms的休眠，确保高速响应
+                
+            except Exception as e:
+                error_msg = str(e)
+                # 过滤掉句柄无效错误的重复打印
+                if "句柄无效" not in error_msg and "Handle is invalid" not in error_msg:
+                    logger.error("接收线程出错: %s", e)
+                self.stop_event.wait(0.1)  # 出错后短暂休眠
+                
+    def _enqueue(self, data, read_time):
+        """
+        将读取到的数据块写入环形缓冲区（接收线程调用）
+        
+        缓冲区空间不足时按 backpressure_policy 处理，并精确统计丢弃的字节数和记录数。
+        
+        Args:
+            data: 读取到的数据块
+            read_time: 读取时间（time.perf_counter()）
+        """
+        dropped = 0
+        records = 0
+        policy = self.backpressure_policy
+        ring = self.ring_buffer
+        
+        chunk = data
+        context = self._drop_context
+        context_size = self.decoder.START_CONTEXT
+        if len(data) > ring.free:
+            if policy == 'block':
+                data = self._wait_for_space(data)
+            elif policy == 'drop_newest':
+                # 整块丢弃：只写入一部分会把不相关的数据拼接成错误的记录
+                dropped = len(data)
+                records = self.decoder.count_record_starts(data, context)
+                ring.dropped_bytes += dropped
+                self._gaps.append(ring.write_position)
+                self._drop_context_kept = 0
+                data = b''
+            else:
+                dropped, records, data = self._drop_oldest(data, policy == 'coalesce')
+        elif self._drop_context_kept is not None:
+            # 起始于被丢弃的数据、结束于这个数据块中的起始标记，它的记录同样无法解析
+            kept = self._drop_context_kept
+            lost = self.decoder.count_split_starts(data, context, kept)
+            if lost:
+                self.metrics.increment('records_dropped', lost)
+            kept += len(data)
+            self._drop_context_kept = kept if kept < context_size else None
+        self._drop_context = (context + bytes(chunk[-context_size:]))[-context_size:]
+        
+        if data:
+            ring.write(data)
+            self._chunk_times.append((ring.write_position, read_time))
+            self.metrics.increment('chunks_queued')
+            self.metrics.set_max('buffer_high_water', len(ring))
+            self.process_event.set()  # 通知处理线程有新数据
+        
+        if dropped:
+            self.metrics.increment('chunks_dropped')
+            self.metrics.increment('bytes_dropped', dropped)
+            self.metrics.increment('records_dropped', records)
+        self._update_drop_state(dropped > 0)
+    
+    def _drop_oldest(self, data, coalesce):
+        """
+        丢弃最早的未处理数据，为新数据块腾出空间（接收线程调用）
+        
+        只在移动读位置时短暂持有 _ring_lock，不等待处理线程解码：正在解码的数据不受影响，
+        处理线程下一次取出数据时发现读位置不连续，由它重置解码器并统计其中未完成的记录。
+        被丢弃的数据在写入新数据之前不会被覆盖，因此在锁外统计其中的记录起始标记。
+        
+        Args:
+            data: 新数据块
+            coalesce: 为True时丢弃全部未处理的数据
+        
+        Returns:
+            tuple: (丢弃的字节数, 丢弃的记录数, 需要写入的数据)
+        """
+        ring = self.ring_buffer
+        with self._ring_lock:
+            unread = len(ring)
+            size = unread if coalesce else min(max(len(data) - ring.capacity + unread, 0), unread)
+            context = self._read_context
+            lost = ring.peek(size)
+            ring.discard(size)
+            if len(data) > ring.free and len(ring):
+                # 正在解码的数据仍占用空间：丢弃全部未处理的数据，使被丢弃的数据与新数据块的开头连续
+                size += len(ring)
+                lost += ring.peek()
+                ring.discard(len(ring))
+            # 数据块本身放不下（或正在解码的数据占用了空间）时只保留它能写入的最后一部分
+            head = max(len(data) - ring.free, 0)
+            lost.append(memoryview(data)[:head])
+            self._read_context = self._tail_context(context, lost)
+            self._read_context_kept = 0
+        if head:
+            ring.dropped_bytes += head
+            self._gaps.append(ring.write_position)
+        # 起始标记结束于被丢弃的数据中的记录
+        records = self._count_record_starts(lost, context)
+        return size + head, records, data[head:]
+    
+    def _wait_for_space(self, data):
+        """
+        等待处理线程腾出空间，分段写入数据块（接收线程调用，'block' 策略）
+        
+        Returns:
+            bytes: 最后一段需要写入的数据，停止接收时为空
+        """
+        ring = self.ring_buffer
+        view = memoryview(data)
+        start_time = time.perf_counter()
+        while len(view) > ring.free and not self.stop_event.is_set():
+            if ring.free:
+                view = view[ring.write(view[:ring.free]):]
+                self.process_event.set()
+            self.space_event.clear()
+            if len(view) > ring.free:
+                self.space_event.wait(self.read_timeout)
+        self.metrics.increment('blocked_time_us', int((time.perf_counter() - start_time) * 1e6))
+        return b'' if self.stop_event.is_set() else bytes(view)
+    
+    def _update_drop_state(self, dropping):
+        """记录开始/停止丢弃数据，状态变化时输出日志并调用 on_drop_change"""
+        if dropping == self.dropping:
+            return
+        self.dropping = dropping
+        stats = self.get_drop_stats()
+        if dropping:
+            self.metrics.increment('drop_episodes')
+            logger.warning("数据接收缓冲区已满（策略: %s），开始丢弃数据", self.backpressure_policy)
+        else:
+            logger.info("停止丢弃数据，累计丢弃 %s 字节、%s 条记录",
+                        stats['bytes_dropped'], stats['records_dropped'])
+        if self.on_drop_change:
+            try:
+                self.on_drop_change(dropping, stats)
+            except Exception as e:
+                logger.error("丢弃数据回调出错: %s", e)
+    
+    def get_drop_stats(self):
+        """
+        获取因缓冲区已满丢弃的数据统计
+        
+        Returns:
+            dict: {policy, dropping, chunks_dropped, bytes_dropped, records_dropped, drop_episodes}
+        """
+        metrics = self.metrics.snapshot()
+        stats = {name: metrics[name] for name in ('chunks_dropped', 'bytes_dropped', 'records_dropped', 'drop_episodes')}
+        stats['policy'] = self.backpressure_policy
+        stats['dropping'] = self.dropping
+        return stats
+    
+    def _read_serial(self):
+        """
+        从串口读取数据
+        
+        阻塞模式下先用带超时的 read(1) 在内核中等待第一个字节（POSIX 上 pyserial 内部使用 select），
+        数据到达后立即返回，再一次性读出其余已到达的数据；超时时间决定了停止接收的最长响应时间。
+        轮询模式保留原来的 in_waiting 检查方式。
+        
+        Returns:
+            bytes: 读取到的数据，没有数据时为空
+        """
+        if self.receive_mode == 'polling':
+            waiting = self.serial.in_waiting
+            if not waiting:
+                return b''
+            self.metrics.increment('read_calls')
+            return self.serial.read(waiting)
+        
+        if self.serial.timeout != self.read_timeout:
+            self.serial.timeout = self.read_timeout
+        
+        self.metrics.increment('read_calls')
+        data = self.serial.read(1)
+        if data:
+            waiting = self.serial.in_waiting
+            if waiting:
+                self.metrics.increment('read_calls')
+                data += self.serial.read(waiting)
+        return data
+    
+    def _process_thread(self):
+        """处理数据的线程 - 负责解码环形缓冲区中的数据"""
+        while self.is_running and not self.stop_event.is_set():
+            try:
+                # 等待新数据或超时
+                # 按到达间隔分帧时，需要在帧间隔之后检查当前帧是否已经结束
+                timeout = 0.2
+                if self.frame_assembler.mode == 'gap' and (self.frame_assembler.pending or self.decoder.pending):
+                    timeout = self.frame_assembler.gap_seconds(self.baudrate)
+                self.process_event.wait(timeout=timeout)
+                self.process_event.clear()
+                self._process_ring_buffer()
+                self._check_link_quality()
+            
+            except Exception as e:
+                logger.error("处理线程出错: %s", e)
+                time.sleep(0.1)
+    
+    def _process_ring_buffer(self):
+        """解码环形缓冲区中的全部数据；没有数据时输出解码器中等待结束符的对象"""
+        ring = self.ring_buffer
+        with self.process_lock:
+            # 取出数据后释放 _ring_lock，解码期间接收线程仍可写入或丢弃未取出的数据
+            with self._ring_lock:
+                position = ring.read_position
+                segments = ring.take()
+                context = self._advance_read_context(segments)
+            if segments:
+                self.space_event.set()  # 通知等待空间的接收线程
+            if position != self._next_position:
+                # 上次取出的数据之后的数据已被接收线程丢弃，解码器中未完成的记录不会再补全
+                self.metrics.increment('records_dropped', self.decoder.pending_records)
+                self._reset_stream()
+            
+            if segments:
+                # 直接解码环形缓冲区中的数据片段，处理完成后再释放空间
+                size = sum(len(segment) for segment in segments)
+                self._next_position = position + size
+                chunks = self._take_chunk_times(position + size)
+                if self.latest_only and len(chunks) > 1 and chunks[-2][0] > position:
+                    # 处理速度跟不上时只解析最新的完整记录（帧），显示不会越来越滞后
+                    segments, position, chunks = self._skip_stale_data(segments, position, chunks, context)
+                for segment in segments:
+                    self._feed_segment(segment, position, chunks)
+                    position += len(segment)
+                with self._ring_lock:
+                    ring.release()
+                self.space_event.set()
+            elif self._gaps:
+                # 已处理的数据之后紧接着是被丢弃的数据，解码器中未完成的记录不会再补全
+                self._feed_segment(b'', position, None)
+            elif self.decoder.pending:
+                # 链路空闲时检查解码器中是否有等待结束符的对象
+                self._reprocess_buffer()
+            if self.frame_assembler.mode == 'gap':
+                # 链路空闲超过帧间隔时结束当前帧
+                self._publish_frames(self.frame_assembler.poll(time.perf_counter(), self.baudrate))
+    
+    def _check_link_quality(self):
+        """
+        更新链路质量监测的状态（处理线程调用）
+        
+        链路质量下降时计数、记录日志并调用 on_link_event；auto_redetect 为True（为None时为自动检测
+        波特率的连接）时在后台线程中重新检测波特率并重新连接（见 _redetect_link）。
+        """
+        monitor = self.link_monitor
+        if monitor is None:
+            return
+        event = monitor.update(time.perf_counter(), text=self.decoder.protocol != 'binary')
+        if event is None:
+            return
+        info = monitor.events[-1]
+        self.metrics.increment(f'link_{event}')
+        if event == 'degraded':
+            logger.warning("端口 %s 链路质量下降: %s", self.port, ", ".join(info['reasons']))
+        else:
+            logger.info("端口 %s 链路质量已恢复", self.port)
+        self._notify_link_event(event, info)
+        
+        redetect = self.auto_detect_baudrate if self.auto_redetect is None else self.auto_redetect
+        if event == 'degraded' and redetect and self.port and self._redetect_thread is None:
+            self._redetect_stop = Event()
+            self._redetect_thread = Thread(target=self._redetect_link, args=(self._redetect_stop,), daemon=True)
+            self._redetect_thread.start()
+    
+    def _notify_link_event(self, event, info):
+        """调用链路事件回调，回调出错不影响接收"""
+        if self.on_link_event:
+            try:
+                self.on_link_event(event, info)
+            except Exception as e:
+                logger.error("链路事件回调出错: %s", e)
+    
+    def _redetect_link(self, stop_event):
+        """
+        重新检测波特率并重新连接（后台线程）
+        
+        停止接收后用快速检测（先验证当前波特率，再按先验顺序扫描）确定新的波特率，
+        检测失败时保留原来的波特率重新连接。调用 disconnect() 会取消检测且不再重新连接。
+        
+        Args:
+            stop_event: 取消本次重新检测的事件
+        """
+        self.metrics.increment('redetections')
+        old_baudrate = self.baudrate
+        was_running = self.is_running
+        previous_cancel_event = self.cancel_event
+        self.cancel_event = stop_event
+        baudrate = None
+        try:
+            self._stop_receiving()
+            logger.info("端口 %s 开始重新检测波特率（当前 %s）", self.port, old_baudrate)
+            baudrate = self.detect_baudrate(self.port, self.redetect_duration)
+        except Exception as e:
+            logger.error("端口 %s 重新检测波特率出错: %s", self.port, e)
+        finally:
+            self.cancel_event = previous_cancel_event
+        
+        try:
+            if stop_event.is_set():
+                logger.info("端口 %s 的重新检测已取消", self.port)
+                return
+            
+            if baudrate:
+                self.baudrate = baudrate
+            with self.process_lock:
+                # 旧波特率下收到的数据已经没有意义
+                self._clear_ring_buffer()
+                if hasattr(self.decoder, 'redetect'):
+                    self.decoder.redetect()
+                self._reset_stream()
+            
+            connected = self.connect() and (not was_running or self.start_receiving())
+            if self.link_monitor is not None:
+                self.link_monitor.reset()
+            if baudrate and connected:
+                if self.baud_cache is not None:
+                    self.baud_cache.store(self._get_device_identity(), baudrate, self.detection_confidence)
+                event, reasons = 'redetected', []
+                logger.info("端口 %s 已使用波特率 %s 重新连接", self.port, baudrate)
+            else:
+                self.metrics.increment('redetections_failed')
+                event, reasons = 'redetect_failed', ['detection' if not baudrate else 'connect']
+                logger.warning("端口 %s 重新检测失败，%s波特率 %s",
+                               self.port, "继续使用" if connected else "无法以", self.baudrate)
+            info = {'baudrate': self.baudrate, 'previous_baudrate': old_baudrate}
+            if self.link_monitor is not None:
+                self.link_monitor.add_event(event, reasons, info)
+                info = self.link_monitor.events[-1]
+            self._notify_link_event(event, info)
+        finally:
+            self._redetect_thread = None
+            self._redetect_stop = None
+    
+    def get_link_quality(self):
+        """
+        获取链路质量
+        
+        Returns:
+            dict: 滑动窗口内的指标（见 LinkQualityMonitor.snapshot），以及 redetecting（是否正在重新检测）
+                  和 events（最近的链路事件），未启用监测时返回None
+        """
+        monitor = self.link_monitor
+        if monitor is None:
+            return None
+        quality = monitor.snapshot()
+        quality['redetecting'] = self._redetect_thread is not None
+        quality['events'] = list(monitor.events)
+        return quality
+    
+    def _skip_stale_data(self, segments, position, chunks, context=b''):
+        """
+        跳过积压的过期数据（调用方需持有process_lock，latest_only 模式）
+        
+        数据块的边界不一定是记录的边界，因此跳到最新数据块起始处所在的记录的起始位置，
+        这条记录还没有收完时跳到之前最后一条完整的记录；按分隔符或帧头分帧时跳到最新的完整帧的起始位置。
+        跳过的数据不经过解码器，只统计其中的记录起始标记，开销很小；解码器被重置，从跳过的位置重新开始解码。
+        
+        Args:
+            segments: 取出的数据片段
+            position: 第一个片段在数据流中的位置
+            chunks: 覆盖这些片段的数据块读取时间 [(结束位置, 读取时间), ...]
+            context: 数据流中这些片段之前、尚未计入丢弃记录数的字节（见 _advance_read_context）
+        
+        Returns:
+            tuple: (剩余的数据片段, 剩余数据在数据流中的位置, 剩余的数据块读取时间)
+        """
+        total = sum(len(segment) for segment in segments)
+        if self.frame_assembler.mode in ('delimiter', 'count'):
+            size = self._latest_frame_start(segments, total)
+        else:
+            # 只在最新数据块的起始位置附近查找，复制的数据不超过几条记录（帧）的长度
+            target = chunks[-2][0] - position
+            window = 2 * self.decoder.MAX_PENDING
+            lower = max(target - window, 0)
+            size = self.decoder.latest_record_start(
+                b"".join(_slice_segments(segments, lower, target + window)), target - lower)
+            if size is not None:
+                size += lower
+        if not size:
+            return segments, position, chunks
+        
+        remaining = _slice_segments(segments, size, total)
+        for piece in _slice_segments(segments, 0, size):
+            self._append_recent_data(piece)  # 原始数据仍然显示
+        # 解码器中未完成的记录不再补全；跳过的位置是记录（帧）的起始处，没有跨越它的起始标记
+        records = self.decoder.pending_records
+        self._reset_stream()
+        
+        # 被跳过的数据中的缺失位置已经不影响解码。缺失位置两侧的数据并不相连，分别统计，
+        # 跨越缺失位置的起始标记已由接收线程计入丢弃的记录数
+        end = position + size
+        start = 0
+        if self._last_gap == position:
+            context = b''
+        while self._gaps and self._gaps[0] <= end:
+            self._last_gap = self._gaps.popleft()
+            gap = self._last_gap - position
+            if gap > start:
+                records += self._count_record_starts(_slice_segments(segments, start, gap), context)
+                start = gap
+            context = b''
+        records += self._count_record_starts(_slice_segments(segments, start, size), context)
+        
+        self.metrics.increment('frames_skipped', sum(1 for chunk_end, _ in chunks if position < chunk_end <= end))
+        self.metrics.increment('bytes_skipped', size)
+        self.metrics.increment('records_skipped', records)
+        return remaining, end, [chunk for chunk in chunks if chunk[0] > end]
+    
+    def _latest_frame_start(self, segments, total):
+        """
+        取出的数据中最新的完整帧的起始位置（见 FrameAssembler.latest_frame_start）
+        
+        从末尾开始逐步扩大查找范围，只复制查找范围内的数据。
+        
+        Returns:
+            int: 起始位置，帧标记少于两个时为None
+        """
+        window = 4096
+        while True:
+            start = max(total - window, 0)
+            found = self.frame_assembler.latest_frame_start(b"".join(_slice_segments(segments, start, total)))
+            if found is not None or not start:
+                return found if found is None else start + found
+            window *= 4
+    
+    def _count_record_starts(self, pieces, context):
+        """
+        统计依次相连的数据片段中结束于其中的起始标记对应的记录数（逐个片段查找，不拼接数据）
+        
+        Args:
+            pieces: 数据片段列表
+            context: 数据流中第一个片段之前的字节
+        
+        Returns:
+            int: 记录数
+        """
+        records = 0
+        for piece in pieces:
+            records += self.decoder.count_record_starts(piece, context)
+            context = self._tail_context(context, [piece])
+        return records
+    
+    def _advance_read_context(self, segments):
+        """
+        读位置越过取出的数据片段时更新 _read_context（调用方需持有_ring_lock）
+        
+        紧接在被丢弃的数据之后处理的几个字节中，结束于其中的起始标记起始于被丢弃的数据，
+        解码器已被重置而看不到完整的标记，这些记录计入丢弃的记录数。
+        
+        Returns:
+            bytes: 数据流中这些片段之前、最后一次丢弃之后的字节（最多 START_CONTEXT 个），
+                   用于统计跳过的数据中的记录，不重复统计起始于被丢弃数据中的标记
+        """
+        context_size = self.decoder.START_CONTEXT
+        context = self._read_context
+        kept = self._read_context_kept
+        if kept is not None:
+            head = b"".join(bytes(segment[:context_size]) for segment in segments[:context_size])
+            lost = self.decoder.count_split_starts(head, context, kept)
+            if lost:
+                self.metrics.increment('records_dropped', lost)
+            new_kept = kept + sum(len(segment) for segment in segments)
+            self._read_context_kept = new_kept if new_kept < context_size else None
+            context = context[max(len(context) - kept, 0):] if kept else b''
+        self._read_context = self._tail_context(self._read_context, segments)
+        return context
+    
+    def _tail_context(self, context, segments):
+        """数据流中 context 之后紧接着这些数据片段时，最后 START_CONTEXT 个字节"""
+        context_size = self.decoder.START_CONTEXT
+        for segment in segments[-context_size:]:
+            context = (context + bytes(segment[-context_size:]))[-context_size:]
+        return context
+    
+    def _clear_ring_buffer(self):
+        """丢弃环形缓冲区中尚未处理的数据（调用方需持有process_lock）"""
+        with self._ring_lock:
+            self.ring_buffer.clear()
+            self._next_position = self.ring_buffer.read_position
+            self._read_context = b''
+            self._read_context_kept = None
+        self._chunk_times.clear()
+        self._gaps.clear()
+        self._last_gap = None
+        self.space_event.set()
+    
+    def _reprocess_buffer(self):
+        """
+        输出解码器中等待结束符的对象（调用方需持有process_lock）
+        
+        正常解析时，恰好结束于数据块末尾的对象会被暂缓，因为最后一个数字可能还没有收完；
+        链路空闲时说明数据已经发送完毕，此时按完整数据解析。
+        """
+        try:
+            records = self.decoder.flush()
+            if records:
+                # 这些记录结束于最后一个数据块的末尾
+                self._handle_records(records, self._estimate_record_times(len(records), None, 0, None))
+        except Exception as e:
+            logger.error("解析数据错误: %s", e)
+            self._reset_stream()
+    
+    def _append_recent_data(self, data):
+        """
+        记录最近接收的原始数据，供界面显示（调用方需持有process_lock）
+        
+        只有设置了 recent_data_limit 时才复制数据；超过两倍上限时才裁剪，
+        不必每个数据块都移动整个 recent_data。
+        """
+        with self.data_lock:
+            self.received_total += len(data)
+            limit = self.recent_data_limit
+            if limit:
+                self.recent_data += data
+                if len(self.recent_data) > 2 * limit:
+                    del self.recent_data[:-limit]
+    
+    def get_recent_data(self):
+        """
+        获取最近接收的原始数据
+        
+        Returns:
+            tuple: (累计接收的字节数, 最近的原始数据字符串)
+        """
+        with self.data_lock:
+            return self.received_total, self.recent_data[-self.recent_data_limit:].decode('ascii', errors='replace')
+    
+    def _process_data(self, data):
+        """
+        处理接收到的数据
+        
+        Args:
+            data: 原始字节数据（bytes/bytearray/memoryview），也兼容ASCII字符串
+        """
+        if isinstance(data, str):
+            data = data.encode('ascii', errors='replace')
+        
+        with self.process_lock:
+            # 直接传入的数据视为刚刚读取的一个数据块
+            self._feed_data(data, 0, [(len(data), time.perf_counter())])
+    
+    def _feed_data(self, data, position=None, chunks=None):
+        """
+        将数据交给解码器并更新目标列表（调用方需持有process_lock）
+        
+        Args:
+            data: 原始字节数据
+            position: data 第一个字节在数据流中的位置，用于延迟追踪
+            chunks: 覆盖 data 的数据块 [(结束位置, 读取时间), ...]，用于延迟追踪
+        """
+        self._append_recent_data(data)
         
-        if not self.port:
-            raise ValueError("未指定串口端口")
-            
+        start_time = time.perf_counter()
+        parsed = 0
         try:
-            self.serial = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=self.timeout
-            )
-            return True
+            # 在帧标记处切分数据，标记之前的记录解码完成后再结束当前帧
+            for piece, marked, value in self.frame_assembler.split(data):
+                if len(piece):
+                    # 解码器保存了上一个数据块未完成的记录，只需处理新数据
+                    records = self.decoder.feed(piece)
+                    if records:
+                        parsed += len(records)
+                        self._handle_records(records, self._estimate_record_times(len(records), position, len(piece), chunks))
+                    if position is not None:
+                        position += len(piece)
+                if marked:
+                    self._publish_frames(self.frame_assembler.mark(value))
         except Exception as e:
-            print(f"串口连接失败: {e}")
-            return False
+            logger.error("解析数据错误: %s", e)
+            # 出现解析错误时，丢弃未完成的记录防止错误累积
+            self._reset_stream()
+        self.metrics.observe('parse_time', time.perf_counter() - start_time)
+        if self.link_monitor is not None:
+            self.link_monitor.record(data, parsed, start_time)
     
-    def get_connection_info(self):
-        """获取连接信息，包括混合检测的详细结果"""
-        if self.serial and self.serial.is_open:
-            info = {
-                'port': self.port,
-                'baudrate': self.baudrate,
-                'timeout': self.timeout,
-                'auto_detected': self.auto_detect_baudrate,
-                'detected_baudrate': self.detected_baudrate,
-                'detection_methods': self.detection_methods,
-                'detection_results': self.detection_results
-            }
-            return info
-        return None
+    def _reset_stream(self):
+        """数据流中断时丢弃解码器中未完成的记录和正在组装的帧（调用方需持有process_lock）"""
+        self.decoder.reset()
+        self._publish_frames(self.frame_assembler.reset())
     
-    def get_detection_summary(self):
-        """获取检测方法的摘要信息"""
-        if not self.detection_results:
-            return "未进行检测"
-        
-        summary = []
-        
-        for method, result in self.detection_results.items():
-            if method == 'hardware_timing':
-                if 'error' in result:
-                    summary.append(f"硬件时序检测: 失败 ({result['error']})")
-                else:
-                    summary.append(f"硬件时序检测: {result['baudrate']} (置信度: {result['confidence']:.2f})")
-            elif method == 'software_quality':
-                summary.append(f"软件质量评估: {result.get('baudrate', '失败')}")
+    def _feed_segment(self, segment, position, chunks):
+        """
+        解码环形缓冲区中的一个片段，在被丢弃的数据所在位置重置解码器（调用方需持有process_lock）
         
-        return "; ".join(summary)
+        Args:
+            segment: 数据片段
+            position: 片段在数据流中的起始位置
+            chunks: 覆盖该片段的数据块读取时间
+        """
+        end = position + len(segment)
+        while self._gaps and self._gaps[0] <= end:
+            gap = self._last_gap = self._gaps.popleft()
+            if gap > position:
+                self._feed_data(segment[:gap - position], position, chunks)
+                segment = segment[gap - position:]
+                position = gap
+            # 缺失的数据之前未完成的记录无法补全，丢弃并计入丢弃的记录数
+            if self.decoder.pending_records:
+                self.metrics.increment('records_dropped', self.decoder.pending_records)
+            self._reset_stream()
+        if len(segment):
+            self._feed_data(segment, position, chunks)
     
-    def disconnect(self):
-        """断开串口连接"""
-        self.is_running = False
-        time.sleep(0.2)  # 给线程一些时间来清理
+    def _take_chunk_times(self, end):
+        """
+        取出结束位置不超过 end 的数据块读取时间（调用方需持有process_lock）
         
-        if self.serial and self.serial.is_open:
-            self.serial.close()
-            
-    def list_ports(self):
-        """列出所有可用的串口"""
-        from serial.tools import list_ports
-        return [port.device for port in list_ports.comports()]
+        Args:
+            end: 本次处理的数据在数据流中的结束位置
+        
+        Returns:
+            list: [(结束位置, 读取时间), ...]，按位置递增，最后一项覆盖到 end
+        """
+        chunks = []
+        while self._chunk_times and self._chunk_times[0][0] <= end:
+            chunks.append(self._chunk_times.popleft())
+        if not chunks or chunks[-1][0] < end:
+            # 数据已写入但接收线程还没有记录读取时间，此时读取刚刚发生
+            chunks.append((end, time.perf_counter()))
+        self._last_read_time = chunks[-1][1]
+        return chunks
     
-    def start_receiving(self):
-        """开始接收数据的线程"""
-        if not self.serial or not self.serial.is_open:
-            return False
-            
-        self.is_running = True
+    def _estimate_record_times(self, count, position, size, chunks):
+        """
+        估算记录的到达时间和读取时间
         
-        # 启动数据接收线程 - 只负责接收数据并放入队列
-        Thread(target=self._receive_thread, daemon=True).start()
+        解码器不报告记录在数据中的位置，这里假设 count 条记录均匀分布在 size 字节中，
+        第 k 条记录结束于 position + size * (k + 1) / count；包含该位置的数据块的读取时间
+        减去之后的字节在串口上的传输时间（每字节10位）即为记录的估算到达时间。
         
-        # 启动数据处理线程 - 负责处理队列中的数据
-        Thread(target=self._process_thread, daemon=True).start()
+        Args:
+            count: 记录数
+            position: 数据在数据流中的起始位置，为None时使用最近一次读取时间
+            size: 数据字节数
+            chunks: [(结束位置, 读取时间), ...]
         
-        return True
+        Returns:
+            tuple: (到达时间数组, 读取时间数组)，不追踪延迟时为None
+        """
+        if self.latency_tracer is None and self.frame_assembler.mode != 'gap':
+            return None
+        if position is None or not chunks:
+            read_time = self._last_read_time or time.perf_counter()
+            times = np.full(count, read_time)
+            return times, times
+        
+        ends = np.array([end for end, _ in chunks], dtype=np.float64)
+        read_times = np.array([read_time for _, read_time in chunks])
+        offsets = position + size * np.arange(1, count + 1) / count
+        index = np.minimum(np.searchsorted(ends, offsets), len(ends) - 1)
+        byte_time = 10.0 / self.baudrate if self.baudrate else 0.0
+        arrived = read_times[index] - np.maximum(ends[index] - offsets, 0) * byte_time
+        return arrived, read_times[index]
+    
+    def _handle_records(self, records, record_times=None):
+        """
+        校验解码出的记录并更新目标列表（调用方需持有process_lock）
         
-    def _receive_thread(self):
-        """接收数据的线程 - 仅负责从串口读取数据并放入队列"""
-        reconnect_delay = 1.0  # 初始重连延迟时间（秒）
-        max_reconnect_delay = 5.0  # 最大重连延迟
+        Args:
+            records: 解码器输出的记录列表 [(class, score, x1, y1, x2, y2), ...]
+            record_times: _estimate_record_times 返回的 (到达时间数组, 读取时间数组)
+        """
+        # 批量整理坐标并检查范围，不再逐个对象处理
+        raw = records_to_array(records)
+        detections, valid = normalize_detections(raw)
+        logger.debug("匹配到 %s 个目标", len(detections))
+        self.metrics.increment('records_parsed', len(detections))
+        
+        if not valid.all():
+            self.metrics.increment('records_rejected', int(np.count_nonzero(~valid)))
+            for obj_class, score, x1, y1, x2, y2 in raw[~valid].tolist():
+                logger.warning("记录数值超出有效范围，已忽略: class=%s score=%s (%s, %s, %s, %s)",
+                               obj_class, score, x1, y1, x2, y2)
+        
+        # 临时存储所有检测到的新对象，稍后会进行处理
+        new_detected_objects = [Detection.from_record(record) for record in detections[valid].tolist()]
+        
+        arrived = None
+        if new_detected_objects and record_times is not None:
+            arrived = record_times[0][valid].tolist()
+            if self.latency_tracer is not None:
+                self.latency_tracer.start(new_detected_objects, arrived, record_times[1][valid].tolist())
+        
+        # 加入当前帧，帧结束后再与现有对象进行全局分析
+        if new_detected_objects:
+            self._publish_frames(self.frame_assembler.add(new_detected_objects, arrived, self.baudrate))
+    
+    def _publish_frames(self, frames):
+        """
+        发布已结束的帧：每帧只做一次合并和去重，object_data 即为该帧的结果（调用方需持有process_lock）
         
-        while self.is_running:
-            try:
-                # 检查串口是否连接并打开
-                if not self.serial or not self.serial.is_open:
-                    time.sleep(reconnect_delay)
-                    try:
-                        # 尝试重新连接
-                        if self.serial and not self.serial.is_open:
-                            self.serial.open()
-                            print("串口重新连接成功")
-                            reconnect_delay = 1.0  # 重置重连延迟
-                    except Exception as e:
-                        # 连接失败，增加重连延迟时间（指数退避）
-                        reconnect_delay = min(reconnect_delay * 1.5, max_reconnect_delay)
-                        print(f"串口重连失败: {e}, 将在 {reconnect_delay:.1f} 秒后重试")
-                    continue
-                
-                # 读取数据
-                if self.serial.in_waiting:
-                    try:
-                        # 一次读取所有可用数据，减少读取次数
-                        received_data = self.serial.read(self.serial.in_waiting).decode('ascii', errors='replace')
-                        
-                        # 放入队列，不阻塞，如果队列满则丢弃最早的数据
-                        try:
-                            if not self.data_queue.full():
-                                self.data_queue.put_nowait(received_data)
-                                self.process_event.set()  # 通知处理线程有新数据
-                            else:
-                                # 队列满了，打印警告并丢弃数据
-                                print("警告: 数据接收缓冲区已满，部分数据将被丢弃")
-                                # 清空队列的一半数据，以便接收新数据
-                                for _ in range(self.data_queue.qsize() // 2):
-                                    try:
-                                        self.data_queue.get_nowait()
-                                    except queue.Empty:
-                                        break
-                                # 现在尝试添加新数据
-                                self.data_queue.put_nowait(received_data)
-                                self.process_event.set()
-                                
-                        except queue.Full:
-                            pass  # 队列满，忽略此批数据
-                            
-                    except (serial.SerialException, OSError) as e:
-                        if "句柄无效" in str(e) or "Handle is invalid" in str(e):
-                            # 跳过句柄无效错误，尝试下次循环重新连接
-                            print("串口句柄无效，将尝试重新连接...")
-                            if self.serial:
-                                try:
-                                    self.serial.close()
-                                except Exception:
-                                    pass
-                            time.sleep(reconnect_delay)
-                            continue
-                        else:
-                            # 其他错误，打印信息
-                            print(f"读取串口数据时出错: {e}")
-                
-                # 短暂休眠，避免过度读取
-                time.sleep(0.001)  # 1ms的休眠，确保高速响应
-                
-            except Exception as e:
-                error_msg = str(e)
-                # 过滤掉句柄无效错误的重复打印
-                if "句柄无效" not in error_msg and "Handle is invalid" not in error_msg:
-                    print(f"接收线程出错: {e}")
-                time.sleep(0.1)  # 出错后短暂休眠
-                
-    def _process_thread(self):
-        """处理数据的线程 - 负责处理队列中的数据"""
-        reprocess_timer = 0  # 用于定期重新处理缓冲区的计时器
+        只在更新目标列表期间持有 data_lock。
         
-        while self.is_running:
-            try:
-                # 等待新数据或超时
-                self.process_event.wait(timeout=0.2)
-                self.process_event.clear()
-                
-                # 处理队列中的所有数据
-                data_chunks = []
-                
-                # 提取队列中的所有数据
-                while not self.data_queue.empty():
-                    try:
-                        chunk = self.data_queue.get_nowait()
-                        data_chunks.append(chunk)
-                        self.data_queue.task_done()
-                    except queue.Empty:
-                        break
-                
-                # 如果有数据，则处理
-                if data_chunks:
-                    combined_data = ''.join(data_chunks)
-                    self._process_data(combined_data)
-                
-                # 定期重新检查缓冲区中的数据，以防有未完成的对象
-                reprocess_timer += 1
-                if reprocess_timer >= 50:  # 每50个周期重新处理一次
-                    reprocess_timer = 0
-                    with self.data_lock:
-                        if self.data_buffer:
-                            # 重新处理缓冲区中的数据
-                            self._reprocess_buffer()
-                
-            except Exception as e:
-                print(f"处理线程出错: {e}")
-                time.sleep(0.1)
-                
-    def _reprocess_buffer(self):
-        """重新处理缓冲区中的数据，尝试找到完整的对象"""
-        pattern = r'class:(\d+)\s*\n*score:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)'
-        matches = re.finditer(pattern, self.data_buffer)
-        
-        found_match = False
-        for match in matches:
-            found_match = True
-        
-        if not found_match:
-            # 检查数据缓冲区是否包含部分模式匹配
-            partial_patterns = [
-                r'class:\d+', 
-                r'score:\d+', 
-                r'bbox:\d+'
-            ]
-            
-            has_partial_match = False
-            for partial in partial_patterns:
-                if re.search(partial, self.data_buffer):
-                    has_partial_match = True
-                    break
-            
-            # 如果没有部分模式匹配或缓冲区过大，则清理缓冲区
-            if (not has_partial_match and len(self.data_buffer) > 1024000000) or len(self.data_buffer) > 4096000000:
-                # 查找最后一个可能是有效开始的位置
-                last_class_pos = self.data_buffer.rfind('class:')
-                
-                if last_class_pos > 0:
-                    # 保留最后一个可能的起始位置
-                    self.data_buffer = self.data_buffer[last_class_pos:]
-                    print(f"数据缓冲区已清理至最后一个有效位置，当前大小: {len(self.data_buffer)}")
+        Args:
+            frames: FrameAssembler 返回的帧列表，不完整的帧只计数不发布
+        """
+        for frame in frames:
+            if not frame.complete:
+                self.metrics.increment('frames_incomplete')
+                logger.debug("丢弃不完整的帧（%s 个目标）", len(frame))
+                continue
+            self.metrics.increment('frames_published')
+            with self.data_lock:
+                self.frame_count += 1
+                frame.frame_id = self.frame_count
+                frame.timestamp = time.time()
+                if frame.detections:
+                    self._update_objects(frame.detections)
                 else:
-                    # 完全清空缓冲区
-                    self.data_buffer = ""
-                    print("警告: 数据缓冲区已完全清空，未发现有效数据格式")
+                    self.object_data = []
+                    self.new_data_available = True
+                self.current_frame = frame
     
-    def _process_data(self, data):
-        """处理接收到的数据"""
+    def set_frame_mode(self, mode='chunk', **options):
+        """
+        设置分帧方式
+        
+        Args:
+            mode: 'chunk'（默认，每批解码结果为一帧）、'delimiter'、'count' 或 'gap'，见 FrameAssembler
+            **options: FrameAssembler 的其他参数，例如 delimiter=b'END\n'、header=b'frame:'、gap_chars=3.5
+        """
+        assembler = FrameAssembler(mode, **options)
+        with self.process_lock:
+            self._publish_frames(self.frame_assembler.reset())
+            self.frame_assembler = assembler
+    
+    def get_current_frame(self):
+        """
+        获取最近发布的一帧
+        
+        Returns:
+            Frame: 帧序号、发布时间和帧内的检测目标，尚未发布任何帧时为None
+        """
         with self.data_lock:
-            # 将新数据追加到缓冲区
-            self.data_buffer += data
-            
-            # 查找完整的对象数据 - 使用更精确的正则表达式模式
-            pattern = r'class:(\d+)\s*\n*score:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)'
-            
-            try:
-                # 使用finditer而不是findall，以便获取匹配的结束位置
-                matches = list(re.finditer(pattern, self.data_buffer))
-                
-                if not matches:
-                    # 如果数据缓冲区超过某个阈值但没有匹配，尝试主动清理
-                    if len(self.data_buffer) > 2048000000:
-                        # 查找最后一个可能的"class:"
-                        last_class_pos = self.data_buffer.rfind('class:')
-                        
-                        if last_class_pos > 0:
-                            # 清理到最后一个"class:"之前的所有内容
-                            self.data_buffer = self.data_buffer[last_class_pos:]
-                            print(f"数据缓冲区已清理，当前大小: {len(self.data_buffer)}")
-                        else:
-                            # 进一步检查有无数据格式标记
-                            has_format_markers = any(marker in self.data_buffer for marker in ['class:', 'score:', 'bbox:'])
-                            
-                            # 如果没有任何格式标记，清空整个缓冲区
-                            if not has_format_markers:
-                                old_size = len(self.data_buffer)
-                                self.data_buffer = ""
-                                print(f"数据缓冲区已完全清空，大小从 {old_size} 字节减至 0 字节")
-                    
-                    return  # 没有找到匹配项
-                
-                # 临时存储所有检测到的新对象，稍后会进行处理
-                new_detected_objects = []
-                
-                for match in matches:
-                    try:
-                        obj_class = int(match.group(1))
-                        score = int(match.group(2))
-                        x1 = int(match.group(3))
-                        y1 = int(match.group(4))
-                        x2 = int(match.group(5))
-                        y2 = int(match.group(6))
-                        
-                        # 调试信息
-                        print(f"匹配坐标: x1={x1}, y1={y1}, x2={x2}, y2={y2}")
-                        
-                        # 确保坐标顺序正确（左上角和右下角）
-                        xmin = min(x1, x2)
-                        ymin = min(y1, y2)
-                        xmax = max(x1, x2)
-                        ymax = max(y1, y2)
-                        
-                        # 确保坐标有效值（防止相等）
-                        if xmax == xmin:
-                            xmax = xmin + 1
-                        if ymax == ymin:
-                            ymax = ymin + 1
-                        
-                        # 验证坐标合法性
-                        if 0 <= xmin and xmax <= 255 and 0 <= ymin and ymax <= 255:
-                            new_detected_objects.append({
-                                'class': obj_class,
-                                'score': score,
-                                'bbox': (xmin, ymin, xmax, ymax)
-                            })
-                        else:
-                            print(f"坐标超出有效范围，已忽略: ({x1}, {y1}, {x2}, {y2})")
-                            
-                    except ValueError as e:
-                        print(f"数据转换错误: {e}")
-                
-                # 如果有新检测到的对象，需要与现有对象进行全局分析
-                if new_detected_objects:
-                    # 第一步：比较新对象间的关系，找出垂直连接的对象
-                    # 创建一个连接图，记录哪些新对象应该合并
-                    n = len(new_detected_objects)
-                    connected = [[] for _ in range(n)]  # 记录每个对象连接的其他对象索引
-                    
-                    # 检查所有新对象两两之间的关系
-                    for i in range(n):
-                        for j in range(i+1, n):
-                            obj1 = new_detected_objects[i]
-                            obj2 = new_detected_objects[j]
-                            
-                            # 如果两个对象是同一类别，并且垂直方向上相邻
-                            # if obj1['class'] == obj2['class'] and self._is_vertically_adjacent(obj1['bbox'], obj2['bbox']):
-                            #     connected[i].append(j)
-                            #     connected[j].append(i)
-                            #     print(f"检测到垂直相邻框: {obj1['bbox']} 和 {obj2['bbox']}")
-                    
-                    # 第二步：根据连接关系合并对象
-                    merged_objects = []  # 最终的合并结果
-                    visited = [False] * n  # 记录已处理的对象
-                    
-                    for i in range(n):
-                        if visited[i]:
-                            continue
-                            
-                        # 如果这个对象没有连接到其他对象，直接添加
-                        if not connected[i]:
-                            merged_objects.append(new_detected_objects[i])
-                            visited[i] = True
-                            continue
-                        
-                        # 找出所有连接到这个对象的对象（包括间接连接）
-                        group = []  # 存储所有连接的对象索引
-                        queue = [i]  # BFS队列
-                        
-                        while queue:
-                            current = queue.pop(0)
-                            if visited[current]:
-                                continue
-                                
-                            group.append(current)
-                            visited[current] = True
-                            
-                            for neighbor in connected[current]:
-                                if not visited[neighbor]:
-                                    queue.append(neighbor)
-                        
-                        # 合并这个组中的所有对象
-                        if len(group) > 1:
-                            # 取所有边界框的并集
-                            merged_box = self._merge_boxes([new_detected_objects[j]['bbox'] for j in group])
-                            # 取最高置信度
-                            merged_score = max(new_detected_objects[j]['score'] for j in group)
-                            # 使用第一个对象的类别
-                            merged_class = new_detected_objects[group[0]]['class']
-                            
-                            merged_obj = {
-                                'class': merged_class,
-                                'score': merged_score,
-                                'bbox': merged_box
-                            }
-                            
-                            merged_objects.append(merged_obj)
-                            print(f"合并垂直相邻框组: {[new_detected_objects[j]['bbox'] for j in group]} 为 {merged_box}")
-                        else:
-                            # 只有一个对象，直接添加
-                            merged_objects.append(new_detected_objects[group[0]])
-                    
-                    # 第三步：检查每个新合并的对象与现有对象的重叠情况
-                    final_objects = []  # 最终保留的对象
-                    objects_to_remove = []  # 需要从all_objects移除的索引
-                    
-                    for new_obj in merged_objects:
-                        overlap_found = False
-                        
-                        for i, existing_obj in enumerate(self.all_objects):
-                            # 检查重叠
-                            if self._calculate_iou(new_obj['bbox'], existing_obj['bbox']) > 0.3:  # 降低阈值以检测更多重叠
-                                objects_to_remove.append(i)
-                                overlap_found = True
-                                print(f"检测到重叠框，将用新框替换: 新框{new_obj['bbox']} vs 已有框{existing_obj['bbox']}")
-                        
-                        # 不管是否重叠，都添加新对象
-                        final_objects.append(new_obj)
-                    
-                    # 移除被新框替换的旧对象
-                    if objects_to_remove:
-                        # 从大到小排序索引，以便从后向前删除不影响前面的索引
-                        objects_to_remove = list(set(objects_to_remove))  # 去重
-                        objects_to_remove.sort(reverse=True)
-                        for idx in objects_to_remove:
-                            if idx < len(self.all_objects):
-                                old_obj = self.all_objects.pop(idx)
-                                print(f"已移除旧框: {old_obj['bbox']}")
-                    
-                    # 将所有处理后的新对象添加到all_objects中
-                    self.all_objects.extend(final_objects)
-                    # 限制列表大小，防止内存泄漏
-                    if len(self.all_objects) > 30:  # 保留最近的30个目标
-                        self.all_objects = self.all_objects[-30:]
-                    
-                    # 更新当前帧检测到的对象
-                    self.object_data = final_objects
-                    self.new_data_available = True
-                
-                # 数据缓冲区过长时进行清理，避免占用过多内存
-                if len(self.data_buffer) > 8192000000:  # 如果超过8KB
-                    # 仅保留最后的一部分数据
-                    self.data_buffer = self.data_buffer[-4096:]  # 保留最后4KB
-                    print(f"数据缓冲区已清理，当前大小: {len(self.data_buffer)}")
-            
-            except Exception as e:
-                print(f"解析数据错误: {e}")
-                # 出现解析错误时，清理部分缓冲区防止错误累积
-                if len(self.data_buffer) > 1024:
-                    self.data_buffer = self.data_buffer[-512:]
+            return self.current_frame
+    
+    def _update_objects(self, new_detected_objects):
+        """将新解析出的对象与已有对象进行合并和去重（调用方需持有data_lock）"""
+        # 第一步：按配置的相邻规则合并新对象中相连的框（默认不合并）
+        if self.merge_rule:
+            merged_objects = self._merge_connected_objects(new_detected_objects, self.merge_rule)
+        else:
+            merged_objects = list(new_detected_objects)
+        
+        # 第二步：一次计算新对象与现有对象的IoU矩阵，按抑制策略决定保留哪些对象
+        policy = SUPPRESSION_POLICIES.get(self.suppression_policy)
+        if policy is None:
+            raise ValueError(f"不支持的抑制策略: {self.suppression_policy}")
+        # 与所有新对象都没有交集的已有对象IoU为0，不会被抑制，只把网格索引找到的候选交给策略
+        candidates = self._find_overlap_candidates(merged_objects)
+        keep_existing, keep_new = policy(candidates, merged_objects, self.iou_threshold)
+        
+        final_objects = [obj for obj, keep in zip(merged_objects, keep_new) if keep]
+        
+        # 移除被新框替换或抑制的旧对象
+        removed_ids = set()
+        for obj, keep in zip(candidates, keep_existing):
+            if not keep:
+                logger.debug("已移除旧框: %s", obj['bbox'])
+                removed_ids.add(id(obj))
+                self._unindex_object(obj)
+        suppressed = len(removed_ids) + len(merged_objects) - len(final_objects)
+        if suppressed:
+            self.metrics.increment('objects_suppressed', suppressed)
+        if removed_ids:
+            self.all_objects = [obj for obj in self.all_objects if id(obj) not in removed_ids]
+        
+        # 将所有处理后的新对象添加到all_objects中
+        self.all_objects.extend(final_objects)
+        for obj in final_objects:
+            self._index_object(obj)
+        # 限制列表大小，防止内存泄漏
+        if len(self.all_objects) > self.max_history:  # 只保留最近的max_history个目标
+            for obj in self.all_objects[:-self.max_history]:
+                self._unindex_object(obj)
+            self.all_objects = self.all_objects[-self.max_history:]
+        self._indexed_list = self.all_objects
+        self._indexed_count = len(self.all_objects)
+        
+        # 更新当前帧检测到的对象
+        self.object_data = final_objects
+        self.new_data_available = True
+    
+    def _sync_object_index(self):
+        """
+        确保 object_index 与 all_objects 一致（调用方需持有data_lock）
+        
+        _update_objects 会增量更新索引；all_objects 在其他地方被替换或修改时重新建立索引。
+        """
+        if self._indexed_list is self.all_objects and self._indexed_count == len(self.all_objects):
+            return
+        self.object_index.clear()
+        self._indexed_objects = {}
+        for obj in self.all_objects:
+            self._index_object(obj)
+        self._indexed_list = self.all_objects
+        self._indexed_count = len(self.all_objects)
+    
+    def _index_object(self, obj):
+        """将对象登记到 object_index（调用方需持有data_lock）"""
+        self.object_index.insert(id(obj), obj['bbox'])
+        # 保留引用，保证对象id在索引期间不会被复用
+        self._indexed_objects[id(obj)] = (self._index_sequence, obj)
+        self._index_sequence += 1
+    
+    def _unindex_object(self, obj):
+        """从 object_index 中移除对象（调用方需持有data_lock）"""
+        self.object_index.remove(id(obj))
+        self._indexed_objects.pop(id(obj), None)
+    
+    def _find_overlap_candidates(self, new_objects):
+        """
+        用网格索引找出可能与新对象重叠的已有对象（调用方需持有data_lock）
+        
+        Args:
+            new_objects: 新对象列表
+        
+        Returns:
+            list: 与至少一个新对象有交集的已有对象，按在 all_objects 中的顺序排列
+                  （策略在置信度相同时按顺序取舍，不能依赖对象id即内存地址的顺序）
+        """
+        if self.iou_threshold < 0:
+            # 阈值为负时没有交集的框也算重叠，需要交给策略处理全部已有对象
+            return list(self.all_objects)
+        
+        self._sync_object_index()
+        candidate_ids = set()
+        for obj in new_objects:
+            candidate_ids |= self.object_index.query(obj['bbox'])
+        # all_objects 只会移除对象或在末尾追加，登记序号的顺序就是列表中的顺序
+        entries = sorted(self._indexed_objects[obj_id] for obj_id in candidate_ids)
+        return [obj for _, obj in entries]
     
     def _calculate_iou(self, box1, box2):
         """计算两个边界框的IoU（交并比）"""
@@ -786,7 +2568,7 @@ class SerialReceiver:
             
         return overlap_height / min_height
     
-    def _is_box_adjacent(self, box1, box2, max_gap=5):
+    def _is_box_adjacent(self, box1, box2, max_gap=ADJACENT_MAX_GAP):
         """判断两个边界框是否相邻（上下相邻或左右相邻）"""
         x1_min, y1_min, x1_max, y1_max = box1
         x2_min, y2_min, x2_max, y2_max = box2
@@ -829,70 +2611,68 @@ class SerialReceiver:
         return False
     
     def _merge_adjacent_boxes(self, objects):
-        """合并相邻的边界框"""
+        """合并相邻的边界框（上下相邻或左右相邻，包括间接相邻的一串框）"""
         if not objects:
             return []
-            
-        # 复制对象列表以防止修改原始数据
-        objects_copy = objects.copy()
-        merged_objects = []
-        processed = [False] * len(objects_copy)
+        return self._merge_connected_objects(objects, 'adjacent')
+    
+    def _merge_connected_objects(self, objects, rule):
+        """
+        用并查集把同一类别、按规则相邻的对象分组，每组合并为一个对象
+        
+        Args:
+            objects: 对象列表
+            rule: 相邻规则，ADJACENCY_RULES 中的名称
         
-        for i in range(len(objects_copy)):
-            if processed[i]:
+        Returns:
+            list: 合并后的对象列表，顺序与每组第一个对象的原始顺序一致
+        """
+        if rule not in self.ADJACENCY_RULES:
+            raise ValueError(f"不支持的相邻规则: {rule}")
+        method_name, max_gap = self.ADJACENCY_RULES[rule]
+        
+        groups = group_connected_boxes([obj['bbox'] for obj in objects], [obj['class'] for obj in objects],
+                                       getattr(self, method_name), max_gap)
+        
+        merged_objects = []
+        for group in groups:
+            if len(group) == 1:
+                merged_objects.append(objects[group[0]])
                 continue
-                
-            current_obj = objects_copy[i].copy()  # 复制对象
-            processed[i] = True
-            merged = False
-            
-            # 查找与当前对象相邻的其他对象
-            for j in range(i+1, len(objects_copy)):
-                if processed[j]:
-                    continue
-                    
-                if (objects_copy[i]['class'] == objects_copy[j]['class'] and
-                        self._is_box_adjacent(objects_copy[i]['bbox'], objects_copy[j]['bbox'])):
-                    # 合并两个边界框
-                    x1_min, y1_min, x1_max, y1_max = objects_copy[i]['bbox']
-                    x2_min, y2_min, x2_max, y2_max = objects_copy[j]['bbox']
-                    
-                    # 取边界的并集
-                    merged_bbox = (
-                        min(x1_min, x2_min),
-                        min(y1_min, y2_min),
-                        max(x1_max, x2_max),
-                        max(y1_max, y2_max)
-                    )
-                    
-                    # 取较高的置信度
-                    merged_score = max(objects_copy[i]['score'], objects_copy[j]['score'])
-                    
-                    # 更新当前对象
-                    current_obj['bbox'] = merged_bbox
-                    current_obj['score'] = merged_score
-                    
-                    processed[j] = True
-                    merged = True
-                    print(f"合并相邻框: {objects_copy[i]['bbox']} + {objects_copy[j]['bbox']} = {merged_bbox}")
             
-            merged_objects.append(current_obj)
-                    
+            # 取所有边界框的并集和最高置信度，使用第一个对象的类别和来源
+            first = Detection.from_object(objects[group[0]])
+            boxes = [objects[j]['bbox'] for j in group]
+            merged_box = self._merge_boxes(boxes)
+            merged_score = max(objects[j]['score'] for j in group)
+            merged = Detection(first.class_id, merged_score, merged_box, first.source)
+            # 合并后的框在组内最后一个对象到达后才完整，沿用它的延迟追踪记录
+            merged.trace = getattr(objects[group[-1]], 'trace', None)
+            merged_objects.append(merged)
+            logger.debug("合并相邻框组: %s 为 %s", boxes, merged_box)
+            self.metrics.increment('merges', len(group) - 1)
+        
         return merged_objects
     
     def get_detected_objects(self):
         """获取当前帧检测到的对象"""
         with self.data_lock:
-            # 在返回之前进行最后一次相邻框检查，优先保留较低位置的框
-            filtered_objects = self._filter_vertically_connected_boxes(self.object_data.copy())
-            return filtered_objects
+            objects = self.object_data.copy()
+        # 在返回之前进行最后一次相邻框检查，优先保留较低位置的框（在副本上进行，不占用data_lock）
+        filtered_objects = self._filter_vertically_connected_boxes(objects)
+        if self.latency_tracer is not None:
+            self.latency_tracer.mark(filtered_objects, 'fetched')
+        return filtered_objects
     
     def get_all_objects(self):
         """获取所有已检测到的对象"""
         with self.data_lock:
-            # 在返回之前进行最后一次相邻框检查，优先保留较低位置的框
-            filtered_objects = self._filter_vertically_connected_boxes(self.all_objects.copy())
-            return filtered_objects
+            objects = self.all_objects.copy()
+        # 在返回之前进行最后一次相邻框检查，优先保留较低位置的框（在副本上进行，不占用data_lock）
+        filtered_objects = self._filter_vertically_connected_boxes(objects)
+        if self.latency_tracer is not None:
+            self.latency_tracer.mark(filtered_objects, 'fetched')
+        return filtered_objects
             
     def _filter_vertically_connected_boxes(self, objects):
         """过滤垂直方向上相连的框，只保留位置较低的那个"""
@@ -902,20 +2682,23 @@ class SerialReceiver:
         # 首先按照x坐标排序，便于比较相似x坐标的框
         objects.sort(key=lambda obj: (obj['bbox'][0], obj['bbox'][1]))
         
-        # 需要保留的索引和需要移除的索引
-        to_keep = set(range(len(objects)))
+        # 需要移除的索引
         to_remove = set()
         
-        # 两两比较所有框
+        # 网格索引：垂直相连的框间距不超过1像素，只需比较附近网格中的框
+        index = BoxGridIndex.from_boxes([obj['bbox'] for obj in objects])
+        
         for i in range(len(objects)):
             if i in to_remove:
                 continue
                 
-            for j in range(i+1, len(objects)):
-                if j in to_remove:
+            box1 = objects[i]['bbox']
+            
+            # 按排序后的顺序依次比较，与原来的两两比较结果一致
+            for j in sorted(index.query(box1, margin=1)):
+                if j <= i or j in to_remove:
                     continue
                     
-                box1 = objects[i]['bbox']
                 box2 = objects[j]['bbox']
                 
                 # 提取坐标
@@ -932,11 +2715,11 @@ class SerialReceiver:
                 if x_similar and y_connected:
                     # 决定移除哪一个框 - 总是保留y坐标较大的那个（即下方的框）
                     if y1_max < y2_max:  # 如果框1在上，框2在下
-                        print(f"垂直相连框筛选: 移除上方框 {box1}，保留下方框 {box2}")
+                        logger.debug("垂直相连框筛选: 移除上方框 %s，保留下方框 %s", box1, box2)
                         to_remove.add(i)
                         break  # 找到要移除的框后，不再继续比较
                     else:  # 如果框2在上，框1在下
-                        print(f"垂直相连框筛选: 移除上方框 {box2}，保留下方框 {box1}")
+                        logger.debug("垂直相连框筛选: 移除上方框 %s，保留下方框 %s", box2, box1)
                         to_remove.add(j)
         
         # 构建过滤后的对象列表
@@ -946,18 +2729,15 @@ class SerialReceiver:
     
     def clear_objects(self):
         """清空所有目标数据"""
-        with self.data_lock:
+        with self.process_lock, self.data_lock:
             self.object_data = []
             self.all_objects = []
-            self.data_buffer = ""  # 同时清空数据缓冲区
+            self.decoder.reset()  # 同时丢弃未完成的记录
+            self.frame_assembler.reset()
+            self.recent_data.clear()
             
-            # 清空队列
-            while not self.data_queue.empty():
-                try:
-                    self.data_queue.get_nowait()
-                    self.data_queue.task_done()
-                except queue.Empty:
-                    break
+            # 丢弃尚未处理的数据（处理线程在持有process_lock时才取出缓冲区中的数据）
+            self._clear_ring_buffer()
                     
             # 重置新数据标志，确保下一次有数据时会被识别为新数据
             self.new_data_available = False
@@ -966,7 +2746,7 @@ class SerialReceiver:
             self.process_event.set()
             
             # 打印清除完成的消息，确认清除操作完成
-            print("所有对象数据已清除，准备接收新数据")
+            logger.info("所有对象数据已清除，准备接收新数据")
             
     def restart_receiving(self):
         """重新启动接收过程，用于切换图片后恢复接收"""
@@ -975,26 +2755,26 @@ class SerialReceiver:
         
         # 检查串口连接状态
         if not self.serial or not self.serial.is_open:
-            print("串口未连接或已关闭，尝试重新连接...")
+            logger.warning("串口未连接或已关闭，尝试重新连接...")
             try:
                 if self.serial and not self.serial.is_open:
                     self.serial.open()
-                    print("串口已重新打开")
+                    logger.info("串口已重新打开")
                 elif not self.serial and self.port:
                     self.connect(self.port)
-                    print(f"已重新连接到串口 {self.port}")
+                    logger.info("已重新连接到串口 %s", self.port)
             except Exception as e:
-                print(f"重新连接串口失败: {e}")
+                logger.error("重新连接串口失败: %s", e)
                 return False
         
         # 检查线程运行状态
         if not self.is_running:
-            print("重新启动接收线程...")
+            logger.info("重新启动接收线程...")
             self.start_receiving()
         else:
             # 如果线程已经在运行，只需激活处理
             self.process_event.set()
-            print("接收线程已在运行，已重新激活数据处理")
+            logger.info("接收线程已在运行，已重新激活数据处理")
         
         return True
     
@@ -1005,7 +2785,7 @@ class SerialReceiver:
             self.new_data_available = False
             return has_new
 
-    def _is_vertically_adjacent(self, box1, box2, max_gap=1):
+    def _is_vertically_adjacent(self, box1, box2, max_gap=VERTICAL_MAX_GAP):
         """判断两个边界框是否在垂直方向上相邻"""
         x1_min, y1_min, x1_max, y1_max = box1
         x2_min, y2_min, x2_max, y2_max = box2
@@ -1038,69 +2818,81 @@ class SerialReceiver:
         
         return (xmin, ymin, xmax, ymax)
 
-    def _hardware_timing_detection(self, port, test_duration=1.0):
+    def _hardware_timing_detection(self, port, test_duration=1.0, preferred=None):
         """
         硬件时序检测方法 - 通过分析ASCII字符'2'(0x32)的时序来检测波特率
         
+        先按先验顺序（见 _baudrate_scan_order）测试；每次采到样本后，用这些样本同时计算所有候选波特率的似然，
+        其余的波特率按似然从高到低测试。某个波特率的置信度达到 timing_confidence 时立即采用，不再测试其余的波特率。
+        
         Args:
             port: 串口端口
-            test_duration: 检测持续时间
+            test_duration: 每个波特率的最长检测时间
+            preferred: 优先测试的波特率列表（例如当前配置的波特率）
             
         Returns:
             tuple: (检测到的波特率, 置信度, 详细结果)
         """
-        print("开始硬件时序检测...")
-        print("检测目标: ASCII字符'2' (0x32 = 00110010)")
-        
-        # 常见波特率对应的位时间 (微秒)
-        baudrate_bit_times = {}
-        for baudrate in self.common_baudrates:
-            bit_time_us = 1000000 / baudrate  # 微秒
-            baudrate_bit_times[baudrate] = bit_time_us
+        logger.info("开始硬件时序检测...")
+        logger.info("检测目标: ASCII字符'2' (0x32 = 00110010)")
         
         timing_results = {}
-        
-        for baudrate in self.common_baudrates:
-            print(f"测试波特率: {baudrate} (位时间: {baudrate_bit_times[baudrate]:.1f}μs)")
+        pending = self._baudrate_scan_order(preferred)
+        candidates = list(pending)
+        bit_times = [1000000 / baudrate for baudrate in candidates]  # 位时间（微秒）
+        
+        while pending:
+            if self._detection_cancelled():
+                logger.info("硬件时序检测已取消")
+                break
+            baudrate = pending.pop(0)
+            bit_time_us = 1000000 / baudrate
+            logger.info("测试波特率: %s (位时间: %.1fμs)", baudrate, bit_time_us)
             
             try:
                 # 创建测试串口连接
                 test_serial = serial.Serial(
                     port=port,
                     baudrate=baudrate,
-                    timeout=0.1
+                    timeout=self.scan_read_timeout
                 )
                 
                 # 清空缓冲区
                 test_serial.reset_input_buffer()
                 
                 # 收集ASCII字符'2'的时序样本
-                timing_samples = self._collect_ascii2_timing_samples(test_serial, test_duration)
+                timing_samples = self._collect_ascii2_timing_samples(test_serial, test_duration, bit_time_us)
                 
                 test_serial.close()
                 
                 if timing_samples:
-                    # 分析时序样本，计算置信度
-                    confidence = self._analyze_ascii2_timing_samples(
-                        timing_samples, 
-                        baudrate_bit_times[baudrate]
-                    )
+                    # 同时计算所有候选波特率的似然，置信度取当前测试的波特率
+                    scores = self._score_ascii2_timing_candidates(timing_samples, bit_times)
+                    likelihoods = dict(zip(candidates, scores['confidence'].tolist()))
+                    confidence = likelihoods[baudrate]
                     timing_results[baudrate] = {
                         'confidence': confidence,
                         'samples': len(timing_samples),
-                        'expected_bit_time': baudrate_bit_times[baudrate]
+                        'expected_bit_time': bit_time_us,
+                        'likelihoods': likelihoods,
+                        'likelihood_table': scores['table'].tolist()
                     }
-                    print(f"  样本数: {len(timing_samples)}, 置信度: {confidence:.2f}")
+                    logger.info("  样本数: %s, 置信度: %.2f", len(timing_samples), confidence)
+                    if confidence >= self.timing_confidence:
+                        logger.info("波特率 %s 的时序置信度达到 %.2f，停止检测", baudrate, self.timing_confidence)
+                        break
+                    # 似然高的波特率先测试（排序是稳定的，似然相同时保持先验顺序）
+                    pending.sort(key=lambda rate: -likelihoods[rate])
                 else:
                     timing_results[baudrate] = {
                         'confidence': 0.0,
                         'samples': 0,
-                        'expected_bit_time': baudrate_bit_times[baudrate]
+                        'expected_bit_time': bit_time_us
                     }
-                    print(f"  未检测到有效时序")
+                    logger.info("  未检测到有效时序")
                 
             except Exception as e:
-                print(f"  测试波特率 {baudrate} 时出错: {e}")
+                logger.warning("  测试波特率 %s 时出错: %s", baudrate, e)
                 timing_results[baudrate] = {
                     'confidence': 0.0,
                     'samples': 0,
@@ -1118,39 +2910,65 @@ class SerialReceiver:
         
         return best_baudrate, best_confidence, timing_results
     
-    def _collect_ascii2_timing_samples(self, test_serial, duration):
+    def _collect_ascii2_timing_samples(self, test_serial, duration, bit_time_us=None):
         """
         收集ASCII字符'2'的时序样本
         
+        使用短超时的阻塞读取，采集到 timing_sample_budget 个样本，
+        或在 _silence_timeout() 内没有收到任何数据时提前结束；给出 bit_time_us 时，
+        每采集 timing_check_samples 个样本检查一次该位时间的置信度，达到 timing_confidence 时也提前结束。
+        
+        时间戳来自 time.perf_counter_ns()。一次读取返回多个字节时，各字节的到达时间在上一次读取
+        返回和本次读取返回之间按字节均匀估算（不使用被测波特率，以免结果偏向被测波特率）。
+        
         Args:
             test_serial: 测试串口对象
-            duration: 采样持续时间
+            duration: 最长采样时间
+            bit_time_us: 被测波特率的位时间（微秒），为None时不提前检查置信度
             
         Returns:
-            list: 时序样本列表 [(时间戳, 字符数据), ...]
+            list: 时序样本列表 [(时间戳（秒，perf_counter 时基）, 字符数据), ...]
         """
-        import time
-        
         samples = []
-        start_time = time.time()
-        
-        while time.time() - start_time < duration:
-            if test_serial.in_waiting > 0:
-                # 记录接收时间戳和数据
-                timestamp = time.time()
-                try:
-                    data = test_serial.read(test_serial.in_waiting)
-                    if data:
-                        # 检查是否包含ASCII字符'2'
-                        for byte_val in data:
-                            if byte_val == 0x32:  # ASCII '2'
-                                samples.append((timestamp, chr(byte_val)))
-                except Exception:
-                    pass
+        received = 0
+        start_ns = time.perf_counter_ns()
+        duration_ns = int(duration * 1e9)
+        silence_ns = int(self._silence_timeout(test_serial.baudrate) * 1e9)
+        last_read_ns = start_ns
+        next_check = self.timing_check_samples if bit_time_us else None
+        
+        while len(samples) < self.timing_sample_budget and not self._detection_cancelled():
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            if elapsed_ns >= duration_ns or (received == 0 and elapsed_ns >= silence_ns):
+                break
+            
+            # 阻塞到有数据到达或读取超时，返回时记录接收时间戳
+            try:
+                data = test_serial.read(max(test_serial.in_waiting, 1))
+            except Exception as e:
+                logger.debug("采样时读取出错: %s", e)
+                break
+            read_ns = time.perf_counter_ns()
+            if not data:
+                last_read_ns = read_ns
+                continue
             
-            time.sleep(0.001)  # 1ms精度
+            # 第 k 个字节（从0开始）的到达时间估算为上次读取返回后的 (k+1)/n 处
+            count = len(data)
+            span_ns = read_ns - last_read_ns
+            positions = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0x32)  # ASCII '2'
+            for position in positions:
+                arrival_ns = last_read_ns + span_ns * (int(position) + 1) // count
+                samples.append((arrival_ns / 1e9, '2'))
+            received += count
+            last_read_ns = read_ns
+            
+            if next_check is not None and len(samples) >= next_check:
+                if self._analyze_ascii2_timing_samples(samples, bit_time_us) >= self.timing_confidence:
+                    break
+                next_check = len(samples) + self.timing_check_samples
         
-        return samples
+        return samples[:self.timing_sample_budget]
     
     def _analyze_ascii2_timing_samples(self, samples, expected_bit_time_us):
         """
@@ -1166,58 +2984,42 @@ class SerialReceiver:
         Returns:
             float: 置信度 (0.0-1.0)
         """
-        if len(samples) < 2:
-            return 0.0
+        return float(self._score_ascii2_timing_candidates(samples, [expected_bit_time_us])['confidence'][0])
+    
+    def _score_ascii2_timing_candidates(self, samples, bit_times_us):
+        """
+        用同一组时序样本同时评估多个候选位时间
         
-        # 计算样本间的时间间隔
-        intervals = []
-        for i in range(1, len(samples)):
-            interval_s = samples[i][0] - samples[i-1][0]
-            interval_us = interval_s * 1000000  # 转换为微秒
-            intervals.append(interval_us)
+        连续发送'2'时，相邻两个'2'的间隔应接近字符时间（10位：起始位+8数据位+停止位）的整数倍。
+        每个间隔取 TIMING_MULTIPLIERS 中最好的匹配度，对间隔求平均后按样本数加权：
+        样本少于5个时置信度按比例降低，前3个间隔相近（毫秒级）时增加20%。
         
-        if not intervals:
-            return 0.0
+        Args:
+            samples: 时序样本 [(时间戳（秒）, 字符), ...]
+            bit_times_us: 候选位时间列表（微秒）
         
-        # ASCII '2' (0x32) 的位模式分析
-        # 二进制: 00110010
-        # 完整帧: 起始(0) + 数据(00110010) + 停止(1)
-        # 预期字符间隔应该是10位的倍数（考虑连续发送）
+        Returns:
+            dict: {'confidence': 各候选的置信度数组,
+                   'table': (候选数, 倍数数) 的似然表，即各倍数下的平均匹配度,
+                   'intervals': 间隔数组（微秒）}
+        """
+        candidates = len(bit_times_us)
+        if len(samples) < 2:
+            return {'confidence': np.zeros(candidates), 'table': np.zeros((candidates, len(TIMING_MULTIPLIERS))),
+                    'intervals': np.zeros(0)}
         
-        confidence_scores = []
+        # 计算样本间的时间间隔（微秒）
+        intervals = np.diff(np.array([sample[0] for sample in samples], dtype=np.float64)) * 1000000
+        table, best = timing_likelihood_table(intervals, bit_times_us)
         
-        for interval_us in intervals:
-            # ASCII字符'2'的传输包含10位（起始位+8数据位+停止位）
-            # 连续发送'2'时，间隔应该是10位时间的倍数
-            expected_char_time = expected_bit_time_us * 10  # 单个字符时间
-            
-            # 检查间隔是否接近字符时间的整数倍
-            best_match = 0.0
-            for multiplier in [1, 2, 3, 4, 5]:  # 检查1-5个字符的间隔
-                expected_interval = expected_char_time * multiplier
-                error = abs(interval_us - expected_interval) / expected_interval
-                match_score = max(0, 1.0 - error)
-                best_match = max(best_match, match_score)
-            
-            confidence_scores.append(best_match)
+        # 样本数量加权 - 更多样本提高置信度
+        confidence = best * min(len(samples) / 5.0, 1.0)
         
-        # 计算平均置信度
-        if confidence_scores:
-            avg_confidence = sum(confidence_scores) / len(confidence_scores)
-            
-            # 样本数量加权 - 更多样本提高置信度
-            sample_weight = min(len(samples) / 5.0, 1.0)  # 降低样本要求
-            
-            # ASCII '2' 特定的置信度提升
-            # 如果检测到规律的'2'字符，额外增加置信度
-            if len(samples) >= 3:
-                # 检查是否有规律的间隔模式
-                if len(set(int(i/1000) for i in intervals[:3])) <= 2:  # 间隔相似（毫秒级精度）
-                    avg_confidence *= 1.2  # 20%置信度奖励
-            
-            return min(avg_confidence * sample_weight, 1.0)
+        # ASCII '2' 特定的置信度提升：前3个间隔相似（毫秒级精度）时认为是规律发送
+        if len(samples) >= 3 and len(set(np.trunc(intervals[:3] / 1000).tolist())) <= 2:
+            confidence = best * 1.2 * min(len(samples) / 5.0, 1.0)
         
-        return 0.0
+        return {'confidence': np.minimum(confidence, 1.0), 'table': table, 'intervals': intervals}
 
 class MultiPortManager:
     """
@@ -1232,6 +3034,10 @@ class MultiPortManager:
         self.data_lock = Lock()
         self.is_running = False
         self.update_callbacks = []  # 数据更新回调函数
+        self.max_connect_workers = 8  # 并行连接端口的最大线程数
+        self.recent_data_limit = 0  # 新端口的 recent_data_limit（见 SerialReceiver）
+        self.baud_cache = None  # 新端口使用的波特率缓存（BaudRateCache），为None时不使用
+        self._connect_cancel_event = None  # 正在进行的并行连接的取消事件
         
     def add_port(self, port_name, port_path, baudrate=9600, auto_detect=False):
         """
@@ -1247,16 +3053,17 @@ class MultiPortManager:
             bool: 是否成功添加
         """
         if len(self.receivers) >= self.max_ports:
-            print(f"已达到最大端口数限制: {self.max_ports}")
+            logger.warning("已达到最大端口数限制: %s", self.max_ports)
             return False
             
         if port_name in self.receivers:
-            print(f"端口 {port_name} 已存在")
+            logger.warning("端口 %s 已存在", port_name)
             return False
         
         # 创建串口接收器
-        receiver = SerialReceiver(port=port_path, baudrate=baudrate)
+        receiver = SerialReceiver(port=port_path, baudrate=baudrate, baud_cache=self.baud_cache)
         receiver.auto_detect_baudrate = auto_detect
+        receiver.recent_data_limit = self.recent_data_limit
         
         self.receivers[port_name] = receiver
         self.port_configs[port_name] = {
@@ -1267,7 +3074,7 @@ class MultiPortManager:
             'last_update': time.time()
         }
         
-        print(f"已添加端口 {port_name}: {port_path}")
+        logger.info("已添加端口 %s: %s", port_name, port_path)
         return True
     
     def remove_port(self, port_name):
@@ -1281,7 +3088,7 @@ class MultiPortManager:
             bool: 是否成功移除
         """
         if port_name not in self.receivers:
-            print(f"端口 {port_name} 不存在")
+            logger.warning("端口 %s 不存在", port_name)
             return False
         
         # 先断开连接
@@ -1291,7 +3098,7 @@ class MultiPortManager:
         del self.receivers[port_name]
         del self.port_configs[port_name]
         
-        print(f"已移除端口 {port_name}")
+        logger.info("已移除端口 %s", port_name)
         return True
     
     def connect_port(self, port_name):
@@ -1305,7 +3112,7 @@ class MultiPortManager:
             bool: 是否成功连接
         """
         if port_name not in self.receivers:
-            print(f"端口 {port_name} 不存在")
+            logger.warning("端口 %s 不存在", port_name)
             return False
         
         receiver = self.receivers[port_name]
@@ -1318,20 +3125,20 @@ class MultiPortManager:
                 if result:
                     config['connected'] = True
                     config['baudrate'] = receiver.detected_baudrate or config['baudrate']
-                    print(f"端口 {port_name} 自动检测连接成功，波特率: {config['baudrate']}")
+                    logger.info("端口 %s 自动检测连接成功，波特率: %s", port_name, config['baudrate'])
                     return True
             else:
                 # 使用指定波特率连接
                 if receiver.connect(config['port_path']):
                     config['connected'] = True
-                    print(f"端口 {port_name} 连接成功")
+                    logger.info("端口 %s 连接成功", port_name)
                     return True
             
-            print(f"端口 {port_name} 连接失败")
+            logger.warning("端口 %s 连接失败", port_name)
             return False
             
         except Exception as e:
-            print(f"端口 {port_name} 连接异常: {e}")
+            logger.error("端口 %s 连接异常: %s", port_name, e)
             return False
     
     def disconnect_port(self, port_name):
@@ -1345,7 +3152,7 @@ class MultiPortManager:
             bool: 是否成功断开
         """
         if port_name not in self.receivers:
-            print(f"端口 {port_name} 不存在")
+            logger.warning("端口 %s 不存在", port_name)
             return False
         
         receiver = self.receivers[port_name]
@@ -1354,24 +3161,104 @@ class MultiPortManager:
         try:
             receiver.disconnect()
             config['connected'] = False
-            print(f"端口 {port_name} 已断开连接")
+            logger.info("端口 %s 已断开连接", port_name)
             return True
         except Exception as e:
-            print(f"端口 {port_name} 断开连接异常: {e}")
+            logger.error("端口 %s 断开连接异常: %s", port_name, e)
             return False
     
-    def connect_all_ports(self):
+    def connect_all_ports(self, max_workers=None, timeout=None, callback=None):
         """
-        连接所有端口
+        并行连接所有端口（见 iter_connect_ports）
+        
+        Args:
+            max_workers: 最大并行线程数，默认 max_connect_workers
+            timeout: 总超时时间（秒），超时未完成的端口被取消，视为连接失败
+            callback: 每个端口连接完成时调用 callback(port_name, success)，在调用线程中执行
         
         Returns:
             dict: 每个端口的连接结果 {port_name: success}
         """
-        results = {}
-        for port_name in self.receivers:
-            results[port_name] = self.connect_port(port_name)
+        results = {port_name: False for port_name in self.receivers}
+        for port_name, success in self.iter_connect_ports(max_workers=max_workers, timeout=timeout):
+            results[port_name] = success
+            if callback:
+                callback(port_name, success)
         return results
     
+    def iter_connect_ports(self, port_names=None, max_workers=None, timeout=None):
+        """
+        在线程池中并行检测和连接多个端口，每个端口完成时立即返回结果
+        
+        总耗时取决于最慢的端口，而不是各端口耗时之和。超时、调用 cancel_connect() 或提前结束迭代时，
+        正在进行的波特率检测被取消（见 SerialReceiver.cancel_event），尚未开始的端口不再连接。
+        
+        Args:
+            port_names: 要连接的端口名称列表，默认全部端口
+            max_workers: 最大并行线程数，默认 max_connect_workers
+            timeout: 总超时时间（秒），为None时不限制
+        
+        Yields:
+            tuple: (端口名称, 是否成功连接)，按完成的先后顺序；超时未完成的端口在最后返回失败，
+                   即使它在取消期间连接成功（此时会断开连接）
+        """
+        port_names = [name for name in (self.receivers if port_names is None else port_names)
+                      if name in self.receivers]
+        if not port_names:
+            return
+        
+        cancel_event = Event()
+        self._connect_cancel_event = cancel_event
+        for port_name in port_names:
+            self.receivers[port_name].cancel_event = cancel_event
+        
+        workers = min(max_workers or self.max_connect_workers, len(port_names))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='connect')
+        futures = {executor.submit(self._connect_task, port_name, cancel_event): port_name
+                   for port_name in port_names}
+        pending = set(futures)
+        try:
+            try:
+                for future in as_completed(futures, timeout=timeout):
+                    pending.discard(future)
+                    yield futures[future], future.result()
+            except FuturesTimeoutError:
+                logger.warning("连接端口超时（%s 秒），取消 %s 个未完成的端口", timeout, len(pending))
+        finally:
+            # 取消正在进行的检测，等待线程结束，避免超时后端口仍在后台连接
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            for future in pending:
+                # 超时之后才连接成功的端口已经按失败处理，断开连接
+                if not future.cancelled() and future.exception() is None and future.result():
+                    logger.info("端口 %s 在超时之后才连接成功，断开连接", futures[future])
+                    self.disconnect_port(futures[future])
+            for port_name in port_names:
+                receiver = self.receivers.get(port_name)
+                if receiver is not None and receiver.cancel_event is cancel_event:
+                    receiver.cancel_event = None
+            if self._connect_cancel_event is cancel_event:
+                self._connect_cancel_event = None
+        
+        for future, port_name in futures.items():
+            if future in pending:
+                yield port_name, False
+    
+    def _connect_task(self, port_name, cancel_event):
+        """线程池中连接一个端口，已取消时不再连接"""
+        if cancel_event.is_set():
+            return False
+        return self.connect_port(port_name)
+    
+    def cancel_connect(self):
+        """取消正在进行的并行连接（可以在其他线程中调用）"""
+        cancel_event = self._connect_cancel_event
+        if cancel_event is not None:
+            cancel_event.set()
+            logger.info("已取消并行连接")
+    
     def disconnect_all_ports(self):
         """
         断开所有端口连接
@@ -1392,7 +3279,7 @@ class MultiPortManager:
         for port_name, receiver in self.receivers.items():
             if self.port_configs[port_name]['connected']:
                 receiver.start_receiving()
-                print(f"端口 {port_name} 开始接收数据")
+                logger.info("端口 %s 开始接收数据", port_name)
     
     def stop_all_receiving(self):
         """
@@ -1430,18 +3317,15 @@ class MultiPortManager:
         添加端口标识信息
         
         Returns:
-            list: 合并后的目标列表，每个目标包含source_port字段
+            list: 合并后的 Detection 列表，source 为来源端口（兼容 source_port/port_name 键访问）
         """
         combined_objects = []
         all_objects = self.get_all_detected_objects()
         
         for port_name, objects in all_objects.items():
             for obj in objects:
-                # 为每个目标添加来源端口信息
-                obj_with_source = obj.copy()
-                obj_with_source['source_port'] = port_name
-                obj_with_source['port_name'] = port_name
-                combined_objects.append(obj_with_source)
+                # 为每个目标添加来源端口信息（source_port/port_name）
+                combined_objects.append(obj.with_source(port_name))
         
         return combined_objects
     
@@ -1464,7 +3348,8 @@ class MultiPortManager:
                 'last_update': config['last_update'],
                 'object_count': len(receiver.get_detected_objects()) if config['connected'] else 0,
                 'total_objects': len(receiver.get_all_objects()) if config['connected'] else 0,
-                'has_new_data': receiver.has_new_data() if config['connected'] else False
+                'has_new_data': receiver.has_new_data() if config['connected'] else False,
+                'metrics': receiver.get_metrics()
             }
             
             # 添加连接信息
@@ -1476,13 +3361,27 @@ class MultiPortManager:
         
         return status
     
+    def get_combined_metrics(self):
+        """
+        汇总所有端口的运行统计
+        
+        计数累加（最高水位取最大值），耗时分布合并后重新计算百分位数。
+        
+        Returns:
+            dict: 与 SerialReceiver.get_metrics() 中的统计项相同
+        """
+        combined = Metrics(RECEIVER_COUNTERS, RECEIVER_HISTOGRAMS)
+        for receiver in self.receivers.values():
+            combined.merge(receiver.metrics)
+        return combined.snapshot()
+    
     def clear_all_objects(self):
         """
         清空所有端口的目标数据
         """
         for receiver in self.receivers.values():
             receiver.clear_objects()
-        print("已清空所有端口的目标数据")
+        logger.info("已清空所有端口的目标数据")
     
     def restart_all_receiving(self):
         """
@@ -1491,7 +3390,7 @@ class MultiPortManager:
         for port_name, receiver in self.receivers.items():
             if self.port_configs[port_name]['connected']:
                 receiver.restart_receiving()
-        print("已重启所有端口的数据接收")
+        logger.info("已重启所有端口的数据接收")
     
     def add_update_callback(self, callback):
         """
@@ -1524,7 +3423,7 @@ class MultiPortManager:
             try:
                 callback(port_name, objects)
             except Exception as e:
-                print(f"回调函数执行异常: {e}")
+                logger.error("回调函数执行异常: %s", e)
     
     def get_port_names(self):
         """
@@ -1602,18 +3501,18 @@ class MultiPortManager:
             bool: 是否发送成功
         """
         if port_name not in self.receivers:
-            print(f"端口 {port_name} 不存在")
+            logger.warning("端口 %s 不存在", port_name)
             return False
         
         if not self.port_configs[port_name]['connected']:
-            print(f"端口 {port_name} 未连接")
+            logger.warning("端口 %s 未连接", port_name)
             return False
         
         receiver = self.receivers[port_name]
         
         try:
             if not receiver.serial or not receiver.serial.is_open:
-                print(f"端口 {port_name} 串口未打开")
+                logger.warning("端口 %s 串口未打开", port_name)
                 return False
             
             # 转换数据格式
@@ -1629,11 +3528,11 @@ class MultiPortManager:
             bytes_sent = receiver.serial.write(byte_data)
             receiver.serial.flush()  # 确保数据发送
             
-            print(f"端口 {port_name} 发送 {bytes_sent} 字节数据")
+            logger.info("端口 %s 发送 %s 字节数据", port_name, bytes_sent)
             return True
             
         except Exception as e:
-            print(f"端口 {port_name} 发送数据失败: {e}")
+            logger.error("端口 %s 发送数据失败: %s", port_name, e)
             return False
     
     def send_data_to_all_ports(self, data, as_hex=False):
@@ -1672,9 +3571,8 @@ class MultiPortManager:
         receiver = self.receivers[port_name]
         
         try:
-            # 从数据缓冲区获取原始数据
-            with receiver.data_lock:
-                raw_data = receiver.data_buffer
+            # 获取最近接收的原始数据
+            _, raw_data = receiver.get_recent_data()
             
             # 按行分割数据
             lines = raw_data.split('\n')
@@ -1683,7 +3581,7 @@ class MultiPortManager:
             return lines[-max_lines:] if len(lines) > max_lines else lines
             
         except Exception as e:
-            print(f"获取端口 {port_name} 数据失败: {e}")
+            logger.error("获取端口 %s 数据失败: %s", port_name, e)
             return []
     
     def get_all_received_data(self, max_lines=100):
@@ -1717,19 +3615,20 @@ class MultiPortManager:
         receiver = self.receivers[port_name]
         
         try:
-            with receiver.data_lock:
-                receiver.data_buffer = ""
+            with receiver.process_lock, receiver.data_lock:
+                receiver.decoder.reset()
+                receiver.recent_data.clear()
             
             # 也清空串口硬件缓冲区
             if receiver.serial and receiver.serial.is_open:
                 receiver.serial.reset_input_buffer()
                 receiver.serial.reset_output_buffer()
             
-            print(f"端口 {port_name} 缓冲区已清空")
+            logger.info("端口 %s 缓冲区已清空", port_name)
             return True
             
         except Exception as e:
-            print(f"清空端口 {port_name} 缓冲区失败: {e}")
+            logger.error("清空端口 %s 缓冲区失败: %s", port_name, e)
             return False
     
     def clear_all_port_buffers(self):
@@ -1746,6 +3645,7 @@ class MultiPortManager:
 
 # 测试代码
 if __name__ == "__main__":
+    setup_logging()
     receiver = SerialReceiver()
     available_ports = receiver.list_ports()
     print(f"可用串口: {available_ports}")
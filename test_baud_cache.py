@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+波特率缓存测试脚本
+
+此脚本测试按设备身份持久化保存的波特率缓存，包括：
+1. 由串口路径和USB VID/PID/序列号组成的设备身份
+2. 缓存文件的读写、损坏文件的处理和设备换接口后的查找
+3. 重新启动后连接时只快速验证缓存的波特率
+4. 缓存的波特率失效时回退到完整检测并更新缓存
+5. 缓存默认不启用，每次连接只获取一次设备身份
+"""
+
+import os
+import sys
+import time
+import tempfile
+import serial_receive
+from mock_serial import MockSerialTools, SimulatedLink
+from baud_cache import BaudRateCache, device_identity, identity_key
+from serial_receive import SerialReceiver
+
+def test_device_identity():
+    """测试设备身份"""
+    print("=== 设备身份测试 ===\n")
+    
+    ports = [
+        MockSerialTools.ComPort("/dev/ttyS0"),
+        MockSerialTools.ComPort("/dev/ttyUSB0", vid=0x1A86, pid=0x7523, serial_number="A1B2"),
+    ]
+    usb = device_identity("/dev/ttyUSB0", ports)
+    builtin = device_identity("/dev/ttyS0", ports)
+    missing = device_identity("/dev/ttyUSB9", ports)
+    
+    print(f"  {identity_key(usb)}")
+    assert identity_key(usb) == "/dev/ttyUSB0|1A86:7523|A1B2"
+    assert identity_key(builtin) == "/dev/ttyS0"
+    assert missing == {'port': "/dev/ttyUSB9", 'vid': None, 'pid': None, 'serial_number': None}
+    
+    print("✓ 设备身份正确")
+    return True
+
+def test_cache_persistence():
+    """测试缓存文件的读写"""
+    print("\n=== 缓存读写测试 ===\n")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache", "baudrates.json")
+        identity = {'port': "/dev/ttyUSB0", 'vid': 0x0403, 'pid': 0x6001, 'serial_number': "FT01"}
+        
+        cache = BaudRateCache(path)
+        assert cache.lookup(identity) is None
+        cache.store(identity, 921600, 0.95)
+        
+        # 新的实例（重新启动）从文件读取
+        reloaded = BaudRateCache(path)
+        entry = reloaded.lookup(identity)
+        assert entry['baudrate'] == 921600 and entry['confidence'] == 0.95
+        
+        # 同一个设备换了接口
+        moved = dict(identity, port="/dev/ttyUSB3")
+        assert reloaded.lookup(moved)['baudrate'] == 921600
+        assert reloaded.lookup(dict(moved, serial_number="OTHER")) is None
+        
+        reloaded.forget(identity)
+        assert BaudRateCache(path).lookup(identity) is None
+        
+        # 损坏的缓存文件被当作空缓存
+        with open(path, 'w') as f:
+            f.write("{not json")
+        damaged = BaudRateCache(path)
+        assert damaged.lookup(identity) is None
+        damaged.store(identity, 9600)
+        assert BaudRateCache(path).lookup(identity)['baudrate'] == 9600
+    
+    print("✓ 缓存读写正确")
+    return True
+
+def connect(cache, link):
+    """模拟重新启动：新的接收器通过自动检测连接，返回 (是否成功, 耗时, 接收器)"""
+    receiver = SerialReceiver(baud_cache=cache)
+    receiver.hardware_detection_enabled = False
+    start_time = time.time()
+    success = receiver.connect_with_auto_detect("SIM", test_duration=2.0)
+    return success, time.time() - start_time, receiver
+
+def test_connect_with_cache():
+    """测试连接时使用缓存的波特率"""
+    print("\n=== 缓存连接测试 ===\n")
+    
+    assert SerialReceiver().baud_cache is None, "波特率缓存默认不启用"
+    
+    link = SimulatedLink(230400)
+    restore = link.install()
+    lookups = []
+    resolve = serial_receive.device_identity
+    serial_receive.device_identity = lambda port: lookups.append(port) or resolve(port)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = BaudRateCache(os.path.join(directory, "baudrates.json"))
+            
+            success, elapsed, receiver = connect(cache, link)
+            print(f"  第一次连接: {receiver.baudrate}, 耗时 {elapsed:.2f}s, 测试了 {link.opened}")
+            assert success and receiver.baudrate == 230400
+            assert lookups == ["SIM"], f"查找和保存缓存应共用一次获取的设备身份: {lookups}"
+            entry = cache.lookup(device_identity("SIM"))
+            assert entry['baudrate'] == 230400 and entry['confidence'] > 0.6
+            
+            link.opened = []
+            success, elapsed, receiver = connect(BaudRateCache(cache.path), link)
+            print(f"  重新启动后连接: {receiver.baudrate}, 耗时 {elapsed:.2f}s, 测试了 {link.opened}")
+            assert success and receiver.baudrate == 230400
+            assert link.opened == [230400, 230400], "只验证缓存的波特率，然后连接"
+            assert elapsed < 1.0, f"使用缓存的连接应在1秒内完成，实际耗时 {elapsed:.2f}s"
+            assert receiver.detection_results['verification']['status'] == 'confident'
+            
+            # 设备换了波特率：验证失败，完整检测后更新缓存
+            link.device_baudrate = 115200
+            link.opened = []
+            success, elapsed, receiver = connect(BaudRateCache(cache.path), link)
+            print(f"  设备更换波特率后: {receiver.baudrate}, 测试了 {link.opened}")
+            assert success and receiver.baudrate == 115200 and link.opened[0] == 230400
+            assert BaudRateCache(cache.path).lookup(device_identity("SIM"))['baudrate'] == 115200
+    finally:
+        serial_receive.device_identity = resolve
+        restore()
+    
+    print("✓ 缓存连接正确")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("设备身份", test_device_identity),
+        ("缓存读写", test_cache_persistence),
+        ("缓存连接", test_connect_with_cache),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+波特率扫描测试脚本
+
+此脚本使用模拟的设备链路测试软件质量评估的波特率扫描，包括：
+1. 按先验顺序扫描（上次的波特率和常用波特率优先）
+2. 质量分数足够高时立即停止扫描
+3. 乱码的波特率在100ms左右被放弃
+4. 重新连接时快速验证上次检测到的波特率
+5. 采集够数据后立即结束采样，没有数据的波特率按超时提前放弃
+6. 硬件时序检测按时序似然调整测试顺序，置信度足够高时立即停止
+"""
+
+import sys
+import time
+from mock_serial import SimulatedLink
+from serial_receive import SerialReceiver, BAUDRATE_SCAN_PRIORITY
+
+def test_scan_order():
+    """测试扫描顺序"""
+    print("=== 扫描顺序测试 ===\n")
+    
+    receiver = SerialReceiver()
+    order = receiver._baudrate_scan_order([57600, 250000])
+    print(f"  扫描顺序: {order[:8]} ...")
+    
+    assert order[:2] == [57600, 250000], "优先的波特率应最先测试"
+    assert order[2] == BAUDRATE_SCAN_PRIORITY[0]
+    assert sorted(order) == sorted(set(receiver.common_baudrates) | {250000}), "每个波特率只测试一次"
+    
+    print("✓ 扫描顺序正确")
+    return True
+
+def test_early_exit_and_pruning():
+    """测试提前结束和乱码剪枝"""
+    print("\n=== 提前结束和剪枝测试 ===\n")
+    
+    link = SimulatedLink(57600)
+    restore = link.install()
+    try:
+        receiver = SerialReceiver()
+        start_time = time.time()
+        baudrate = receiver._software_quality_detection("SIM", test_duration=2.0)
+        elapsed = time.time() - start_time
+    finally:
+        restore()
+    
+    scores = receiver.detection_results['software_quality']['scores']
+    print(f"  检测结果: {baudrate}, 耗时 {elapsed:.2f}s, 测试了 {link.opened}")
+    
+    expected_order = [rate for rate in BAUDRATE_SCAN_PRIORITY if rate != 57600]
+    assert baudrate == 57600
+    assert link.opened[:-1] == expected_order[:len(link.opened) - 1] and link.opened[-1] == 57600
+    assert len(scores) == len(link.opened) < len(receiver.common_baudrates), "找到可信的波特率后应停止扫描"
+    assert elapsed < 2.0, f"乱码的波特率应被提前放弃，实际耗时 {elapsed:.2f}s"
+    
+    print("✓ 提前结束和剪枝正确")
+    return True
+
+def test_reconnect_verification():
+    """测试重新连接时验证上次的波特率"""
+    print("\n=== 重新连接验证测试 ===\n")
+    
+    link = SimulatedLink(460800)
+    restore = link.install()
+    try:
+        receiver = SerialReceiver()
+        receiver.hardware_detection_enabled = False
+        receiver.detected_baudrate = 460800
+        start_time = time.time()
+        baudrate = receiver.detect_baudrate("SIM", test_duration=2.0)
+        elapsed = time.time() - start_time
+        print(f"  上次的波特率仍然有效: {baudrate}, 耗时 {elapsed:.2f}s")
+        assert baudrate == 460800 and link.opened == [460800]
+        assert elapsed < 1.0, f"重新连接应在1秒内完成，实际耗时 {elapsed:.2f}s"
+        
+        # 设备更换了波特率：验证失败后进行完整的扫描
+        link.device_baudrate = 9600
+        link.opened = []
+        baudrate = receiver.detect_baudrate("SIM", test_duration=2.0)
+        print(f"  设备更换波特率后: {baudrate}, 测试了 {link.opened}")
+        assert baudrate == 9600 and link.opened[0] == 460800
+    finally:
+        restore()
+    
+    print("✓ 重新连接验证正确")
+    return True
+
+def test_sample_budgets():
+    """测试采样预算和静默超时"""
+    print("\n=== 采样预算测试 ===\n")
+    
+    link = SimulatedLink(115200, byte_rate=50000, port_baudrates={"SILENT": None})
+    restore = link.install()
+    try:
+        receiver = SerialReceiver()
+        receiver.scan_confidence_score = 101  # 不会提前确认，只能按预算结束
+        start_time = time.time()
+        score, status = receiver._measure_baudrate_quality("SIM", 115200, test_duration=5.0)
+        elapsed = time.time() - start_time
+        print(f"  字节预算: {status}, 分数 {score:.1f}, 耗时 {elapsed:.2f}s")
+        assert status == 'budget' and score > 60
+        assert elapsed < 0.5, f"采集 {receiver.scan_byte_budget} 字节后应立即结束"
+        
+        # 静默超时随波特率变化：低波特率下至少等待 scan_silence_chars 个字符的时间
+        assert receiver._silence_timeout(115200) == receiver.scan_silence_timeout
+        assert abs(receiver._silence_timeout(600) - 64 * 10 / 600) < 1e-9
+        start_time = time.time()
+        score, status = receiver._measure_baudrate_quality("SILENT", 115200, test_duration=5.0)
+        elapsed = time.time() - start_time
+        print(f"  静默端口: {status}, 耗时 {elapsed:.2f}s")
+        assert status == 'silent' and score == 0
+        assert receiver.scan_silence_timeout <= elapsed < receiver.scan_silence_timeout + 0.2
+        
+        # 硬件时序检测的样本预算：每条记录包含一个字符'2'
+        receiver.timing_sample_budget = 20
+        test_serial = link("SIM", 115200, timeout=receiver.scan_read_timeout)
+        start_time = time.time()
+        samples = receiver._collect_ascii2_timing_samples(test_serial, duration=5.0)
+        elapsed = time.time() - start_time
+        print(f"  时序样本: {len(samples)} 个, 耗时 {elapsed:.2f}s")
+        assert len(samples) == 20 and elapsed < 0.5
+        
+        test_serial = link("SILENT", 115200, timeout=receiver.scan_read_timeout)
+        start_time = time.time()
+        assert receiver._collect_ascii2_timing_samples(test_serial, duration=5.0) == []
+        assert time.time() - start_time < receiver.scan_silence_timeout + 0.2
+    finally:
+        restore()
+    
+    print("✓ 采样预算正确")
+    return True
+
+def test_timing_detection_order():
+    """测试硬件时序检测的测试顺序和提前结束"""
+    print("\n=== 时序检测顺序测试 ===\n")
+    
+    # 设备以 38400 波特率连续发送'2'，相邻两个'2'相隔1、3或5个字符时间。
+    # 模拟的串口不产生真实的时序，以任何波特率打开都返回这组时间戳
+    char_time = 10 / 38400
+    timestamps = [0.0]
+    for i in range(40):
+        timestamps.append(timestamps[-1] + char_time * (1, 3, 5)[i % 3])
+    
+    link = SimulatedLink(38400)
+    restore = link.install()
+    try:
+        receiver = SerialReceiver()
+        sampled = []
+        
+        def collect(test_serial, duration, bit_time_us=None):
+            sampled.append(test_serial.baudrate)
+            return [(timestamp, '2') for timestamp in timestamps]
+        
+        receiver._collect_ascii2_timing_samples = collect
+        baudrate, confidence, results = receiver._hardware_timing_detection("SIM", test_duration=1.0)
+    finally:
+        restore()
+    
+    print(f"  检测结果: {baudrate}, 置信度 {confidence:.2f}, 测试了 {sampled}")
+    assert baudrate == 38400 and confidence >= receiver.timing_confidence
+    assert sampled == [BAUDRATE_SCAN_PRIORITY[0], 38400], "第一次采样后应按似然先测试 38400，确认后停止"
+    assert list(results) == sampled
+    
+    # 采样时达到置信度后立即结束
+    link = SimulatedLink(115200, byte_rate=50000)
+    restore = link.install()
+    try:
+        receiver = SerialReceiver()
+        receiver._analyze_ascii2_timing_samples = lambda samples, bit_time_us: 1.0
+        test_serial = link("SIM", 115200, timeout=receiver.scan_read_timeout)
+        samples = receiver._collect_ascii2_timing_samples(test_serial, duration=5.0, bit_time_us=1e6 / 115200)
+    finally:
+        restore()
+    print(f"  置信度足够时采集了 {len(samples)} 个样本")
+    assert receiver.timing_check_samples <= len(samples) < receiver.timing_sample_budget
+    
+    print("✓ 时序检测顺序正确")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("扫描顺序", test_scan_order),
+        ("提前结束和剪枝", test_early_exit_and_pruning),
+        ("重新连接验证", test_reconnect_verification),
+        ("采样预算", test_sample_budgets),
+        ("时序检测顺序", test_timing_detection_order),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
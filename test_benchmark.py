@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+基准测试脚本的测试
+
+此脚本用于检查 benchmark.py 本身，包括：
+1. 相同种子生成的数据流完全相同，噪声比例符合设置
+2. 各项基准测试的结果字段和比较功能
+"""
+
+import sys
+from benchmark import build_stream, bench_parse, bench_combined, compare_results
+from detection import detections_from_array
+from serial_receive import parse_detections
+
+def test_stream_determinism():
+    """测试数据流可重复且噪声比例正确"""
+    print("=== 数据流生成测试 ===\n")
+    
+    stream, records = build_stream(7, 40, 5, noise_ratio=0.3)
+    assert stream == build_stream(7, 40, 5, noise_ratio=0.3)[0], "相同种子应生成相同的数据流"
+    assert stream != build_stream(8, 40, 5, noise_ratio=0.3)[0]
+    assert records == 200
+    assert len(parse_detections(stream)) == records, "噪声不应破坏或产生记录"
+    
+    clean, _ = build_stream(7, 40, 5)
+    noise = 1 - len(clean) / len(stream)
+    print(f"  数据流 {len(stream)} 字节, 噪声比例 {noise:.2f}")
+    assert 0.25 < noise < 0.35
+    
+    print("✓ 数据流可重复")
+    return True
+
+def test_bench_results():
+    """测试基准测试结果字段和比较"""
+    print("\n=== 基准测试结果测试 ===\n")
+    
+    stream, records = build_stream(1, 20, 3, noise_ratio=0.1)
+    result = bench_parse(stream, 64, repeat=1)
+    print(f"  {result}")
+    assert result['records'] == records
+    assert result['mb_per_s'] > 0 and result['records_per_s'] > 0
+    assert result['peak_alloc_bytes'] > 0
+    
+    objects = detections_from_array(parse_detections(stream))
+    combined = bench_combined(objects, repeat=1, calls=2)
+    assert combined['objects'] == len(objects) * 2 and combined['calls_per_s'] > 0
+    
+    old = {'results': {'parse': dict(result, mb_per_s=result['mb_per_s'] / 2)}}
+    rows = compare_results(old, {'results': {'parse': result}})
+    ratios = {key: ratio for _, key, _, _, ratio in rows}
+    assert ratios.keys() == {'mb_per_s', 'records_per_s'}
+    assert abs(ratios['mb_per_s'] - 2.0) < 1e-9 and ratios['records_per_s'] == 1.0
+    
+    print("✓ 基准测试结果正确")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("数据流生成", test_stream_determinism),
+        ("基准测试结果", test_bench_results),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+数据质量评分测试脚本
+
+此脚本测试波特率检测使用的数据质量评分，包括：
+1. 与原来逐字符实现的评分完全一致（字符串和字节数据）
+2. 各项分数的含义
+3. 大量数据的评分耗时与数据长度成线性关系
+"""
+
+import re
+import sys
+import time
+import random
+from serial_receive import SerialReceiver, evaluate_data_quality
+
+def reference_quality(combined_data):
+    """原来的逐字符实现，作为对照"""
+    if not combined_data:
+        return 0
+    score = min(len(combined_data) / 50, 40)
+    printable_chars = sum(1 for c in combined_data if 32 <= ord(c) <= 126 or c in '\r\n\t')
+    score += printable_chars / len(combined_data) * 40
+    consistency_score = 0
+    if re.search(r'[0-9]+', combined_data):
+        consistency_score += 8
+    if re.search(r'[a-zA-Z]+', combined_data):
+        consistency_score += 6
+    if len(combined_data) >= 4:
+        for i in range(len(combined_data) - 3):
+            if combined_data[i:i+2] in combined_data[i+2:]:
+                consistency_score += 3
+                break
+    if '\n' in combined_data or '\r' in combined_data:
+        consistency_score += 3
+    score += min(consistency_score, 20)
+    return min(score, 100)
+
+def test_matches_reference():
+    """测试与原实现的评分一致"""
+    print("=== 评分一致性测试 ===\n")
+    
+    receiver = SerialReceiver()
+    cases = ["", "2", "aaa", "aaaa", "abab", "abcab", "2\n2??\x01", "abééab", "���",
+             "class:1\nscore:85\nbbox:50\n", "TEMP:25.6C\nHUMI:60.2%\n", "中文中"]
+    rng = random.Random(7)
+    alphabets = ["ab", "abc\n", "0123456789", "".join(map(chr, range(256))), "xy�中"]
+    for _ in range(300):
+        alphabet = rng.choice(alphabets)
+        cases.append("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))))
+    
+    for text in cases:
+        expected = reference_quality(text)
+        assert receiver._evaluate_data_quality([text]) == expected, f"评分不一致: {text!r}"
+        # 字节数据与 decode('ascii', errors='replace') 之后的字符串评分相同
+        raw = text.encode('latin-1', errors='replace')
+        assert evaluate_data_quality(raw)['total'] == reference_quality(raw.decode('ascii', errors='replace')), \
+            f"字节数据评分不一致: {raw!r}"
+    
+    # 多个样本与合并后评分相同，字节样本和字符串样本可以混合
+    assert receiver._evaluate_data_quality([b"class:1\n", "score:", b"\xff85\n"]) == reference_quality("class:1\nscore:�85\n")
+    
+    print(f"✓ {len(cases)} 个样本的评分与原实现一致")
+    return True
+
+def test_sub_scores():
+    """测试各项分数"""
+    print("\n=== 分项分数测试 ===\n")
+    
+    scores = evaluate_data_quality(b"class:1\nscore:85\n" * 10)
+    print(f"  {scores}")
+    assert scores['length'] == 170 / 50 and scores['printable_ratio'] == 1.0
+    assert (scores['digits'], scores['letters'], scores['repetition'], scores['newlines']) == (8, 6, 3, 3)
+    assert scores['consistency'] == 20 and scores['total'] == scores['length'] + 40 + 20
+    
+    # 无效字节解码后都是U+FFFD，与原实现一样算作重复的2字符模式
+    garbage = evaluate_data_quality(bytes(range(128, 256)))
+    assert garbage['printable'] == 0 and garbage['consistency'] == garbage['repetition'] == 3
+    assert evaluate_data_quality(b"")['total'] == 0
+    assert SerialReceiver._printable_ratio(b"ab\x00\xff") == 0.5
+    
+    print("✓ 分项分数正确")
+    return True
+
+def test_linear_time():
+    """测试大量数据的评分耗时"""
+    print("\n=== 评分耗时测试 ===\n")
+    
+    rng = random.Random(3)
+    # 没有重复2字符模式的数据是原实现的最坏情况（每个位置都要扫描剩余的全部数据）
+    timings = {}
+    for size in (1 << 18, 1 << 20):
+        data = bytes(rng.randrange(256) for _ in range(size))
+        start_time = time.perf_counter()
+        evaluate_data_quality(data)
+        timings[size] = time.perf_counter() - start_time
+        print(f"  {size} 字节: {timings[size] * 1000:.1f} ms")
+    
+    assert timings[1 << 20] < 1.0, "1MB 数据的评分应在1秒内完成"
+    
+    print("✓ 评分耗时正常")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("评分一致性", test_matches_reference),
+        ("分项分数", test_sub_scores),
+        ("评分耗时", test_linear_time),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+分帧测试脚本
+
+此脚本用于测试 FrameAssembler 和 SerialReceiver 的按帧发布，包括：
+1. 跨越数据块的帧标记查找
+2. 按分隔符分帧：数据块如何切分都不影响 object_data
+3. 按帧头记录数分帧，不完整的帧被丢弃
+4. 按到达时间间隔分帧，从一帧中间开始的数据流在第一个间隔之后才同步
+5. 每帧只进行一次合并和去重
+"""
+
+import sys
+import time
+import random
+from frames import FrameAssembler, MarkerScanner
+from serial_receive import SerialReceiver
+
+RECORD = "class:{}\nscore:80\nbbox:{}\nbbox:{}\nbbox:{}\nbbox:{}\n"
+
+def make_frame(frame_index, count):
+    """生成一帧中互不重叠的记录"""
+    return "".join(RECORD.format(i % 6, i * 30, frame_index * 10, i * 30 + 20, frame_index * 10 + 20)
+                   for i in range(count))
+
+def feed_in_random_chunks(receiver, data, rng):
+    """把数据随机切分后交给接收器，返回每次发布的帧 [(帧序号, 边界框列表), ...]"""
+    published = []
+    original = receiver._publish_frames
+    
+    def recording_publish(frames):
+        original(frames)
+        for frame in frames:
+            if frame.complete:
+                published.append((frame.frame_id, [obj['bbox'] for obj in receiver.object_data]
+                                  if frame.detections else []))
+    
+    receiver._publish_frames = recording_publish
+    pos = 0
+    while pos < len(data):
+        size = rng.randint(1, 40)
+        receiver._process_data(data[pos:pos + size])
+        pos += size
+    return published
+
+def test_marker_scanner():
+    """测试跨越数据块的帧标记查找"""
+    print("=== 帧标记查找测试 ===\n")
+    
+    scanner = MarkerScanner(b'END\n')
+    assert scanner.scan(b'abcEN') == []
+    assert scanner.scan(b'D\nxyzEND\n') == [(2, None), (9, None)]
+    
+    scanner = MarkerScanner(b'frame:', number=True)
+    assert scanner.scan(b'xxfra') == []
+    assert scanner.scan(b'me:1') == []
+    assert scanner.scan(b'2\nclass:') == [(1, 12)]
+    assert scanner.scan(b'frame:0 frame:3\n') == [(7, 0), (15, 3)]
+    
+    print("✓ 帧标记查找正确")
+    return True
+
+def test_delimiter_frames():
+    """测试按分隔符分帧"""
+    print("\n=== 分隔符分帧测试 ===\n")
+    
+    counts = [3, 1, 4, 0, 2]
+    stream = "partial:1\n" + RECORD.format(0, 1, 1, 5, 5) + "END\n"  # 连接时正在发送的一帧
+    stream += "".join(make_frame(i, count) + "END\n" for i, count in enumerate(counts))
+    
+    for seed in range(5):
+        receiver = SerialReceiver(protocol='text')
+        receiver.max_history = 100
+        receiver.set_frame_mode('delimiter', delimiter=b'END\n')
+        published = feed_in_random_chunks(receiver, stream, random.Random(seed))
+        
+        assert [len(boxes) for _, boxes in published] == counts, f"每次发布应为完整的一帧: {published}"
+        assert [frame_id for frame_id, _ in published] == [1, 2, 3, 4, 5]
+        metrics = receiver.get_metrics()
+        assert metrics['frames_published'] == 5 and metrics['frames_incomplete'] == 1
+    
+    assert receiver.get_current_frame().timestamp is not None
+    print(f"✓ 分隔符分帧正确 (帧大小 {counts})")
+    return True
+
+def test_count_frames():
+    """测试按帧头记录数分帧"""
+    print("\n=== 帧头分帧测试 ===\n")
+    
+    stream = make_frame(9, 2)  # 帧头之前的记录不属于完整的帧
+    stream += "frame:3\n" + make_frame(0, 3)
+    stream += "frame:4\n" + make_frame(1, 2)  # 数据丢失，只收到2条
+    stream += "frame:2\n" + make_frame(2, 2)
+    
+    receiver = SerialReceiver(protocol='text')
+    receiver.set_frame_mode('count')
+    published = feed_in_random_chunks(receiver, stream, random.Random(1))
+    receiver._reprocess_buffer()
+    
+    assert [len(boxes) for _, boxes in published] == [3, 2], f"帧头分帧结果错误: {published}"
+    assert receiver.get_metrics()['frames_incomplete'] == 2
+    
+    print("✓ 帧头分帧正确")
+    return True
+
+def test_gap_frames():
+    """测试按到达时间间隔分帧"""
+    print("\n=== 间隔分帧测试 ===\n")
+    
+    assembler = FrameAssembler('gap', min_gap=0.01)
+    assert abs(assembler.gap_seconds(1200) - 3.5 * 10 / 1200) < 1e-12
+    assert assembler.gap_seconds(115200) == 0.01
+    
+    # 数据流从一帧的中间开始：第一个间隔之前的记录不是完整的帧
+    frames = assembler.add(['a', 'b'], [0.0, 0.001], 115200)
+    frames += assembler.add(['c', 'd', 'e'], [0.1, 0.101, 0.102], 115200)
+    frames += assembler.add(['f'], [0.2], 115200)
+    frames += assembler.poll(0.3, 115200)
+    assert [(frame.detections, frame.complete) for frame in frames] == [
+        (['a', 'b'], False), (['c', 'd', 'e'], True), (['f'], True)], f"间隔分帧结果错误: {frames}"
+    
+    # 数据中断后重新同步；空闲超时也是一个间隔
+    assembler.add(['g'], [0.4], 115200)
+    assert [(frame.detections, frame.complete) for frame in assembler.reset()] == [(['g'], False)]
+    assert [frame.complete for frame in assembler.add(['h', 'i'], [0.5, 0.501], 115200)] == []
+    assert [frame.complete for frame in assembler.poll(0.6, 115200)] == [False]
+    assert [frame.complete for frame in assembler.add(['j'], [0.7], 115200) + assembler.poll(0.8, 115200)] == [True]
+    
+    receiver = SerialReceiver(protocol='text', baudrate=115200)
+    receiver.set_frame_mode('gap', min_gap=0.05)
+    frames = [make_frame(9, 1), make_frame(0, 3), make_frame(1, 2)]  # 第一帧是连接时正在发送的帧的后半部分
+    for frame in frames:
+        # 同一帧分成两个数据块，间隔小于帧间隔
+        half = len(frame) // 2
+        receiver._process_data(frame[:half])
+        receiver._process_data(frame[half:])
+        assert receiver.frame_count == 0 or len(receiver.object_data) == 3
+        time.sleep(0.1)
+    receiver._process_ring_buffer()
+    time.sleep(0.1)
+    receiver._process_ring_buffer()
+    
+    assert receiver.frame_count == 2, f"应发布2帧: {receiver.frame_count}"
+    assert len(receiver.object_data) == 2
+    assert receiver.get_metrics()['frames_incomplete'] == 1
+    
+    print("✓ 间隔分帧正确")
+    return True
+
+def test_dedup_once_per_frame():
+    """测试每帧只进行一次合并和去重"""
+    print("\n=== 每帧去重测试 ===\n")
+    
+    stream = "".join(make_frame(i, 5) + "END\n" for i in range(4))
+    calls = {'chunk': 0, 'delimiter': 0}
+    for mode in calls:
+        receiver = SerialReceiver(protocol='text')
+        receiver.set_frame_mode(mode, **({'delimiter': b'END\n'} if mode == 'delimiter' else {}))
+        original = receiver._update_objects
+        
+        def counting_update(objects, original=original, mode=mode):
+            calls[mode] += 1
+            return original(objects)
+        
+        receiver._update_objects = counting_update
+        for i in range(0, len(stream), 16):
+            receiver._process_data(stream[i:i + 16])
+        receiver._reprocess_buffer()
+    
+    print(f"  去重次数: {calls}")
+    assert calls['delimiter'] == 3, "第一帧之前没有分隔符，其余每帧去重一次"
+    assert calls['chunk'] > calls['delimiter']
+    
+    print("✓ 每帧只去重一次")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("帧标记查找", test_marker_scanner),
+        ("分隔符分帧", test_delimiter_frames),
+        ("帧头分帧", test_count_frames),
+        ("间隔分帧", test_gap_frames),
+        ("每帧去重", test_dedup_once_per_frame),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
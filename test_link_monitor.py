@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+链路质量监测测试脚本
+
+此脚本测试接收过程中的链路质量监测和自动重新检测，包括：
+1. 滑动窗口内的可打印字符比例、无效字节比例、每KB记录数和字节速率
+2. 质量下降持续 degrade_time 秒后才判定链路异常
+3. 恢复使用更严格的阈值（滞后），两次异常之间有冷却时间
+4. 二进制协议下不检查文本类指标
+5. 波特率不匹配时在后台重新检测并以新的波特率重新连接
+6. 不是检测数据的文本长时间发送时不会反复重新检测
+"""
+
+import sys
+import time
+import random
+from mock_serial import SimulatedLink, SIMULATED_RECORD
+from link_monitor import LinkQualityMonitor
+from serial_receive import SerialReceiver
+
+GOOD = SIMULATED_RECORD * 10
+GARBAGE = bytes(random.Random(7).randrange(256) for _ in range(len(GOOD)))
+PLAIN = b"temperature=23.5 humidity=41% status=ok\r\n" * 12  # 设备发送的不是检测数据
+
+def feed(monitor, data, records, start, end, text=True, step=0.1):
+    """在 [start, end) 内每 step 秒记录一个数据块并更新状态，返回发生的事件"""
+    events = []
+    now = start
+    while now < end:
+        monitor.record(data, records, now)
+        event = monitor.update(now, text=text)
+        if event:
+            events.append((round(now, 2), event))
+        now += step
+    return events
+
+def test_window_statistics():
+    """测试滑动窗口统计"""
+    print("=== 滑动窗口统计测试 ===\n")
+    
+    monitor = LinkQualityMonitor(window=1.0)
+    monitor.record(GOOD, 10, now=0.0)
+    monitor.record(b"\xff" * 100 + b"abc", 0, now=0.5)
+    stats = monitor.snapshot(now=0.5)
+    print(f"  {stats}")
+    
+    assert stats['bytes'] == len(GOOD) + 103 and stats['records'] == 10
+    assert abs(stats['printable_ratio'] - (len(GOOD) + 3) / stats['bytes']) < 1e-9
+    assert abs(stats['replacement_rate'] - 100 / stats['bytes']) < 1e-9
+    assert abs(stats['records_per_kb'] - 10 * 1024 / stats['bytes']) < 1e-9
+    
+    # 第一个数据块移出窗口
+    stats = monitor.snapshot(now=1.2)
+    assert stats['bytes'] == 103 and stats['records'] == 0
+    assert monitor.snapshot(now=5.0)['printable_ratio'] is None
+    
+    print("✓ 滑动窗口统计正确")
+    return True
+
+def test_degrade_and_recover():
+    """测试异常判定、滞后和冷却时间"""
+    print("\n=== 异常判定和恢复测试 ===\n")
+    
+    monitor = LinkQualityMonitor(window=1.0, min_bytes=256, degrade_time=0.5, cooldown=10.0)
+    assert feed(monitor, GOOD, 10, 0.0, 2.0) == []
+    
+    # 乱码持续 degrade_time 秒后才判定异常
+    events = feed(monitor, GARBAGE, 0, 2.0, 4.0)
+    print(f"  乱码: {events}")
+    assert [event for _, event in events] == ['degraded']
+    assert events[0][0] >= 2.5
+    assert {'printable_ratio', 'replacement_rate'} <= set(monitor.events[-1]['reasons'])
+    
+    # 恢复阈值比进入阈值更严格：少量乱码时既不恢复也不会再次异常
+    mixed = GOOD + b"\xff" * 15
+    assert feed(monitor, mixed, 10, 4.0, 6.0) == []
+    assert monitor.state == 'degraded'
+    events = feed(monitor, GOOD, 10, 6.0, 8.0)
+    print(f"  恢复: {events}")
+    assert [event for _, event in events] == ['recovered']
+    
+    # 冷却时间内不再判定异常
+    events = feed(monitor, GARBAGE, 0, 8.0, 12.0)
+    assert events == [] and monitor.state == 'good'
+    events = feed(monitor, GARBAGE, 0, 12.0, 13.0)
+    assert [event for _, event in events] == ['degraded']
+    
+    print("✓ 异常判定和恢复正确")
+    return True
+
+def test_idle_and_binary():
+    """测试空闲链路和二进制协议"""
+    print("\n=== 空闲链路和二进制协议测试 ===\n")
+    
+    monitor = LinkQualityMonitor(window=1.0, min_bytes=256, degrade_time=0.2)
+    # 数据太少时不做判断
+    assert feed(monitor, GARBAGE[:16], 0, 0.0, 2.0) == []
+    
+    # 二进制协议的数据不可打印，只要能解析出记录就是正常的
+    monitor.reset()
+    binary = bytes(range(256))
+    assert feed(monitor, binary, 8, 0.0, 2.0, text=False) == []
+    assert [event for _, event in feed(monitor, binary, 0, 2.0, 4.0, text=False)] == ['degraded']
+    assert monitor.events[-1]['reasons'] == ['records_per_kb']
+    
+    print("✓ 空闲链路和二进制协议正确")
+    return True
+
+def test_background_redetection():
+    """测试波特率不匹配时自动重新检测"""
+    print("\n=== 自动重新检测测试 ===\n")
+    
+    link = SimulatedLink(57600, byte_rate=20000)
+    restore = link.install()
+    receiver = SerialReceiver("SIM", baudrate=115200, timeout=0.05)
+    receiver.hardware_detection_enabled = False
+    receiver.baud_cache = None
+    receiver.link_monitor = LinkQualityMonitor(window=0.3, min_bytes=256, degrade_time=0.1)
+    receiver.auto_redetect = True  # 默认只对自动检测波特率的连接重新检测
+    events = []
+    receiver.on_link_event = lambda event, info: events.append(event)
+    try:
+        assert receiver.connect() and receiver.start_receiving()
+        deadline = time.time() + 5.0
+        while time.time() < deadline and 'redetected' not in events:
+            time.sleep(0.05)
+        while time.time() < deadline and not receiver.get_metrics()['records_parsed']:
+            time.sleep(0.05)
+        quality = receiver.get_link_quality()
+        metrics = receiver.get_metrics()
+    finally:
+        receiver.disconnect()
+        restore()
+    
+    print(f"  事件: {events}, 打开的波特率: {link.opened}")
+    print(f"  链路质量: {quality['state']}, {quality['bytes_per_s']:.0f} B/s")
+    assert events[:2] == ['degraded', 'redetected']
+    assert receiver.baudrate == 57600 and link.opened[-1] == 57600
+    assert metrics['link_degraded'] == 1 and metrics['redetections'] == 1
+    assert metrics['redetections_failed'] == 0
+    assert [event['event'] for event in quality['events']][:2] == ['degraded', 'redetected']
+    assert quality['events'][1]['stats']['previous_baudrate'] == 115200
+    assert metrics['records_parsed'], "重新连接后应能解析出记录"
+    
+    print("✓ 自动重新检测正确")
+    return True
+
+def test_plain_text_traffic():
+    """测试不是检测数据的文本不会触发重新检测"""
+    print("\n=== 非检测数据文本测试 ===\n")
+    
+    # 从来没有解析出记录时不检查每KB记录数
+    monitor = LinkQualityMonitor()
+    events = feed(monitor, PLAIN, 0, 0.0, 15.0)
+    stats = monitor.snapshot(now=15.0)
+    print(f"  15秒文本: {events}, {stats['records_per_kb']} 条/KB")
+    assert events == [] and monitor.state == 'good'
+    assert stats['records_per_kb'] == 0
+    
+    # 重新连接（reset）后冷却时间仍然有效，不会每隔 degrade_time 就重新检测一次
+    monitor = LinkQualityMonitor(window=1.0, degrade_time=0.5, cooldown=10.0)
+    feed(monitor, GOOD, 10, 0.0, 1.0)
+    assert [event for _, event in feed(monitor, GARBAGE, 0, 1.0, 3.0)] == ['degraded']
+    monitor.reset()
+    assert feed(monitor, GARBAGE, 0, 3.0, 8.0) == [] and monitor.records_seen
+    
+    # 手动指定波特率的连接默认不自动重新检测
+    receiver = SerialReceiver("SIM", protocol='text')
+    receiver.link_monitor = LinkQualityMonitor(window=0.3, min_bytes=256, degrade_time=0.1)
+    start_time = time.time()
+    while time.time() - start_time < 0.5:
+        receiver._process_data(PLAIN)
+        receiver._check_link_quality()
+        time.sleep(0.02)
+    assert receiver.get_metrics()['link_degraded'] == 0, "文本数据不应判定为链路异常"
+    receiver._process_data(GOOD)
+    while time.time() - start_time < 1.0:
+        receiver._process_data(GARBAGE)
+        receiver._check_link_quality()
+        time.sleep(0.02)
+    metrics = receiver.get_metrics()
+    print(f"  手动波特率: 异常 {metrics['link_degraded']} 次, 重新检测线程 {receiver._redetect_thread}")
+    assert metrics['link_degraded'] == 1 and receiver._redetect_thread is None
+    
+    print("✓ 非检测数据文本不会触发重新检测")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("滑动窗口统计", test_window_statistics),
+        ("异常判定和恢复", test_degrade_and_recover),
+        ("空闲链路和二进制", test_idle_and_binary),
+        ("自动重新检测", test_background_redetection),
+        ("非检测数据文本", test_plain_text_traffic),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
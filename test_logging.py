@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+日志测试脚本
+
+此脚本用于测试 log_setup 的日志配置，包括：
+1. 各模块独立的日志级别
+2. 未启用的级别不会格式化参数
+3. 消息在后台线程中格式化和输出
+4. 重复日志限流
+"""
+
+import io
+import sys
+import time
+import logging
+import threading
+from log_setup import setup_logging, set_module_level, shutdown_logging
+
+class FormatProbe:
+    """记录被格式化的次数和所在线程"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.threads = set()
+    
+    def __str__(self):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        return "probe"
+
+def test_levels_and_lazy_format():
+    """测试模块级别、延迟格式化和后台输出"""
+    print("=== 日志级别测试 ===\n")
+    
+    stream = io.StringIO()
+    setup_logging(logging.INFO, module_levels={'serial_receive': logging.WARNING}, stream=stream)
+    try:
+        probe = FormatProbe()
+        logging.getLogger('serial_receive').info("不应输出 %s", probe)
+        logging.getLogger('pic').debug("不应输出 %s", probe)
+        assert probe.calls == 0, "未启用的日志级别不应格式化参数"
+        
+        set_module_level('pic', 'DEBUG')
+        logging.getLogger('pic').debug("绘制 %s", probe)
+        logging.getLogger('gui').info("状态更新")
+    finally:
+        shutdown_logging()
+        set_module_level('serial_receive', logging.NOTSET)
+        set_module_level('pic', logging.NOTSET)
+    
+    output = stream.getvalue()
+    print(output)
+    assert "不应输出" not in output
+    assert "pic: 绘制 probe" in output and "gui: 状态更新" in output
+    # 其他处理器（例如测试框架的日志捕获）可能在调用线程中再次格式化，这里只检查后台线程
+    assert probe.threads - {threading.main_thread().name}, "消息应在后台线程中格式化"
+    
+    print("✓ 日志级别和延迟格式化正确")
+    return True
+
+def test_rate_limit():
+    """测试重复日志限流"""
+    print("\n=== 日志限流测试 ===\n")
+    
+    stream = io.StringIO()
+    setup_logging(logging.INFO, stream=stream, burst=3, interval=0.2)
+    try:
+        logger = logging.getLogger('serial_receive')
+        for i in range(100):
+            logger.warning("坐标超出有效范围: %s", i)
+        logger.info("其他消息")
+        time.sleep(0.25)
+        logger.warning("坐标超出有效范围: %s", 100)
+    finally:
+        shutdown_logging()
+    
+    lines = stream.getvalue().splitlines()
+    print("\n".join(lines))
+    limited = [line for line in lines if "坐标超出有效范围" in line]
+    assert len(limited) == 4, f"限流后应输出4条，实际 {len(limited)} 条"
+    assert "已抑制 97 条相同日志" in limited[-1]
+    assert any("其他消息" in line for line in lines), "不同的日志语句不应互相限流"
+    
+    print("✓ 重复日志限流正确")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("日志级别", test_levels_and_lazy_format),
+        ("日志限流", test_rate_limit),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+目标去重测试脚本
+
+此脚本用于测试 SerialReceiver 对新目标与已有目标的去重处理，包括：
+1. 向量化IoU矩阵与逐对计算的结果一致
+2. 重叠替换策略与原来的逐对比较结果一致
+3. 贪心NMS和按类别NMS策略
+4. 保留数千个历史目标时的更新速度
+5. 基于网格索引的相连框筛选和相邻框合并与两两比较的结果一致
+6. 并查集合并传递相连的竖条状目标
+"""
+
+import sys
+import time
+import random
+import numpy as np
+from serial_receive import SerialReceiver
+from detection import Detection, BoxGridIndex, iou_matrix
+
+def random_detections(rng, count):
+    """生成随机检测目标"""
+    detections = []
+    for _ in range(count):
+        x1 = rng.randint(0, 230)
+        y1 = rng.randint(0, 230)
+        detections.append(Detection(rng.randint(0, 3), rng.randint(30, 99),
+                                    (x1, y1, x1 + rng.randint(1, 25), y1 + rng.randint(1, 25))))
+    return detections
+
+def reference_replace(receiver, existing, new):
+    """原来的逐对比较实现，作为重叠替换策略的参照"""
+    removed = set()
+    for new_obj in new:
+        for i, existing_obj in enumerate(existing):
+            if receiver._calculate_iou(new_obj['bbox'], existing_obj['bbox']) > 0.3:
+                removed.add(i)
+    return [obj for i, obj in enumerate(existing) if i not in removed] + new
+
+def test_iou_matrix():
+    """测试IoU矩阵与逐对计算一致"""
+    print("=== IoU矩阵测试 ===\n")
+    
+    rng = random.Random(42)
+    receiver = SerialReceiver()
+    boxes1 = [d.bbox for d in random_detections(rng, 60)]
+    boxes2 = [d.bbox for d in random_detections(rng, 40)] + [boxes1[0]]
+    
+    matrix = iou_matrix(boxes1, boxes2)
+    expected = np.array([[receiver._calculate_iou(b1, b2) for b2 in boxes2] for b1 in boxes1])
+    assert matrix.shape == (60, 41)
+    assert np.allclose(matrix, expected), "IoU矩阵与逐对计算结果不一致"
+    assert matrix[0, -1] == 1.0
+    assert iou_matrix(boxes1, []).shape == (60, 0)
+    
+    print(f"✓ IoU矩阵正确 ({np.count_nonzero(matrix)} 对框有交集)")
+    return True
+
+def test_replace_policy():
+    """测试默认的重叠替换策略与原实现一致"""
+    print("\n=== 重叠替换策略测试 ===\n")
+    
+    rng = random.Random(7)
+    receiver = SerialReceiver()
+    expected = []
+    for _ in range(50):
+        new = random_detections(rng, rng.randint(1, 6))
+        expected = reference_replace(receiver, expected, new)[-receiver.max_history:]
+        with receiver.data_lock:
+            receiver._update_objects(new)
+        assert receiver.all_objects == expected, "重叠替换结果与原实现不一致"
+        assert receiver.object_data == new
+    
+    print(f"✓ 重叠替换策略结果一致 (保留 {len(receiver.all_objects)} 个目标)")
+    return True
+
+def test_nms_policies():
+    """测试贪心NMS和按类别NMS策略"""
+    print("\n=== NMS策略测试 ===\n")
+    
+    existing = [Detection(0, 90, (10, 10, 50, 50)), Detection(1, 50, (100, 100, 140, 140))]
+    new = [
+        Detection(0, 80, (12, 12, 52, 52)),     # 与置信度更高的已有目标重叠，被抑制
+        Detection(0, 70, (102, 102, 142, 142)),  # 类别不同但重叠，置信度更高
+        Detection(2, 60, (200, 200, 220, 220)),
+    ]
+    
+    receiver = SerialReceiver()
+    receiver.suppression_policy = 'nms'
+    receiver.all_objects = list(existing)
+    with receiver.data_lock:
+        receiver._update_objects(list(new))
+    assert receiver.all_objects == [existing[0], new[1], new[2]], f"NMS结果错误: {receiver.all_objects}"
+    
+    receiver = SerialReceiver()
+    receiver.suppression_policy = 'class_nms'
+    receiver.all_objects = list(existing)
+    with receiver.data_lock:
+        receiver._update_objects(list(new))
+    assert receiver.all_objects == existing + [new[1], new[2]], f"按类别NMS结果错误: {receiver.all_objects}"
+    
+    # 同分时保留新目标
+    receiver.suppression_policy = 'nms'
+    receiver.all_objects = [Detection(0, 60, (200, 200, 220, 220))]
+    with receiver.data_lock:
+        receiver._update_objects([Detection(1, 60, (201, 201, 221, 221))])
+    assert receiver.all_objects == [Detection(1, 60, (201, 201, 221, 221))]
+    
+    print("✓ NMS策略正确")
+    return True
+
+def test_large_history():
+    """测试保留数千个历史目标时的更新速度"""
+    print("\n=== 大量历史目标测试 ===\n")
+    
+    rng = random.Random(99)
+    receiver = SerialReceiver()
+    receiver.max_history = 5000
+    receiver.all_objects = random_detections(rng, 5000)
+    
+    start_time = time.perf_counter()
+    updates = 20
+    for _ in range(updates):
+        with receiver.data_lock:
+            receiver._update_objects(random_detections(rng, 10))
+    elapsed_ms = (time.perf_counter() - start_time) * 1000 / updates
+    
+    print(f"  每次更新耗时: {elapsed_ms:.2f} ms (历史目标 {len(receiver.all_objects)} 个)")
+    assert len(receiver.all_objects) <= receiver.max_history
+    
+    print("✓ 大量历史目标更新正常")
+    return True
+
+def reference_filter(objects):
+    """原来两两比较的垂直相连框筛选，作为网格索引实现的参照"""
+    objects = sorted(objects, key=lambda obj: (obj['bbox'][0], obj['bbox'][1]))
+    to_remove = set()
+    for i in range(len(objects)):
+        if i in to_remove:
+            continue
+        for j in range(i + 1, len(objects)):
+            if j in to_remove:
+                continue
+            x1_min, y1_min, x1_max, y1_max = objects[i]['bbox']
+            x2_min, y2_min, x2_max, y2_max = objects[j]['bbox']
+            if (x1_min == x2_min and x1_max == x2_max and
+                    (abs(y1_max - y2_min) <= 1 or abs(y2_max - y1_min) <= 1)):
+                if y1_max < y2_max:
+                    to_remove.add(i)
+                    break
+                to_remove.add(j)
+    return [obj for i, obj in enumerate(objects) if i not in to_remove]
+
+def reference_merge(receiver, objects, is_adjacent):
+    """两两比较并逐步扩展连通分量的相邻框合并，作为并查集实现的参照"""
+    n = len(objects)
+    visited = [False] * n
+    merged_objects = []
+    for i in range(n):
+        if visited[i]:
+            continue
+        group = [i]
+        visited[i] = True
+        for current in group:
+            for j in range(n):
+                if (not visited[j] and objects[current]['class'] == objects[j]['class'] and
+                        is_adjacent(objects[current]['bbox'], objects[j]['bbox'])):
+                    visited[j] = True
+                    group.append(j)
+        if len(group) == 1:
+            merged_objects.append(objects[i])
+        else:
+            group.sort()
+            merged_objects.append(Detection(objects[group[0]]['class'], max(objects[j]['score'] for j in group),
+                                            receiver._merge_boxes([objects[j]['bbox'] for j in group])))
+    return merged_objects
+
+def strip_detections(rng, count):
+    """生成容易垂直相连的竖条状目标"""
+    detections = []
+    for _ in range(count):
+        x1 = rng.choice([10, 40, 70, 100])
+        y1 = rng.randint(0, 200)
+        detections.append(Detection(rng.randint(0, 1), rng.randint(30, 99),
+                                    (x1, y1, x1 + rng.choice([20, 25]), y1 + rng.randint(1, 40))))
+    return detections
+
+def test_grid_index():
+    """测试网格索引以及基于网格索引的筛选和合并"""
+    print("\n=== 网格索引测试 ===\n")
+    
+    index = BoxGridIndex.from_boxes([(0, 0, 10, 10), (30, 30, 40, 40), (200, 200, 255, 255)])
+    assert 0 in index.query((11, 11, 20, 20), margin=1)  # 查询结果是包含所有近邻的候选集合
+    assert 2 not in index.query((11, 11, 20, 20), margin=1)
+    assert index.query((5, 5, 35, 35)) == {0, 1}
+    index.remove(1)
+    assert 1 not in index and index.query((30, 30, 40, 40)) == set()
+    
+    rng = random.Random(2024)
+    receiver = SerialReceiver()
+    for trial in range(30):
+        objects = strip_detections(rng, rng.randint(2, 60)) + random_detections(rng, 10)
+        assert receiver._filter_vertically_connected_boxes(list(objects)) == reference_filter(objects), \
+            "网格索引筛选结果与两两比较不一致"
+        assert receiver._merge_adjacent_boxes(objects) == reference_merge(receiver, objects, receiver._is_box_adjacent), \
+            "并查集合并结果与两两比较不一致"
+        assert (receiver._merge_connected_objects(objects, 'vertical') ==
+                reference_merge(receiver, objects, receiver._is_vertically_adjacent))
+    
+    # 候选目标按在 all_objects 中的顺序返回，与对象的内存地址无关
+    objects = [Detection(0, 80, (10 + i, 10, 40 + i, 40)) for i in range(20)]
+    rng.shuffle(objects)
+    receiver.all_objects = list(objects)
+    with receiver.data_lock:
+        candidates = receiver._find_overlap_candidates([Detection(0, 80, (15, 10, 45, 40))])
+        assert candidates == objects
+        receiver._update_objects([Detection(1, 10, (200, 200, 210, 210))])
+        receiver.all_objects = objects[1:] + objects[:1]  # 在其他地方替换后重新建立索引
+        assert receiver._find_overlap_candidates([Detection(0, 80, (15, 10, 45, 40))]) == objects[1:] + objects[:1]
+    
+    print("✓ 网格索引结果与两两比较一致")
+    return True
+
+def test_strip_merge():
+    """测试并查集合并传递相连的竖条状目标"""
+    print("\n=== 竖条目标合并测试 ===\n")
+    
+    # 传感器把一个目标分成多段竖条输出，相邻竖条首尾相接
+    strips = [Detection(1, 50 + i % 40, (40, i * 5, 60, i * 5 + 5)) for i in range(50)]
+    strips.append(Detection(2, 90, (100, 0, 120, 20)))
+    
+    receiver = SerialReceiver()
+    receiver.merge_rule = 'vertical'
+    with receiver.data_lock:
+        receiver._update_objects(list(reversed(strips[:-1])) + strips[-1:])
+    
+    assert len(receiver.object_data) == 2, f"竖条应合并为一个目标: {receiver.object_data}"
+    assert receiver.object_data[0] == Detection(1, 89, (40, 0, 60, 250))
+    assert receiver.object_data[1] == strips[-1]
+    
+    # 默认不合并
+    receiver = SerialReceiver()
+    with receiver.data_lock:
+        receiver._update_objects(list(strips))
+    assert len(receiver.object_data) == len(strips)
+    
+    print(f"✓ {len(strips) - 1} 段竖条合并为 {receiver._merge_boxes([s.bbox for s in strips[:-1]])}")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("IoU矩阵", test_iou_matrix),
+        ("重叠替换策略", test_replace_policy),
+        ("NMS策略", test_nms_policies),
+        ("大量历史目标", test_large_history),
+        ("网格索引", test_grid_index),
+        ("竖条目标合并", test_strip_merge),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
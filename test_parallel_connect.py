@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+并行连接测试脚本
+
+此脚本使用模拟的设备链路测试 MultiPortManager 的并行检测和连接，包括：
+1. 多个端口同时检测波特率，总耗时取决于最慢的端口
+2. 每个端口完成时立即返回结果
+3. 总超时后取消未完成的检测，超时之后才连接成功的端口按失败处理
+4. 在其他线程中取消正在进行的连接
+"""
+
+import sys
+import time
+from threading import Timer
+from mock_serial import SimulatedLink
+from serial_receive import MultiPortManager
+
+def create_manager(port_paths):
+    """创建管理器，每个串口路径一个自动检测波特率的端口（不使用硬件检测和波特率缓存）"""
+    manager = MultiPortManager(max_ports=len(port_paths))
+    for i, port_path in enumerate(port_paths):
+        manager.add_port(f"port{i + 1}", port_path, auto_detect=True)
+    for receiver in manager.receivers.values():
+        receiver.hardware_detection_enabled = False
+        receiver.baud_cache = None
+    return manager
+
+def timed_connect(manager, **options):
+    """连接所有端口，返回 (结果, 耗时)"""
+    start_time = time.time()
+    results = manager.connect_all_ports(**options)
+    return results, time.time() - start_time
+
+def test_parallel_detection():
+    """测试多个端口同时检测"""
+    print("=== 并行检测测试 ===\n")
+    
+    link = SimulatedLink(57600)
+    restore = link.install()
+    try:
+        single, single_time = timed_connect(create_manager(["SIM0"]))
+        manager = create_manager([f"SIM{i}" for i in range(4)])
+        results, parallel_time = timed_connect(manager)
+    finally:
+        restore()
+    
+    print(f"  1个端口: {single_time:.2f}s, 4个端口: {parallel_time:.2f}s")
+    assert single == {'port1': True}
+    assert all(results.values()) and len(results) == 4
+    assert all(config['baudrate'] == 57600 for config in manager.port_configs.values())
+    assert parallel_time < single_time * 2, "并行连接的耗时应接近单个端口"
+    manager.disconnect_all_ports()
+    
+    print("✓ 并行检测正确")
+    return True
+
+def test_streaming_results():
+    """测试按完成顺序返回结果"""
+    print("\n=== 结果流测试 ===\n")
+    
+    link = SimulatedLink(115200, port_baudrates={"SLOW": 1200})
+    restore = link.install()
+    try:
+        manager = create_manager(["SLOW", "FAST"])
+        start_time = time.time()
+        arrivals = []
+        for port_name, success in manager.iter_connect_ports():
+            arrivals.append((port_name, success, time.time() - start_time))
+    finally:
+        restore()
+    
+    for port_name, success, elapsed in arrivals:
+        print(f"  {port_name}: {success} ({elapsed:.2f}s)")
+    assert [(name, success) for name, success, _ in arrivals] == [('port2', True), ('port1', True)]
+    assert arrivals[0][2] < arrivals[1][2] / 2, "快速的端口应先返回结果"
+    assert manager.port_configs['port1']['baudrate'] == 1200
+    manager.disconnect_all_ports()
+    
+    print("✓ 结果流正确")
+    return True
+
+def test_timeout_and_cancel():
+    """测试总超时和取消"""
+    print("\n=== 超时和取消测试 ===\n")
+    
+    # SILENT 端口上没有设备发送数据，完整检测需要 20 个波特率 x 2 秒
+    link = SimulatedLink(115200, port_baudrates={"SILENT": None})
+    restore = link.install()
+    try:
+        manager = create_manager(["SILENT", "LIVE"])
+        results, elapsed = timed_connect(manager, timeout=0.5)
+        print(f"  超时: {results}, 耗时 {elapsed:.2f}s")
+        assert results == {'port1': False, 'port2': True}
+        assert elapsed < 1.5, f"超时后应尽快返回，实际耗时 {elapsed:.2f}s"
+        assert not manager.port_configs['port1']['connected']
+        assert all(receiver.cancel_event is None for receiver in manager.receivers.values())
+        
+        manager = create_manager(["SILENT"])
+        Timer(0.3, manager.cancel_connect).start()
+        results, elapsed = timed_connect(manager)
+        print(f"  取消: {results}, 耗时 {elapsed:.2f}s")
+        assert results == {'port1': False} and elapsed < 1.5
+        
+        # 不响应取消的端口在超时之后才连接成功，仍按失败返回并断开连接
+        manager = MultiPortManager()
+        manager.add_port("port1", "LIVE", baudrate=115200)
+        connect_port = manager.connect_port
+        manager.connect_port = lambda port_name: time.sleep(0.4) or connect_port(port_name)
+        results = list(manager.iter_connect_ports(timeout=0.1))
+        print(f"  超时后才连接成功: {results}")
+        assert results == [('port1', False)]
+        assert not manager.port_configs['port1']['connected']
+        assert manager.receivers['port1'].serial is None or not manager.receivers['port1'].serial.is_open
+    finally:
+        restore()
+    
+    print("✓ 超时和取消正确")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("并行检测", test_parallel_detection),
+        ("结果流", test_streaming_results),
+        ("超时和取消", test_timeout_and_cancel),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+接收线程测试脚本
+
+此脚本使用模拟串口测试 SerialReceiver 的接收线程，包括：
+1. 阻塞读取模式下数据到达后立即被处理
+2. 空闲时不占用CPU
+3. 断开连接时线程能及时退出
+4. 环形缓冲区的回绕、溢出和零拷贝读取
+5. 运行统计计数和多端口汇总，多个线程更新时不加锁，锁的持有时间抽样记录
+6. 从串口读取到绘制的端到端延迟追踪
+7. 缓冲区已满时的各种处理策略和丢弃统计，解码期间丢弃数据不需要等待处理线程
+8. 只解析最新的完整记录（帧）的低延迟模式
+"""
+
+import sys
+import io
+import json
+import time
+from threading import Thread, Event
+from mock_serial import MockSerial
+from pic import ImageProcessor
+from metrics import LatencyTracer, Metrics, TimedLock
+from serial_receive import SerialReceiver, ByteRingBuffer, BinaryFrameDecoder, MultiPortManager
+
+RECORD = b"class:1\nscore:85\nbbox:50\nbbox:60\nbbox:100\nbbox:120\n"
+
+def create_receiver(receive_mode='blocking'):
+    """创建一个连接到模拟串口的接收器"""
+    receiver = SerialReceiver()
+    receiver.receive_mode = receive_mode
+    mock_serial = MockSerial("MOCK_RECEIVE", 115200)
+    mock_serial.open()
+    receiver.serial = mock_serial
+    receiver.start_receiving()
+    return receiver, mock_serial
+
+def wait_for_objects(receiver, timeout=2.0):
+    """等待接收器解析出目标"""
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        if receiver.get_all_objects():
+            return True
+        time.sleep(0.001)
+    return False
+
+def test_blocking_wakeup():
+    """测试阻塞读取模式下数据到达后立即被处理"""
+    print("=== 阻塞读取唤醒测试 ===\n")
+
+    for receive_mode in ['blocking', 'polling']:
+        receiver, mock_serial = create_receiver(receive_mode)
+
+        start_time = time.perf_counter()
+        mock_serial.add_data(RECORD)
+        assert wait_for_objects(receiver), f"{receive_mode} 模式下未解析到目标"
+        latency_ms = (time.perf_counter() - start_time) * 1000
+
+        receiver.disconnect()
+        print(f"  {receive_mode}: 延迟 {latency_ms:.2f} ms")
+        assert latency_ms < 100
+
+    print("✓ 数据到达后被及时处理")
+    return True
+
+def test_idle_cpu_and_stop():
+    """测试空闲时的CPU占用以及断开连接时线程及时退出"""
+    print("\n=== 空闲CPU和停止测试 ===\n")
+
+    receiver, mock_serial = create_receiver('blocking')
+    time.sleep(0.2)
+
+    cpu_start = time.process_time()
+    time.sleep(1.0)
+    idle_cpu = time.process_time() - cpu_start
+    print(f"  空闲1秒的CPU时间: {idle_cpu * 1000:.1f} ms")
+    assert idle_cpu < 0.1, "空闲时不应持续轮询"
+
+    threads = list(receiver.threads)
+    start_time = time.perf_counter()
+    receiver.disconnect()
+    stop_ms = (time.perf_counter() - start_time) * 1000
+    print(f"  停止耗时: {stop_ms:.1f} ms")
+
+    assert not any(thread.is_alive() for thread in threads), "断开连接后线程应已退出"
+    assert stop_ms < 500
+
+    print("✓ 空闲时不占用CPU，线程能及时退出")
+    return True
+
+def test_ring_buffer():
+    """测试环形缓冲区的回绕、溢出和通过接收器解码"""
+    print("\n=== 环形缓冲区测试 ===\n")
+    
+    ring = ByteRingBuffer(8)  # 实际分配16字节
+    assert ring.write(b"abcdefgh") == 8
+    ring.consume(8)
+    assert ring.write(b"ijklmnop") == 8
+    ring.consume(4)
+    assert ring.write(b"qrst") == 4  # 跨越缓冲区末尾
+    segments = ring.peek()
+    assert len(segments) == 2, "跨越末尾的数据应分为两个片段"
+    assert all(isinstance(segment, memoryview) for segment in segments)
+    assert b"".join(segments) == b"mnopqrst"
+    
+    assert ring.write(b"xyz") == 0, "缓冲区已满时不应写入"
+    assert ring.dropped_bytes == 3
+    ring.consume(len(ring))
+    assert len(ring) == 0 and ring.peek() == []
+    
+    # take 取出的数据在 release 之前不会被新数据或 discard 覆盖
+    assert ring.write(b"ABCDEFGH") == 8
+    taken = ring.take()
+    assert ring.free == 8, "取出数据后即可写入新数据"
+    assert ring.write(b"12345678") == 8
+    assert ring.discard(4) == 4 and ring.free == 0, "正在解码的数据仍占用空间"
+    assert ring.write(b"9") == 0
+    assert b"".join(taken) == b"ABCDEFGH"
+    ring.release()
+    assert ring.free == 8 - len(ring) == 4
+    assert b"".join(ring.peek()) == b"5678"
+    
+    # 通过接收器解码回绕的数据片段
+    receiver = SerialReceiver(buffer_size=64)
+    stream = RECORD * 4
+    for i in range(0, len(stream), 40):
+        assert receiver.ring_buffer.write(stream[i:i + 40]) == len(stream[i:i + 40])
+        with receiver.process_lock:
+            segments = receiver.ring_buffer.peek()
+            for segment in segments:
+                receiver._feed_data(segment)
+            receiver.ring_buffer.consume(sum(len(segment) for segment in segments))
+    with receiver.process_lock:
+        receiver._reprocess_buffer()
+    
+    assert receiver.received_total == len(stream)
+    assert receiver.all_objects[-1]['bbox'] == (50, 60, 100, 120)
+    print(f"  解码 {receiver.received_total} 字节, 丢弃 {receiver.ring_buffer.dropped_bytes} 字节")
+    
+    print("✓ 环形缓冲区工作正常")
+    return True
+
+def test_metrics():
+    """测试运行统计计数和多端口汇总"""
+    print("\n=== 运行统计测试 ===\n")
+    
+    receiver, mock_serial = create_receiver('blocking')
+    bad_record = b"class:2\nscore:70\nbbox:50\nbbox:60\nbbox:300\nbbox:120\n"
+    mock_serial.add_data(RECORD + bad_record)
+    assert wait_for_objects(receiver), "未解析到目标"
+    time.sleep(0.2)  # 等待空闲时输出最后一条记录
+    receiver.disconnect()
+    
+    metrics = receiver.get_metrics()
+    print(f"  {metrics}")
+    assert metrics['bytes_read'] == len(RECORD + bad_record)
+    assert metrics['read_calls'] >= 1 and metrics['chunks_queued'] >= 1
+    assert metrics['chunks_dropped'] == 0
+    assert metrics['buffer_high_water'] > 0
+    assert metrics['records_parsed'] == 2 and metrics['records_rejected'] == 1
+    assert metrics['parse_time']['count'] >= 1
+    assert metrics['lock_hold_time']['count'] >= 1, "第一次持有锁时总是记录持有时间"
+    assert metrics['lock_hold_time']['p99'] <= metrics['lock_hold_time']['max']
+    
+    # 缓冲区已满时统计丢弃的数据
+    small = SerialReceiver(buffer_size=16)
+    mock_serial = MockSerial("MOCK_FULL", 115200)
+    mock_serial.open()
+    small.serial = mock_serial
+    small.ring_buffer.write(b"x" * 10)
+    mock_serial.add_data(RECORD)
+    small.start_receiving()
+    deadline = time.time() + 2.0
+    while small.get_metrics()['bytes_read'] < len(RECORD) and time.time() < deadline:
+        time.sleep(0.01)
+    small.disconnect()
+    assert small.get_metrics()['chunks_dropped'] >= 1
+    assert small.get_metrics()['bytes_dropped'] > 0
+    
+    # 多端口汇总
+    manager = MultiPortManager()
+    manager.receivers = {'a': receiver, 'b': small}
+    combined = manager.get_combined_metrics()
+    assert combined['bytes_read'] == metrics['bytes_read'] + small.get_metrics()['bytes_read']
+    assert combined['buffer_high_water'] == max(metrics['buffer_high_water'], small.get_metrics()['buffer_high_water'])
+    assert combined['parse_time']['count'] == metrics['parse_time']['count'] + small.get_metrics()['parse_time']['count']
+    
+    # 获取目标时只在复制列表期间持有 data_lock，相连框筛选在锁外进行
+    held = []
+    filter_boxes = receiver._filter_vertically_connected_boxes
+    receiver._filter_vertically_connected_boxes = lambda objects: held.append(receiver.data_lock.locked()) or filter_boxes(objects)
+    assert receiver.get_all_objects() and receiver.get_detected_objects() is not None
+    assert held == [False, False], "筛选时不应持有 data_lock"
+    
+    receiver.reset_metrics()
+    assert receiver.get_metrics()['bytes_read'] == 0
+    
+    # 各线程分别计数，快照时汇总
+    counts = Metrics(['events'], ['hold'])
+    
+    def count_events():
+        for _ in range(1000):
+            counts.increment('events')
+        counts.set_max('peak', 5)
+    
+    threads = [Thread(target=count_events) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counts.set_max('peak', 3)
+    snapshot = counts.snapshot()
+    assert snapshot['events'] == 4000 and snapshot['peak'] == 5, f"多线程计数汇总错误: {snapshot}"
+    
+    # 锁的持有时间每 sample_interval 次记录一次
+    lock = TimedLock(counts, 'hold', sample_interval=8)
+    for _ in range(20):
+        with lock:
+            pass
+    assert counts.snapshot()['hold']['count'] == 3
+    
+    print("✓ 运行统计正确")
+    return True
+
+def test_latency_tracing():
+    """测试从串口读取到绘制的端到端延迟追踪"""
+    print("\n=== 延迟追踪测试 ===\n")
+    
+    # 根据数据块读取时间和波特率估算记录到达时间
+    receiver = SerialReceiver(baudrate=10000)  # 每字节1ms
+    assert receiver._estimate_record_times(4, 0, 200, [(100, 10.0), (200, 11.0)]) is None, "默认不追踪延迟"
+    receiver.latency_tracer = LatencyTracer()
+    arrived, read = receiver._estimate_record_times(4, 0, 200, [(100, 10.0), (200, 11.0)])
+    assert read.tolist() == [10.0, 10.0, 11.0, 11.0]
+    assert [round(t, 6) for t in arrived.tolist()] == [9.95, 10.0, 10.95, 11.0]
+    
+    tracer = LatencyTracer()
+    receiver, mock_serial = create_receiver('blocking')
+    receiver.latency_tracer = tracer
+    processor = ImageProcessor()
+    processor.latency_tracer = tracer
+    
+    mock_serial.add_data(RECORD)
+    assert wait_for_objects(receiver), "未解析到目标"
+    objects = receiver.get_all_objects()
+    processor.draw_boxes(objects)
+    processor.draw_boxes(objects)  # 重复绘制不重复统计
+    receiver.disconnect()
+    
+    trace = objects[0].trace
+    assert list(trace) == ['arrived', 'read', 'parsed', 'fetched', 'drawn']
+    times = list(trace.values())
+    assert times == sorted(times), f"各阶段时间应递增: {trace}"
+    assert objects[0].with_source('port1').trace is trace
+    
+    summary = tracer.summary()
+    for name in ['arrived->read', 'read->parsed', 'parsed->fetched', 'fetched->drawn', 'total']:
+        assert summary[name]['count'] == 1, f"{name} 应统计1次: {summary}"
+    assert summary['total']['max'] < 1.0
+    
+    stream = io.StringIO()
+    tracer.dump(stream)
+    assert json.loads(stream.getvalue()).keys() == summary.keys()
+    for name, stats in summary.items():
+        print(f"  {name}: p50 {stats['p50'] * 1000:.3f} ms")
+    
+    print("✓ 延迟追踪正确")
+    return True
+
+def enqueue_and_process(receiver, chunks):
+    """依次写入数据块，最后解码缓冲区中的全部数据并输出最后一条记录"""
+    for chunk in chunks:
+        receiver._enqueue(chunk, time.perf_counter())
+    receiver._process_ring_buffer()
+    receiver._process_ring_buffer()
+    return receiver.get_drop_stats(), receiver.get_metrics()['records_parsed']
+
+def test_backpressure():
+    """测试缓冲区已满时的各种处理策略和丢弃统计"""
+    print("\n=== 缓冲区满处理策略测试 ===\n")
+    
+    # 每个策略: (写入的数据块, 丢弃的字节数, 丢弃的记录数, 解析出的记录数)
+    half = len(RECORD) // 2
+    cases = {
+        'drop_newest': ([RECORD, RECORD, RECORD], len(RECORD), 1, 2),
+        'drop_oldest': ([RECORD, RECORD, RECORD], 3 * len(RECORD) - 128, 1, 2),
+        'coalesce': ([RECORD, RECORD, RECORD], 2 * len(RECORD), 2, 1),
+    }
+    for policy, (chunks, bytes_dropped, records_dropped, parsed) in cases.items():
+        receiver = SerialReceiver(buffer_size=128, protocol='text')
+        receiver.backpressure_policy = policy
+        events = []
+        receiver.on_drop_change = lambda dropping, stats: events.append((dropping, stats['records_dropped']))
+        
+        stats, records_parsed = enqueue_and_process(receiver, chunks)
+        print(f"  {policy}: {stats}, 解析 {records_parsed} 条")
+        assert stats['bytes_dropped'] == bytes_dropped, f"{policy} 丢弃字节数错误"
+        assert stats['records_dropped'] == records_dropped, f"{policy} 丢弃记录数错误"
+        assert records_parsed == parsed, f"{policy} 解析记录数错误"
+        assert events == [(True, records_dropped)], f"{policy} 回调错误: {events}"
+        
+        stats, _ = enqueue_and_process(receiver, [RECORD])
+        assert events[-1] == (False, records_dropped) and not stats['dropping']
+        assert stats['drop_episodes'] == 1
+    
+    # 丢弃的新数据块之前未完成的记录也计入丢弃数
+    receiver = SerialReceiver(buffer_size=128, protocol='text')
+    receiver.backpressure_policy = 'drop_newest'
+    stats, records_parsed = enqueue_and_process(receiver, [RECORD[:half], RECORD[half:] + RECORD * 2, RECORD])
+    assert stats['records_dropped'] == 3 and records_parsed == 1, f"未完成记录统计错误: {stats}"
+    
+    # 数据块与记录边界错开时，起始标记会被切分到相邻的数据块中，每条记录仍然恰好统计一次
+    streams = {
+        'text': (RECORD * 100, 100),
+        'auto': (b"".join(BinaryFrameDecoder.encode([(1, 85, 50, 60, 100, 120)] * 3) for _ in range(40)), 120),
+    }
+    for protocol, (stream, sent) in streams.items():
+        for policy in ('drop_newest', 'drop_oldest', 'coalesce'):
+            receiver = SerialReceiver(buffer_size=128, protocol=protocol)
+            receiver.backpressure_policy = policy
+            position = 0
+            for i, size in enumerate([52, 30, 77] * len(stream)):
+                if position >= len(stream):
+                    break
+                receiver._enqueue(stream[position:position + size], time.perf_counter())
+                position += size
+                if i % 4 == 3:
+                    receiver._process_ring_buffer()
+            stats, records_parsed = enqueue_and_process(receiver, [])
+            print(f"  错位数据块 {protocol}/{policy}: 解析 {records_parsed} 条, 丢弃 {stats['records_dropped']} 条")
+            assert stats['records_dropped'] > 0
+            assert records_parsed + stats['records_dropped'] == sent, f"{protocol}/{policy} 丢弃记录数错误: {stats}"
+    
+    # 解码期间不持有 data_lock：接收线程丢弃旧数据、界面读取目标都不需要等待解码完成，
+    # 正在解码的数据也不会被新数据覆盖
+    receiver = SerialReceiver(buffer_size=128, protocol='text')
+    decoding, resume = Event(), Event()
+    feed = receiver.decoder.feed
+    
+    def slow_feed(data):
+        decoding.set()
+        resume.wait(2.0)
+        return feed(data)
+    
+    receiver.decoder.feed = slow_feed
+    receiver._enqueue(RECORD * 2, time.perf_counter())
+    worker = Thread(target=receiver._process_ring_buffer)
+    worker.start()
+    assert decoding.wait(2.0)
+    start_time = time.perf_counter()
+    for _ in range(3):
+        receiver._enqueue(RECORD * 2, time.perf_counter())
+    receiver.get_detected_objects()
+    elapsed = time.perf_counter() - start_time
+    resume.set()
+    worker.join()
+    stats, records_parsed = enqueue_and_process(receiver, [])
+    print(f"  解码期间写入: 耗时 {elapsed * 1000:.1f} ms, 解析 {records_parsed} 条, 丢弃 {stats['records_dropped']} 条")
+    assert elapsed < 0.5, "丢弃数据和读取目标不应等待解码完成"
+    assert records_parsed >= 2 and records_parsed + stats['records_dropped'] == 8, f"解码期间丢弃统计错误: {stats}"
+    
+    # block 策略不丢弃数据，接收线程等待处理线程腾出空间
+    receiver = SerialReceiver(buffer_size=128, protocol='text')
+    receiver.backpressure_policy = 'block'
+    receiver._enqueue(RECORD * 2, time.perf_counter())
+    writer = Thread(target=receiver._enqueue, args=(RECORD * 3, time.perf_counter()))
+    writer.start()
+    deadline = time.time() + 2.0
+    while (writer.is_alive() or len(receiver.ring_buffer)) and time.time() < deadline:
+        receiver._process_ring_buffer()
+        time.sleep(0.01)
+    writer.join()
+    receiver._process_ring_buffer()
+    metrics = receiver.get_metrics()
+    assert metrics['records_parsed'] == 5 and metrics['bytes_dropped'] == 0, f"block 策略错误: {metrics}"
+    assert metrics['blocked_time_us'] > 0
+    
+    print("✓ 缓冲区满处理策略和丢弃统计正确")
+    return True
+
+def make_record(class_id, x1):
+    """生成一条文本记录"""
+    return f"class:{class_id}\nscore:80\nbbox:{x1}\nbbox:10\nbbox:{x1 + 20}\nbbox:30\n".encode('ascii')
+
+def test_latest_only():
+    """测试只解析最新数据块的低延迟模式"""
+    print("\n=== 最新帧模式测试 ===\n")
+    
+    frames = [make_record(i % 6, i * 10) + make_record(i % 6, i * 10 + 5) for i in range(5)]
+    
+    for latest_only in [False, True]:
+        receiver = SerialReceiver(protocol='text')
+        receiver.latest_only = latest_only
+        receiver.max_history = 100
+        # 处理线程落后：5帧（每帧一个数据块）积压在缓冲区中
+        for frame in frames:
+            receiver._enqueue(frame, time.perf_counter())
+        receiver._process_ring_buffer()
+        receiver._process_ring_buffer()
+        
+        metrics = receiver.get_metrics()
+        boxes = [obj['bbox'][0] for obj in receiver.all_objects]
+        print(f"  latest_only={latest_only}: 目标 {boxes}, 跳过 {metrics['frames_skipped']} 帧 "
+              f"{metrics['records_skipped']} 条记录")
+        if latest_only:
+            assert boxes == [40, 45], "只应解析最新的一帧"
+            assert metrics['frames_skipped'] == 4 and metrics['records_skipped'] == 8
+            assert metrics['bytes_skipped'] == sum(len(frame) for frame in frames[:-1])
+        else:
+            assert len(boxes) == 10 and metrics['frames_skipped'] == 0
+        assert receiver.received_total == sum(len(frame) for frame in frames), "跳过的数据仍应计入接收总数"
+    
+    # 只有一帧积压时正常解析
+    receiver = SerialReceiver(protocol='text')
+    receiver.latest_only = True
+    receiver._enqueue(frames[0], time.perf_counter())
+    receiver._process_ring_buffer()
+    receiver._process_ring_buffer()
+    assert len(receiver.all_objects) == 2 and receiver.get_metrics()['frames_skipped'] == 0
+    
+    # 数据块的边界不是记录的边界：跳到最新数据块起始处所在的记录，最新的完整记录一定会被解析
+    stream = b"".join(make_record(i % 6, i * 10) for i in range(20))
+    for sizes, cut in [([20, 40, 60], 0), ([20, 40, 60], 17), ([200], 17), ([52, 30, 77], 0)]:
+        receiver = SerialReceiver(protocol='text')
+        receiver.latest_only = True
+        receiver.max_history = 100
+        data = stream[:len(stream) - cut]  # cut 不为0时最后一条记录还没有收完
+        position = 0
+        for i, size in enumerate(sizes * len(data)):
+            if position >= len(data):
+                break
+            receiver._enqueue(data[position:position + size], time.perf_counter())
+            position += size
+        receiver._process_ring_buffer()
+        receiver._process_ring_buffer()
+        
+        metrics = receiver.get_metrics()
+        boxes = [obj['bbox'][0] for obj in receiver.all_objects]
+        newest = 180 if cut else 190
+        print(f"  数据块 {sizes}: 目标 {boxes}, 跳过 {metrics['records_skipped']} 条记录")
+        assert boxes and boxes[-1] == newest, f"{sizes} 应解析出最新的完整记录"
+        # 没有收完的最后一条记录在链路空闲时被丢弃，不计入跳过的记录
+        assert metrics['records_skipped'] + metrics['records_parsed'] == (19 if cut else 20)
+        assert metrics['records_skipped'] > 0
+    
+    # 按分隔符分帧时跳到最新的完整帧
+    stream = b"".join(frame + b"END\n" for frame in frames)
+    receiver = SerialReceiver(protocol='text')
+    receiver.latest_only = True
+    receiver.set_frame_mode('delimiter', delimiter=b'END\n')
+    for i in range(0, len(stream) - 30, 30):
+        receiver._enqueue(stream[i:i + 30], time.perf_counter())
+    receiver._process_ring_buffer()
+    receiver._process_ring_buffer()
+    frame = receiver.get_current_frame()
+    assert frame and frame.complete and [obj['bbox'][0] for obj in frame.detections] == [30, 35], f"最新的完整帧错误: {frame}"
+    assert receiver.get_metrics()['records_skipped'] == 6
+    
+    print("✓ 最新帧模式正确")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("阻塞读取唤醒", test_blocking_wakeup),
+        ("空闲CPU和停止", test_idle_cpu_and_stop),
+        ("环形缓冲区", test_ring_buffer),
+        ("运行统计", test_metrics),
+        ("延迟追踪", test_latency_tracing),
+        ("缓冲区满处理策略", test_backpressure),
+        ("最新帧模式", test_latest_only),
+    ]
+
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+流式解析测试脚本
+
+此脚本用于测试 SerialReceiver 的增量解析功能，包括：
+1. 数据被任意切分成小块时仍能正确解析
+2. 已解析的数据不会被重复输出
+3. 解码器只保留未完成的记录
+4. 字节级解码器与原正则表达式解析结果一致
+5. 二进制帧解码和文本/二进制协议自动识别
+6. 批量解析为结构化数组的结果与逐条处理一致
+7. 检测目标使用 Detection 对象，兼容原有的字典访问方式
+8. 位数过多的数值只使所在的记录无效，不影响同一数据块中的其他记录
+9. 解码器直接解码 memoryview 输入，只复制末尾未完成的记录
+"""
+
+import sys
+import re
+import random
+import numpy as np
+from serial_receive import SerialReceiver, MultiPortManager, TextRecordDecoder, BinaryFrameDecoder, parse_detections
+from detection import Detection, detections_to_array, detections_from_array
+from box import BoxProcessor
+from pic import ImageProcessor
+
+RECORD = "class:{}\nscore:{}\nbbox:{}\nbbox:{}\nbbox:{}\nbbox:{}\n"
+
+def make_stream(count):
+    """生成包含count个互不重叠目标的数据流"""
+    parts = []
+    for i in range(count):
+        x = (i % 8) * 30
+        y = (i // 8) * 30
+        parts.append(RECORD.format(i % 6, 60 + i % 40, x, y, x + 20, y + 20))
+    return "".join(parts)
+
+def test_chunked_stream():
+    """测试数据被切分成任意大小的块时的解析结果"""
+    print("=== 分块数据解析测试 ===\n")
+    
+    stream = make_stream(8)
+    
+    for chunk_size in [1, 3, 7, 50, len(stream)]:
+        receiver = SerialReceiver()
+        parsed = 0
+        for i in range(0, len(stream), chunk_size):
+            receiver._process_data(stream[i:i + chunk_size])
+            if receiver.has_new_data():
+                parsed += len(receiver.object_data)
+        
+        print(f"  块大小 {chunk_size}: 解析出 {parsed} 个目标")
+        assert parsed == 8, f"块大小 {chunk_size} 时解析出 {parsed} 个目标"
+        assert len(receiver.all_objects) == 8
+        assert not receiver.decoder.pending, "已解析的数据不应留在解码器中"
+    
+    print("✓ 分块数据解析正确")
+    return True
+
+def test_no_reemit():
+    """测试已解析的目标不会在后续数据到达时被重复输出"""
+    print("\n=== 重复输出测试 ===\n")
+    
+    receiver = SerialReceiver()
+    receiver._process_data(RECORD.format(1, 85, 10, 10, 40, 40))
+    assert len(receiver.object_data) == 1
+    receiver.has_new_data()
+    
+    # 只追加噪声，不应产生新目标
+    receiver._process_data("noise\r\n" * 100)
+    assert not receiver.has_new_data(), "噪声数据不应产生新目标"
+    assert not receiver.decoder.pending, "噪声数据不应留在解码器中"
+    
+    print("✓ 已解析的目标没有被重复输出")
+    return True
+
+def test_deferred_last_record():
+    """测试结束于缓冲区末尾的对象在空闲时才输出，避免截断最后一个数字"""
+    print("\n=== 末尾对象测试 ===\n")
+    
+    receiver = SerialReceiver()
+    receiver._process_data("class:2\nscore:90\nbbox:1\nbbox:2\nbbox:30\nbbox:4")
+    assert not receiver.all_objects, "末尾数字可能不完整，应等待后续数据"
+    
+    receiver._process_data("0")
+    with receiver.process_lock:
+        receiver._reprocess_buffer()
+    
+    assert receiver.all_objects[-1]['bbox'] == (1, 2, 30, 40)
+    assert not receiver.decoder.pending
+    
+    print(f"✓ 末尾对象解析正确: {receiver.all_objects[-1]['bbox']}")
+    return True
+
+def test_decoder_matches_regex():
+    """测试字节级解码器与原正则表达式的解析结果一致"""
+    print("\n=== 解码器一致性测试 ===\n")
+    
+    pattern = re.compile(rb'class:(\d+)\s*\n*score:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)\s*\n*bbox:(\d+)')
+    rng = random.Random(1234)
+    noise = [b"\r\n", b" ", b"clas", b"class:", b"score:7", b"bbox:", b"\xff\xfe", b"2\n2\n", b"c"]
+    
+    parts = []
+    for i in range(300):
+        parts.append(RECORD.format(i % 6, rng.randint(0, 99), rng.randint(0, 300), rng.randint(0, 255),
+                                   rng.randint(0, 255), rng.randint(0, 300)).encode('ascii'))
+        if rng.random() < 0.5:
+            parts.append(rng.choice(noise))
+    stream = b"".join(parts)
+    expected = [tuple(int(v) for v in m.groups()) for m in pattern.finditer(stream)]
+    
+    for chunk_size in [1, 5, 64, 4096]:
+        decoder = TextRecordDecoder()
+        records = []
+        for i in range(0, len(stream), chunk_size):
+            # 交替使用memoryview和bytes，两种输入都应得到相同结果
+            chunk = stream[i:i + chunk_size]
+            records.extend(decoder.feed(memoryview(chunk) if i % 2 else chunk))
+        records.extend(decoder.flush())
+        
+        print(f"  块大小 {chunk_size}: {len(records)} 条记录")
+        assert records == expected, f"块大小 {chunk_size} 时解析结果与正则表达式不一致"
+    
+    print(f"✓ 解码结果一致 ({len(expected)} 条记录)")
+    return True
+
+def test_binary_frames():
+    """测试二进制帧解码，包括分块、噪声和CRC错误"""
+    print("\n=== 二进制帧解码测试 ===\n")
+    
+    frames = [
+        [(1, 85, 10, 20, 40, 60)],
+        [(0, 95, 20, 30, 80, 90), (2, 75, 150, 50, 200, 100)],
+        [],
+    ]
+    corrupted = bytearray(BinaryFrameDecoder.encode([(3, 50, 1, 2, 3, 4)]))
+    corrupted[5] ^= 0xFF  # 破坏记录数据，CRC应校验失败
+    
+    stream = (b"\x00\xaa" + BinaryFrameDecoder.encode(frames[0]) + bytes(corrupted)
+              + b"noise\xaa\x55" + BinaryFrameDecoder.encode(frames[1]) + BinaryFrameDecoder.encode(frames[2]))
+    expected = frames[0] + frames[1]
+    
+    for chunk_size in [1, 4, len(stream)]:
+        decoder = BinaryFrameDecoder()
+        records = []
+        for i in range(0, len(stream), chunk_size):
+            records.extend(decoder.feed(stream[i:i + chunk_size]))
+        
+        print(f"  块大小 {chunk_size}: {len(records)} 条记录, {decoder.frame_count} 帧, CRC错误 {decoder.crc_errors}")
+        assert records == expected
+        assert decoder.frame_count == 3
+        assert decoder.crc_errors >= 1
+    
+    print("✓ 二进制帧解码正确")
+    return True
+
+def test_decode_in_place():
+    """测试解码器直接解码 memoryview，只复制末尾未完成的记录"""
+    print("\n=== 原地解码测试 ===\n")
+    
+    partial = b"class:1\nscore:50\nbbox:3"
+    data = bytearray(make_stream(100).encode('ascii') + partial)
+    decoder = TextRecordDecoder()
+    records = decoder.feed(memoryview(data))
+    data[:] = bytes(len(data))  # 输入的数据之后被覆盖（如环形缓冲区被重新写入），不影响已保留的部分
+    print(f"  文本: {len(records)} 条记录, 保留 {len(decoder.tail)} 字节")
+    assert len(records) == 100
+    assert decoder.tail == partial and isinstance(decoder.tail, bytes)
+    records = decoder.feed(memoryview(b"\nbbox:4\nbbox:5\nbbox:6\n"))
+    assert [tuple(record) for record in records] == [(1, 50, 3, 4, 5, 6)]
+    
+    frame = BinaryFrameDecoder.encode([(2, 80, 10, 20, 30, 40)])
+    data = bytearray(frame * 50 + frame[:5])
+    decoder = BinaryFrameDecoder()
+    records = decoder.feed(memoryview(data))
+    data[:] = bytes(len(data))
+    print(f"  二进制: {len(records)} 条记录, 保留 {len(decoder.buffer)} 字节")
+    assert len(records) == 50 and bytes(decoder.buffer) == frame[:5]
+    assert [tuple(record) for record in decoder.feed(memoryview(frame[5:]))] == [(2, 80, 10, 20, 30, 40)]
+    
+    print("✓ 原地解码正确")
+    return True
+
+def test_protocol_auto_detect():
+    """测试SerialReceiver自动识别文本和二进制协议"""
+    print("\n=== 协议自动识别测试 ===\n")
+    
+    binary_receiver = SerialReceiver()
+    binary_receiver._process_data(b"\x13\x37" + BinaryFrameDecoder.encode([(1, 85, 10, 20, 40, 60)]))
+    assert binary_receiver.decoder.protocol == 'binary'
+    assert binary_receiver.all_objects[-1]['bbox'] == (10, 20, 40, 60)
+    
+    text_receiver = SerialReceiver()
+    text_receiver._process_data(make_stream(2).encode('ascii'))
+    assert text_receiver.decoder.protocol == 'text'
+    assert len(text_receiver.all_objects) == 2
+    
+    fixed_receiver = SerialReceiver(protocol='binary')
+    fixed_receiver._process_data(make_stream(2).encode('ascii'))
+    assert not fixed_receiver.all_objects, "固定为二进制协议时不应解析文本数据"
+    
+    print("✓ 协议识别正确")
+    return True
+
+def normalize_record(record):
+    """逐条整理记录坐标，作为批量处理的参照；坐标无效时返回None"""
+    obj_class, score, x1, y1, x2, y2 = record
+    xmin, xmax = min(x1, x2), max(x1, x2)
+    ymin, ymax = min(y1, y2), max(y1, y2)
+    if xmax == xmin:
+        xmax = xmin + 1
+    if ymax == ymin:
+        ymax = ymin + 1
+    if 0 <= xmin and xmax <= 255 and 0 <= ymin and ymax <= 255:
+        return (obj_class, score, xmin, ymin, xmax, ymax)
+    return None
+
+def test_parse_detections():
+    """测试批量解析结果与解码器加逐条处理的结果一致"""
+    print("\n=== 批量解析测试 ===\n")
+    
+    rng = random.Random(5678)
+    parts = []
+    for i in range(500):
+        parts.append(RECORD.format(i % 6, rng.randint(0, 99), rng.randint(0, 300), rng.randint(0, 255),
+                                   rng.randint(0, 255), rng.choice([0, 7, rng.randint(0, 300)])))
+        if rng.random() < 0.3:
+            parts.append("noise\r\n")
+    stream = "".join(parts)
+    
+    decoder = TextRecordDecoder()
+    expected = [normalize_record(r) for r in decoder.feed(stream.encode('ascii')) + decoder.flush()]
+    expected = [r for r in expected if r is not None]
+    
+    detections = parse_detections(stream)
+    assert detections.dtype.names == ('class', 'score', 'x1', 'y1', 'x2', 'y2')
+    assert detections.tolist() == expected, "文本批量解析结果与逐条处理不一致"
+    print(f"  文本: {len(detections)} 个有效目标 (共 {len(parts)} 段数据)")
+    
+    records = [(1, 85, 40, 60, 10, 20), (2, 70, 5, 5, 5, 9)]
+    binary = parse_detections(BinaryFrameDecoder.encode(records))
+    assert binary.tolist() == [normalize_record(r) for r in records]
+    assert len(parse_detections(b"")) == 0
+    print(f"  二进制: {binary.tolist()}")
+    
+    print("✓ 批量解析正确")
+    return True
+
+def test_long_numbers():
+    """测试位数过多的数值不会导致整个数据块的记录丢失"""
+    print("\n=== 超长数值测试 ===\n")
+    
+    good = make_stream(6)
+    overflow = "class:1\nscore:80\nbbox:99999999999999999999999\nbbox:10\nbbox:20\nbbox:30\n"
+    long_class = RECORD.format("123456789012345678901234", 80, 10, 10, 20, 20)
+    cut = good.index("class:3")
+    stream = good[:cut] + overflow + long_class + good[cut:]
+    
+    receiver = SerialReceiver()
+    receiver._process_data(stream.encode('ascii'))
+    with receiver.process_lock:
+        receiver._reprocess_buffer()
+    metrics = receiver.get_metrics()
+    print(f"  接收器: {len(receiver.all_objects)} 个目标, 拒绝 {metrics['records_rejected']} 条记录")
+    assert len(receiver.all_objects) == 6, "有效记录不应因超长数值而丢失"
+    assert metrics['records_rejected'] == 2
+    
+    detections = parse_detections(stream)
+    print(f"  批量解析: {len(detections)} 个目标")
+    assert len(detections) == 6
+    assert detections.tolist() == [(r['class'], r['score']) + r['bbox'] for r in receiver.all_objects]
+    
+    print("✓ 超长数值的记录被忽略")
+    return True
+
+def test_detection_objects():
+    """测试接收器、多端口管理器和框处理器之间传递的 Detection 对象"""
+    print("\n=== Detection 对象测试 ===\n")
+    
+    receiver = SerialReceiver()
+    receiver._process_data(make_stream(3))
+    objects = receiver.get_all_objects()
+    assert all(isinstance(obj, Detection) for obj in objects)
+    
+    # 兼容原有的字典访问方式
+    obj = objects[0]
+    assert obj['class'] == obj.class_id and obj['bbox'] == obj.bbox
+    assert obj.get('source_port') is None and obj.get('missing', 1) == 1
+    assert obj.to_dict() == {'class': obj.class_id, 'score': obj.score, 'bbox': obj.bbox}
+    
+    # 多端口合并时只标记来源，不修改接收器中的对象
+    manager = MultiPortManager()
+    manager.add_port('port1', 'MOCK1')
+    manager.receivers['port1'] = receiver
+    manager.port_configs['port1']['connected'] = True
+    combined = manager.get_combined_objects()
+    assert all(o.get('source_port') == 'port1' and o['port_name'] == 'port1' for o in combined)
+    assert all(o.source is None for o in receiver.all_objects)
+    
+    # 框处理器同时接受 Detection 和字典
+    processor = BoxProcessor()
+    processor.update_from_objects(objects + [{'class': 5, 'score': 40, 'bbox': (1, 2, 3, 4)}])
+    assert processor.get_boxes()[:len(objects)] == objects
+    assert len(processor.filter_by_score(50)) == len(objects)
+    
+    # 结构化数组往返转换
+    array = detections_to_array(objects)
+    assert detections_from_array(array) == objects
+    records = array.view(np.int64).reshape(-1, 6)  # 解码器输出的 N×6 记录数组直接转换
+    assert detections_to_array(records).tolist() == array.tolist()
+    assert detections_to_array(array) is array
+    assert detections_to_array([]).shape == (0,)
+    
+    # 多端口显示时按来源端口着色，没有来源的目标按类别着色
+    image = ImageProcessor()
+    drawn = image.draw_boxes([Detection(0, 90, (10, 10, 40, 40)).with_source('port2'),
+                              Detection(0, 90, (100, 100, 140, 140))],
+                             source_colors={'port1': 'red', 'port2': 'blue'})
+    assert drawn.getpixel((10, 30)) == (0, 0, 255), "应使用来源端口的颜色"
+    assert drawn.getpixel((100, 120)) == (255, 0, 0), "没有来源端口时应使用类别颜色"
+    
+    print(f"✓ Detection 对象正确: {obj!r}")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("分块解析", test_chunked_stream),
+        ("重复输出", test_no_reemit),
+        ("末尾对象", test_deferred_last_record),
+        ("解码器一致性", test_decoder_matches_regex),
+        ("二进制帧", test_binary_frames),
+        ("协议识别", test_protocol_auto_detect),
+        ("批量解析", test_parse_detections),
+        ("Detection对象", test_detection_objects),
+        ("超长数值", test_long_numbers),
+        ("原地解码", test_decode_in_place),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+硬件时序检测评分测试脚本
+
+此脚本测试ASCII字符'2'时序样本的采集和评分，包括：
+1. 向量化的似然表与逐个间隔、逐个倍数计算的结果一致
+2. 一次评分同时给出所有候选波特率的置信度
+3. 同一次读取返回的多个字符'2'有各自的到达时间
+"""
+
+import sys
+import time
+import random
+import numpy as np
+from mock_serial import SimulatedLink, SIMULATED_RECORD
+from serial_receive import SerialReceiver, timing_likelihood_table, TIMING_MULTIPLIERS
+
+def reference_match(interval_us, bit_time_us):
+    """逐个倍数计算一个间隔的最佳匹配度"""
+    best = 0.0
+    for multiplier in TIMING_MULTIPLIERS:
+        expected = bit_time_us * 10 * multiplier
+        best = max(best, max(0, 1.0 - abs(interval_us - expected) / expected))
+    return best
+
+def test_likelihood_table():
+    """测试似然表"""
+    print("=== 似然表测试 ===\n")
+    
+    receiver = SerialReceiver()
+    rng = random.Random(5)
+    bit_times = [1e6 / baudrate for baudrate in receiver.common_baudrates]
+    intervals = [rng.uniform(0, 20000) for _ in range(50)]
+    
+    table, best = timing_likelihood_table(intervals, bit_times)
+    assert table.shape == (len(bit_times), len(TIMING_MULTIPLIERS)) and best.shape == (len(bit_times),)
+    for i, bit_time in enumerate(bit_times):
+        expected = sum(reference_match(interval, bit_time) for interval in intervals) / len(intervals)
+        assert abs(best[i] - expected) < 1e-12, f"位时间 {bit_time:.2f}μs 的匹配度不一致"
+    
+    empty_table, empty_best = timing_likelihood_table([], bit_times)
+    assert not empty_best.any() and empty_table.shape == table.shape
+    
+    print("✓ 似然表与逐个计算的结果一致")
+    return True
+
+def test_all_candidates():
+    """测试同时评估所有候选波特率"""
+    print("\n=== 候选波特率评分测试 ===\n")
+    
+    receiver = SerialReceiver()
+    baudrates = receiver.common_baudrates
+    bit_times = [1e6 / baudrate for baudrate in baudrates]
+    rng = random.Random(9)
+    
+    # 9600 波特率下每隔1~3个字符时间收到一个'2'，带1%的抖动
+    char_time = 10 / 9600
+    timestamp = 0.0
+    samples = []
+    for _ in range(64):
+        timestamp += char_time * rng.choice([1, 2, 3]) * rng.uniform(0.99, 1.01)
+        samples.append((timestamp, '2'))
+    
+    start_time = time.perf_counter()
+    scores = receiver._score_ascii2_timing_candidates(samples, bit_times)
+    elapsed = time.perf_counter() - start_time
+    confidence = scores['confidence']
+    print(f"  最可能的波特率: {baudrates[int(np.argmax(confidence))]}, 耗时 {elapsed * 1000:.2f} ms")
+    
+    assert baudrates[int(np.argmax(confidence))] == 9600
+    for i, bit_time in enumerate(bit_times):
+        assert abs(confidence[i] - receiver._analyze_ascii2_timing_samples(samples, bit_time)) < 1e-12
+    assert scores['table'].shape == (len(baudrates), len(TIMING_MULTIPLIERS))
+    assert receiver._score_ascii2_timing_candidates(samples[:1], bit_times)['confidence'].tolist() == [0.0] * len(baudrates)
+    
+    print("✓ 候选波特率评分正确")
+    return True
+
+def test_capture_timestamps():
+    """测试样本的到达时间估算"""
+    print("\n=== 到达时间测试 ===\n")
+    
+    # 每条记录包含一个'2'：5500 字节/秒时约每10ms一个
+    byte_rate = 5500
+    link = SimulatedLink(115200, byte_rate=byte_rate)
+    receiver = SerialReceiver()
+    receiver.timing_sample_budget = 40
+    test_serial = link("SIM", 115200, timeout=receiver.scan_read_timeout)
+    read = test_serial.read
+    
+    def slow_read(size=1):
+        # 读取线程来不及时数据在缓冲区中积压，每次读取返回约3个'2'
+        time.sleep(0.03)
+        return read(max(test_serial.in_waiting, size))
+    
+    test_serial.read = slow_read
+    
+    samples = receiver._collect_ascii2_timing_samples(test_serial, duration=2.0)
+    timestamps = [timestamp for timestamp, _ in samples]
+    intervals = np.diff(timestamps)
+    expected = len(SIMULATED_RECORD) / byte_rate
+    print(f"  样本数: {len(samples)}, 间隔中位数 {np.median(intervals) * 1000:.2f} ms (期望 {expected * 1000:.2f} ms)")
+    
+    assert len(samples) == 40 and all(char == '2' for _, char in samples)
+    assert np.all(intervals > 0), "同一次读取中的'2'应有不同的到达时间"
+    assert abs(np.median(intervals) - expected) < expected * 0.3
+    
+    print("✓ 到达时间估算正确")
+    return True
+
+def main():
+    """主测试函数"""
+    tests = [
+        ("似然表", test_likelihood_table),
+        ("候选波特率评分", test_all_candidates),
+        ("到达时间", test_capture_timestamps),
+    ]
+    
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except AssertionError as e:
+            print(f"✗ {test_name}: {e}")
+            results.append((test_name, False))
+    
+    print(f"\n{'='*50}")
+    for test_name, result in results:
+        status = "✓ 通过" if result else "✗ 失败"
+        print(f"{test_name:<15}: {status}")
+    
+    return all(result for _, result in results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)